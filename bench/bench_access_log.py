@@ -0,0 +1,101 @@
+"""
+Request throughput of a trivial route without an access log, with a middleware writing a JSON line
+per request synchronously, and with `eggman.access.AccessLog`.
+
+`REQUESTS` requests are sent `CONCURRENCY` at a time straight to the ASGI app, so that the cost of
+logging is not hidden behind the network. Both logs append to a temporary file.
+
+    python bench/bench_access_log.py
+"""
+import asyncio
+import json
+import os
+import tempfile
+import time
+from typing import IO, Any
+
+from eggman import PlainTextResponse, Request, Response, Server
+from eggman.access import AccessLog
+
+REQUESTS = 20000
+CONCURRENCY = 100
+
+
+async def hello(request: Request) -> Response:
+    return PlainTextResponse("hello")
+
+
+class SyncAccessLog:
+    """
+    Writes a line per request from the request path, as a logging middleware typically does.
+    """
+
+    def __init__(self, app: Any, sink: IO[str]) -> None:
+        self.app = app
+        self.sink = sink
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        status = 500
+        start = time.perf_counter()
+
+        async def send_(message: Any) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_)
+        finally:
+            line = {"method": scope["method"], "path": scope["path"], "status": status}
+            line["latency"] = time.perf_counter() - start
+            self.sink.write(json.dumps(line) + "\n")
+            self.sink.flush()
+
+
+async def drive(app: Any) -> float:
+    async def receive() -> Any:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Any) -> None:
+        pass
+
+    scope = {"type": "http", "method": "GET", "path": "/hello", "query_string": b"", "headers": []}
+    slots = asyncio.Semaphore(CONCURRENCY)
+
+    async def limited() -> None:
+        async with slots:
+            await app(dict(scope), receive, send)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(limited() for _ in range(REQUESTS)))
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    print(f"{REQUESTS} requests, {CONCURRENCY} concurrent")
+    with tempfile.TemporaryDirectory() as tmp:
+        server = Server()
+        server.add_route(hello, "/hello")
+        elapsed = loop.run_until_complete(drive(server.starlette))
+        print(f"  {'no access log':<24} {REQUESTS / elapsed:8.0f} requests/s")
+
+        with open(os.path.join(tmp, "sync.log"), "w") as sink:
+            server = Server()
+            server.add_route(hello, "/hello")
+            elapsed = loop.run_until_complete(drive(SyncAccessLog(server.starlette, sink)))
+            print(f"  {'synchronous writes':<24} {REQUESTS / elapsed:8.0f} requests/s")
+
+        access_log = AccessLog(os.path.join(tmp, "access.log"))
+        server = Server(access_log=access_log)
+        server.add_route(hello, "/hello")
+        elapsed = loop.run_until_complete(drive(server.starlette))
+        loop.run_until_complete(access_log.stop())
+        print(f"  {'AccessLog':<24} {REQUESTS / elapsed:8.0f} requests/s  {access_log.logged} logged")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Database round trips and throughput of a handler class doing per-request point lookups, with and
+without `eggman.batching.batched` on its dependency's lookup.
+
+The database is simulated: every query takes `ROUND_TRIP` seconds, however many keys it looks
+up, and at most `CONNECTIONS` queries run at once, as with a connection pool. `REQUESTS` requests
+for `USERS` distinct users are sent `CONCURRENCY` at a time.
+
+    python bench/bench_batching.py
+"""
+import asyncio
+import time
+from typing import Any, Dict, List
+
+from eggman import JSONResponse, Request, Response, Server
+from eggman.batching import batched
+
+ROUND_TRIP = 0.001
+CONNECTIONS = 10
+REQUESTS = 5000
+CONCURRENCY = 200
+USERS = 1000
+
+
+class Database:
+    def __init__(self) -> None:
+        self.queries = 0
+        self.connections = asyncio.Semaphore(CONNECTIONS)
+
+    async def query(self, names: List[str]) -> Dict[str, dict]:
+        async with self.connections:
+            self.queries += 1
+            await asyncio.sleep(ROUND_TRIP)
+            return {name: {"name": name} for name in names}
+
+    async def get_user(self, name: str) -> dict:
+        return (await self.query([name]))[name]
+
+
+class BatchedDatabase(Database):
+    @batched(window=0.001, max_batch=100)
+    async def get_user(self, names: List[str]) -> Dict[str, dict]:  # type: ignore
+        return await self.query(names)
+
+
+class UserHandler:
+    def __init__(self, db: Database) -> None:
+        self.db = db
+
+    async def get_user(self, request: Request) -> Response:
+        return JSONResponse(await self.db.get_user(request.path_params["name"]))
+
+
+async def request(server: Server, name: str) -> None:
+    async def receive() -> Any:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Any) -> None:
+        pass
+
+    path = f"/users/{name}"
+    scope = {"type": "http", "method": "GET", "path": path, "query_string": b"", "headers": []}
+    await server.starlette(scope, receive, send)
+
+
+async def drive(server: Server) -> float:
+    slots = asyncio.Semaphore(CONCURRENCY)
+
+    async def limited(i: int) -> None:
+        async with slots:
+            await request(server, f"user{i % USERS}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(limited(i) for i in range(REQUESTS)))
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    print(f"{REQUESTS} requests, {CONCURRENCY} concurrent, {ROUND_TRIP * 1e3:.0f} ms round trips")
+    for name, db in (("per-request queries", Database()), ("batched", BatchedDatabase())):
+        # As `Blueprint.jab` does for a handler class with a route on `get_user`.
+        server = Server()
+        server.add_route(UserHandler(db).get_user, "/users/{name}")
+
+        elapsed = loop.run_until_complete(drive(server))
+        print(f"  {name:<20} {db.queries:6d} queries  {REQUESTS / elapsed:8.0f} requests/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Fan-out of `eggman.broadcast.Hub` to 10k connected websocket clients, 1% of which have stopped
+reading, compared with a loop awaiting each client's `send` in turn.
+
+    python bench/bench_broadcast.py
+"""
+import asyncio
+import time
+from typing import List
+
+from eggman.broadcast import Hub
+
+CLIENTS = 10000
+STALLED = CLIENTS // 100
+MESSAGES = 20
+
+
+class Client:
+    def __init__(self, stalled: bool) -> None:
+        self.stalled = stalled
+        self.received = 0
+
+    async def send(self, message: dict) -> None:
+        if self.stalled:
+            await asyncio.Event().wait()
+        self.received += 1
+
+    async def close(self, code: int = 1000) -> None:
+        pass
+
+
+def clients() -> List[Client]:
+    return [Client(stalled=i % (CLIENTS // STALLED) == 0) for i in range(CLIENTS)]
+
+
+async def hub() -> None:
+    connected = clients()
+    broadcast = Hub(max_queue=16)
+    for client in connected:
+        broadcast.subscribe(client, "ticks")  # type: ignore
+
+    healthy = [c for c in connected if not c.stalled]
+    publish = 0.0
+    start = time.perf_counter()
+    for i in range(MESSAGES):
+        before = time.perf_counter()
+        broadcast.publish("ticks", {"tick": i, "payload": "x" * 64})
+        publish += time.perf_counter() - before
+        await asyncio.sleep(0)
+
+    while any(c.received < MESSAGES for c in healthy):
+        await asyncio.sleep(0.001)
+    elapsed = time.perf_counter() - start
+
+    per_message = publish / MESSAGES * 1e3
+    print(f"hub     publish {per_message:7.2f} ms/message, all healthy clients caught up in {elapsed:.3f}s")
+
+    for subscriber in [s for subs in broadcast.channels.values() for s in subs]:
+        broadcast.unsubscribe(subscriber)
+
+
+async def serial() -> None:
+    connected = clients()
+    healthy = [c for c in connected if not c.stalled]
+
+    async def loop() -> None:
+        for i in range(MESSAGES):
+            message = {"type": "websocket.send", "text": f'{{"tick":{i},"payload":"{"x" * 64}"}}'}
+            for client in connected:
+                await client.send(message)
+
+    try:
+        await asyncio.wait_for(loop(), timeout=2)
+    except asyncio.TimeoutError:
+        behind = sum(1 for c in healthy if c.received < MESSAGES)
+        print(f"serial  stalled on the first slow client, {behind} healthy clients still behind after 2s")
+
+
+def main() -> None:
+    loop = asyncio.new_event_loop()
+    print(f"{CLIENTS} clients, {STALLED} stalled, {MESSAGES} messages")
+    loop.run_until_complete(hub())
+    loop.run_until_complete(serial())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Serving the same 200KB JSON response compressed, through Starlette's `GZipMiddleware` and through
+`eggman.compression.Compressor`, which compresses identical bodies only once.
+
+    python bench/bench_compression.py
+"""
+import asyncio
+import time
+
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.types import Message, Receive, Scope, Send
+
+from eggman.alias import Response
+from eggman.compression import Compressor
+from eggman.responses import JSONResponse
+
+REQUESTS = 500
+BODY = JSONResponse([{"id": i, "name": f"user-{i}", "score": i * 0.5} for i in range(5000)]).body
+SCOPE = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", b"gzip")]}
+
+
+async def app(scope: Scope, receive: Receive, send: Send) -> None:
+    # A fresh response every time, as GZipMiddleware modifies the headers of the response it compresses.
+    await Response(BODY, media_type="application/json")(scope, receive, send)
+
+
+async def receive() -> Message:
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def drive(target: Send) -> float:
+    size = 0
+
+    async def send(message: Message) -> None:
+        nonlocal size
+        size += len(message.get("body", b""))
+
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        await target(dict(SCOPE), receive, send)  # type: ignore
+    elapsed = (time.perf_counter() - start) / REQUESTS * 1e3
+    print(f"  {elapsed:6.3f} ms/request, {size // REQUESTS} bytes/response")
+    return elapsed
+
+
+def main() -> None:
+    loop = asyncio.new_event_loop()
+    print(f"{len(BODY)} byte body")
+    print("uncompressed")
+    loop.run_until_complete(drive(app))  # type: ignore
+    print("starlette GZipMiddleware")
+    loop.run_until_complete(drive(GZipMiddleware(app)))  # type: ignore
+    print("eggman Compressor")
+    loop.run_until_complete(drive(Compressor(encodings=["gzip"]).wrap(app)))  # type: ignore
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Time taken to import eggman for declaring blueprints and for serving them, each measured in a fresh
+interpreter, along with the modules that contribute most to the latter according to `-X importtime`.
+
+    python bench/bench_import.py
+"""
+import subprocess
+import sys
+from typing import List, Tuple
+
+RUNS = 10
+DECLARE = "from eggman import Blueprint; Blueprint('bench').lazy('/', 'service.handlers:index')"
+SERVE = "from eggman import Server; Server().run"
+
+
+def importtime(code: str) -> List[Tuple[int, str]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, check=True
+    )
+
+    timings = []
+    for line in result.stderr.splitlines()[1:]:
+        _, _, cumulative, name = (part.strip() for part in line.replace(":", "|", 1).split("|"))
+        timings.append((int(cumulative), name))
+
+    return timings
+
+
+def total(code: str) -> float:
+    timed = f"import time; start = time.perf_counter(); {code}; print(time.perf_counter() - start)"
+    command = [sys.executable, "-c", timed]
+    runs = [subprocess.run(command, capture_output=True, text=True) for _ in range(RUNS)]
+    return min(float(run.stdout) for run in runs) * 1e3
+
+
+def main() -> None:
+    print(f"declare blueprints  {total(DECLARE):8.2f} ms")
+    print(f"import server       {total(SERVE):8.2f} ms")
+
+    print("\nslowest imports of the server:")
+    for us, name in sorted(importtime(SERVE), reverse=True)[:10]:
+        print(f"  {us / 1e3:8.2f} ms  {name.strip()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Rendering cost of the Starlette JSON response aliases against `eggman.JSONResponse`.
+
+    python bench/bench_json.py
+"""
+import timeit
+from typing import Any, Callable, Dict, List
+
+from starlette.responses import JSONResponse as StarletteJSONResponse
+from starlette.responses import UJSONResponse as StarletteUJSONResponse
+
+from eggman.responses import JSONResponse, orjson_encoder, stdlib_encoder
+
+SIZES = [10, 1000, 10000]
+
+
+def payload(n: int) -> List[Dict[str, Any]]:
+    return [
+        {"id": i, "name": f"user-{i}", "score": i * 0.5, "tags": ["a", "b"], "active": True} for i in range(n)
+    ]
+
+
+def main() -> None:
+    candidates: Dict[str, Callable[[Any], Any]] = {
+        "starlette.JSONResponse": StarletteJSONResponse,
+        "starlette.UJSONResponse": StarletteUJSONResponse,
+        "eggman.JSONResponse[orjson]": lambda c: JSONResponse(c, encoder=orjson_encoder),
+        "eggman.JSONResponse[stdlib]": lambda c: JSONResponse(c, encoder=stdlib_encoder),
+    }
+
+    print(f"{'response':<30} " + " ".join(f"{n:>12}" for n in SIZES) + "   (us per response)")
+    for name, make in candidates.items():
+        timings = []
+        for n in SIZES:
+            content = payload(n)
+            number = max(10, 20000 // n)
+            try:
+                timings.append(timeit.timeit(lambda: make(content), number=number) / number * 1e6)
+            except (AssertionError, ImportError):
+                timings.append(float("nan"))
+        print(f"{name:<30} " + " ".join(f"{t:>12.1f}" for t in timings))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Request throughput on localhost against the connection reuse of the client, for every installed
+engine.
+
+A server forked for each engine answers `/hello` while the client sends `REQUESTS` requests
+opening a new connection for each, reusing a single keep-alive connection, and spread over
+`CONNECTIONS` concurrent keep-alive connections. When hypercorn and h2 are installed, the same
+requests are also multiplexed as concurrent streams of a single HTTP/2 connection.
+
+    python bench/bench_keepalive.py
+"""
+import asyncio
+import multiprocessing
+import socket
+import time
+from typing import Awaitable, Callable, List, Tuple
+
+from eggman import PlainTextResponse, Request, Response, Server
+from eggman.engine import Engine, available
+
+REQUESTS = 2000
+CONNECTIONS = 16
+REQUEST = b"GET /hello HTTP/1.1\r\nHost: localhost\r\n\r\n"
+
+
+async def hello(request: Request) -> Response:
+    return PlainTextResponse("hello")
+
+
+def serve(engine: Engine, port: int) -> None:
+    import logging
+
+    logging.disable(logging.INFO)
+    server = Server(host="127.0.0.1", port=port, engine=engine)
+    server.add_route(hello, "/hello")
+    asyncio.get_event_loop().run_until_complete(server.run())
+
+
+async def response(reader: asyncio.StreamReader) -> None:
+    head = await reader.readuntil(b"\r\n\r\n")
+    length = int(head.lower().split(b"content-length: ")[1].split(b"\r\n")[0])
+    await reader.readexactly(length)
+
+
+async def fresh(port: int, count: int) -> None:
+    for _ in range(count):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"GET /hello HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n")
+        await response(reader)
+        writer.close()
+
+
+async def reused(port: int, count: int) -> None:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    for _ in range(count):
+        writer.write(REQUEST)
+        await response(reader)
+    writer.close()
+
+
+async def concurrent(port: int, count: int) -> None:
+    await asyncio.gather(*(reused(port, count // CONNECTIONS) for _ in range(CONNECTIONS)))
+
+
+async def multiplexed(port: int, count: int) -> None:
+    import h2.config
+    import h2.connection
+    import h2.events
+
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    connection = h2.connection.H2Connection(h2.config.H2Configuration(client_side=True))
+    connection.initiate_connection()
+    headers = [(":method", "GET"), (":path", "/hello"), (":scheme", "http"), (":authority", "localhost")]
+
+    done = 0
+    while done < count:
+        # Keep CONNECTIONS streams in flight, as many as the concurrent HTTP/1.1 connections.
+        batch = min(CONNECTIONS, count - done)
+        for _ in range(batch):
+            connection.send_headers(connection.get_next_available_stream_id(), headers, end_stream=True)
+        writer.write(connection.data_to_send())
+
+        ended = 0
+        while ended < batch:
+            data = await reader.read(65536)
+            for event in connection.receive_data(data):
+                if isinstance(event, h2.events.DataReceived):
+                    connection.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                elif isinstance(event, h2.events.StreamEnded):
+                    ended += 1
+            writer.write(connection.data_to_send())
+
+        done += batch
+
+    writer.close()
+
+
+Scenario = Callable[[int, int], Awaitable[None]]
+
+
+def measure(port: int, scenario: Scenario) -> float:
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(scenario(port, 50))
+        start = time.perf_counter()
+        loop.run_until_complete(scenario(port, REQUESTS))
+        return REQUESTS / (time.perf_counter() - start)
+    finally:
+        loop.close()
+
+
+def wait_for(port: int) -> None:
+    for _ in range(200):
+        try:
+            socket.create_connection(("127.0.0.1", port)).close()
+            return
+        except OSError:
+            time.sleep(0.025)
+
+    raise RuntimeError(f"the server on port {port} did not start")
+
+
+def engines() -> List[Tuple[str, Engine]]:
+    found = [("uvicorn h11", Engine("uvicorn", http="h11"))]
+    if available("httptools"):
+        found.append(("uvicorn httptools", Engine("uvicorn", http="httptools")))
+    if available("hypercorn"):
+        found.append(("hypercorn", Engine("hypercorn", http2=True)))
+
+    return found
+
+
+def main() -> None:
+    scenarios: List[Tuple[str, Scenario]] = [
+        ("connection per request", fresh),
+        ("one keep-alive connection", reused),
+        (f"{CONNECTIONS} keep-alive connections", concurrent),
+    ]
+
+    print(f"{REQUESTS} requests, in requests/s")
+    for name, engine in engines():
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+
+        process = multiprocessing.get_context("fork").Process(target=serve, args=(engine, port), daemon=True)
+        process.start()
+        try:
+            wait_for(port)
+            print(name)
+            for label, scenario in scenarios:
+                print(f"  {label:<32} {measure(port, scenario):10.0f}")
+
+            if engine.name == "hypercorn" and available("h2"):
+                label = f"{CONNECTIONS} HTTP/2 streams, one connection"
+                print(f"  {label:<32} {measure(port, multiplexed):10.0f}")
+        finally:
+            process.terminate()
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
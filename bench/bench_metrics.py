@@ -0,0 +1,51 @@
+"""
+Per-request overhead of `eggman.metrics.MetricsRegistry.instrument` on a trivial ASGI app.
+
+    python bench/bench_metrics.py
+"""
+import asyncio
+import time
+
+from starlette.types import Message, Receive, Scope, Send
+
+from eggman.metrics import MetricsRegistry
+
+REQUESTS = 200000
+SCOPE = {"type": "http", "method": "GET", "path": "/bench"}
+
+
+async def app(scope: Scope, receive: Receive, send: Send) -> None:
+    await receive()
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def receive() -> Message:
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message: Message) -> None:
+    pass
+
+
+async def drive(target: Send) -> float:
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        await target(SCOPE, receive, send)  # type: ignore
+    return (time.perf_counter() - start) / REQUESTS * 1e6
+
+
+def main() -> None:
+    instrumented = MetricsRegistry().instrument(app, "bench", "/bench")
+    loop = asyncio.new_event_loop()
+
+    bare = loop.run_until_complete(drive(app))  # type: ignore
+    measured = loop.run_until_complete(drive(instrumented))  # type: ignore
+
+    print(f"bare          {bare:6.2f} us/request")
+    print(f"instrumented  {measured:6.2f} us/request")
+    print(f"overhead      {measured - bare:6.2f} us/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Tail latency of an overloaded route with and without an `eggman.limits.ConcurrencyLimit`.
+
+Requests arrive open-loop at twice the rate a simulated backend, serving `CAPACITY` requests at a
+time in `SERVICE_TIME` seconds each, can sustain. Without a limit the excess queues up and the
+latency of every request grows for as long as the spike lasts; with one the excess is rejected up
+front and the requests that are served keep their latency.
+
+    python bench/bench_overload.py
+"""
+import asyncio
+import time
+from typing import List, Optional
+
+from eggman import PlainTextResponse, Request, Response, Server
+from eggman.limits import ConcurrencyLimit
+
+CAPACITY = 8
+SERVICE_TIME = 0.005
+DURATION = 2.0
+RATE = 2 * CAPACITY / SERVICE_TIME
+
+
+def build(limit: Optional[ConcurrencyLimit]) -> Server:
+    backend = asyncio.Semaphore(CAPACITY)
+
+    async def handler(request: Request) -> Response:
+        async with backend:
+            await asyncio.sleep(SERVICE_TIME)
+        return PlainTextResponse("ok")
+
+    server = Server()
+    server.add_route(handler, "/work", concurrency=limit)
+    return server
+
+
+async def request(server: Server, latencies: List[float], rejected: List[int]) -> None:
+    status = 0
+
+    async def receive() -> dict:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: dict) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    scope = {"type": "http", "method": "GET", "path": "/work", "query_string": b"", "headers": []}
+    start = time.perf_counter()
+    await server.starlette(scope, receive, send)
+
+    if status == 200:
+        latencies.append(time.perf_counter() - start)
+    else:
+        rejected.append(status)
+
+
+async def drive(server: Server) -> None:
+    latencies: List[float] = []
+    rejected: List[int] = []
+    tasks = []
+
+    start = time.perf_counter()
+    sent = 0
+    while time.perf_counter() - start < DURATION:
+        due = int((time.perf_counter() - start) * RATE)
+        for _ in range(due - sent):
+            tasks.append(asyncio.ensure_future(request(server, latencies, rejected)))
+        sent = due
+        await asyncio.sleep(0.001)
+
+    await asyncio.gather(*tasks)
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1e3
+    p99 = latencies[int(len(latencies) * 0.99)] * 1e3
+    print(f"  served {len(latencies):6d}  rejected {len(rejected):6d}  p50 {p50:8.1f} ms  p99 {p99:8.1f} ms")
+
+
+def main() -> None:
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    capacity = CAPACITY / SERVICE_TIME
+    print(f"{RATE:.0f} requests/s for {DURATION}s against a backend sustaining {capacity:.0f}/s")
+    print("unlimited")
+    loop.run_until_complete(drive(build(None)))
+    print(f"fixed limit of {CAPACITY}")
+    loop.run_until_complete(drive(build(ConcurrencyLimit(CAPACITY))))
+    print("adaptive limit")
+    adaptive = ConcurrencyLimit(4 * CAPACITY, adaptive=True, target_latency=2 * SERVICE_TIME)
+    loop.run_until_complete(drive(build(adaptive)))
+    print(f"  converged to a limit of {adaptive.limit:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Route lookup latency of the Starlette router against `eggman.routing.CompiledRouter`.
+
+    python bench/bench_routing.py
+"""
+import timeit
+from typing import Any, Dict
+
+from starlette.routing import Match, Router
+
+from eggman import PlainTextResponse, Request, Response
+from eggman.routing import CompiledRouter
+
+ROUTE_COUNTS = [10, 100, 1000, 5000]
+NUMBER = 2000
+
+
+def handler(request: Request) -> Response:
+    return PlainTextResponse("")  # pragma: no cover
+
+
+def populate(router: Router, n: int) -> None:
+    for i in range(n):
+        router.add_route(f"/svc{i % 50}/v{i // 50}/items/{{item_id:int}}/detail{i}", handler)
+
+
+def scope(n: int) -> Dict[str, Any]:
+    i = n - 1
+    return {"type": "http", "method": "GET", "path": f"/svc{i % 50}/v{i // 50}/items/42/detail{i}"}
+
+
+def linear(router: Router, scope: Dict[str, Any]) -> None:
+    for route in router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return
+
+
+def main() -> None:
+    print(f"{'routes':>8} {'starlette (us)':>16} {'compiled (us)':>16}")
+    for n in ROUTE_COUNTS:
+        starlette_router = Router()
+        compiled_router = CompiledRouter()
+        populate(starlette_router, n)
+        populate(compiled_router, n)
+        compiled_router.freeze()
+
+        s = scope(n)
+        assert compiled_router.match(s)[0] == Match.FULL
+
+        slow = timeit.timeit(lambda: linear(starlette_router, s), number=NUMBER) / NUMBER * 1e6
+        fast = timeit.timeit(lambda: compiled_router.match(s), number=NUMBER) / NUMBER * 1e6
+        print(f"{n:>8} {slow:>16.2f} {fast:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Time taken by `Blueprint.jab` and its constructor to register the blueprint of `bench_startup.py`,
+1,000 handlers spread across 100 handler classes, without a snapshot, while writing one and while
+loading it.
+
+The handlers are written to a module in a temporary directory, which is imported afresh for every
+run since a blueprint can only be provided once.
+
+    python bench/bench_snapshot.py
+"""
+import importlib
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, List, Optional, Tuple
+
+import bench_startup
+from eggman import Blueprint
+
+RUNS = 50
+MODULE = "eggman_bench_snapshot"
+
+
+def fresh() -> Blueprint:
+    sys.modules.pop(MODULE, None)
+    return importlib.import_module(MODULE).bp  # type: ignore
+
+
+def register(bp: Blueprint) -> Tuple[float, float]:
+    start = time.perf_counter()
+    constructor = bp.jab
+    resolved = time.perf_counter()
+
+    kwargs = {}
+    for arg, type_ in constructor.__annotations__.items():
+        if arg not in ("app", "return"):
+            kwargs[arg] = type_()
+
+    router = bench_startup.Router()
+    constructor(router, **kwargs)
+    done = time.perf_counter()
+
+    assert len(router.routes) == bench_startup.CLASSES * bench_startup.HANDLERS
+    return resolved - start, done - resolved
+
+
+def measure(path: Optional[str], before: Callable[[], Any] = lambda: None) -> List[Tuple[float, float]]:
+    runs = []
+    for _ in range(RUNS):
+        before()
+        bp = fresh()
+        if path is not None:
+            bp.snapshot(path)
+        runs.append(register(bp))
+
+    return runs
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, f"{MODULE}.py"), "w") as f:
+            f.write(bench_startup.source())
+        sys.path.insert(0, tmp)
+
+        path = os.path.join(tmp, "routes.snapshot")
+
+        def remove() -> None:
+            if os.path.exists(path):
+                os.remove(path)
+
+        results = [
+            ("no snapshot", measure(None)),
+            ("writing a snapshot", measure(path, remove)),
+            ("loading a snapshot", measure(path)),
+        ]
+
+    print(f"{bench_startup.CLASSES * bench_startup.HANDLERS} handlers, median of {RUNS} runs")
+    print(f"  {'':<20} {'Blueprint.jab':>14} {'constructor':>14}")
+    for name, runs in results:
+        jab = statistics.median(run[0] for run in runs)
+        constructor = statistics.median(run[1] for run in runs)
+        print(f"  {name:<20} {1e3 * jab:11.2f} ms {1e3 * constructor:11.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Time taken by `Blueprint.jab` and its constructor to register a blueprint of 1,000 handlers
+spread across 100 handler classes that share 20 dependencies.
+
+    python bench/bench_startup.py
+"""
+import sys
+import time
+import types
+from typing import Any, List
+
+from eggman import Blueprint
+from eggman.types import Handler, WebSocketHandler
+
+CLASSES = 100
+HANDLERS = 10
+DEPENDENCIES = 20
+DEPS_PER_CLASS = 5
+
+
+class Router:
+    def __init__(self) -> None:
+        self.routes: List[str] = []
+
+    def add_route(self, fn: Handler, rule: str, **options: Any) -> None:
+        self.routes.append(rule)
+
+    def add_websocket_route(self, fn: WebSocketHandler, rule: str, **options: Any) -> None:
+        self.routes.append(rule)
+
+
+def source() -> str:
+    lines = ["from eggman import Blueprint, PlainTextResponse", "bp = Blueprint('bench')"]
+
+    for d in range(DEPENDENCIES):
+        lines.append(f"class Dep{d}:\n    pass")
+
+    for c in range(CLASSES):
+        deps = [(c + i) % DEPENDENCIES for i in range(DEPS_PER_CLASS)]
+        args = ", ".join(f"d{d}: Dep{d}" for d in deps)
+        lines.append(f"class Handler{c}:\n    def __init__(self, {args}) -> None:\n        pass")
+        for h in range(HANDLERS):
+            lines.append(
+                f"    @bp.route('/c{c}/h{h}')\n"
+                f"    async def handler{h}(self, req):\n"
+                f"        return PlainTextResponse('')"
+            )
+
+    return "\n".join(lines)
+
+
+def build() -> types.ModuleType:
+    module = types.ModuleType("eggman_bench_handlers")
+    sys.modules[module.__name__] = module
+    exec(compile(source(), module.__name__, "exec"), module.__dict__)
+    return module
+
+
+def main() -> None:
+    module = build()
+    bp: Blueprint = module.bp  # type: ignore
+
+    start = time.perf_counter()
+    constructor = bp.jab
+    hoisted = time.perf_counter()
+
+    kwargs = {}
+    for arg, type_ in constructor.__annotations__.items():
+        if arg not in ("app", "return"):
+            kwargs[arg] = type_()
+
+    router = Router()
+    constructor(router, **kwargs)
+    done = time.perf_counter()
+
+    assert len(router.routes) == CLASSES * HANDLERS
+    assert len(kwargs) == DEPENDENCIES
+
+    print(f"handlers:     {len(router.routes)}")
+    print(f"hoisted deps: {len(kwargs)}")
+    print(f"Blueprint.jab {1e3 * (hoisted - start):8.2f} ms")
+    print(f"constructor   {1e3 * (done - hoisted):8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
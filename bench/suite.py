@@ -0,0 +1,390 @@
+"""
+In-process benchmark suite for eggman's registration and dispatch.
+
+Every case drives `Server.asgi` directly with synthetic ASGI scopes, so no sockets, client or
+server process are involved and results only reflect eggman and Starlette. The cases cover:
+
+    dispatch   request latency against the number of registered routes, Starlette's router or
+               the compiled one
+    nesting    registration time and request latency against the depth of mounted blueprints
+    handlers   synchronous handlers, offloaded to the threadpool, against coroutine handlers
+    json       JSON responses of growing payload sizes
+    websocket  per-message latency of a websocket echo handler
+    startup    `Blueprint.jab` and its constructor for growing numbers of function and class handlers
+
+Results are written as JSON, to stdout or to `--output`, with the commit they were measured at.
+Passing an earlier result file as `--compare` prints the change of every case, and with
+`--threshold` exits with status 1 when any case got slower by more than that fraction.
+
+    python bench/suite.py --output before.json
+    python bench/suite.py --compare before.json --threshold 0.1
+    python bench/suite.py --case dispatch --case json --quick
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from starlette.types import Message, Scope
+from starlette.websockets import WebSocketDisconnect
+
+import bench_startup
+from eggman import Blueprint, JSONResponse, PlainTextResponse, Request, Response, Server, WebSocket
+
+# Which case a result belongs to, the parameters it was measured with and its timings.
+Result = Dict[str, Any]
+Case = Callable[[argparse.Namespace], Iterator[Result]]
+
+CASES: Dict[str, Case] = {}
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def case(name: str) -> Callable[[Case], Case]:
+    def register(fn: Case) -> Case:
+        CASES[name] = fn
+        return fn
+
+    return register
+
+
+def plain(request: Request) -> Response:
+    return PlainTextResponse("ok")
+
+
+async def plain_async(request: Request) -> Response:
+    return PlainTextResponse("ok")
+
+
+async def echo(websocket: WebSocket) -> None:
+    await websocket.accept()
+    try:
+        while True:
+            await websocket.send_text(await websocket.receive_text())
+    except WebSocketDisconnect:
+        pass
+
+
+def http_scope(path: str) -> Scope:
+    return {
+        "type": "http",
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench")],
+        "server": ("bench", 80),
+        "client": ("127.0.0.1", 1234),
+    }
+
+
+async def receive() -> Message:
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+class Sink:
+    """
+    `Sink` is the ASGI `send` of a benchmark, checking the status and counting the body bytes.
+    """
+
+    def __init__(self) -> None:
+        self.status = 0
+        self.bytes = 0
+
+    async def __call__(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.status = message["status"]
+        else:
+            self.bytes += len(message.get("body") or message.get("text") or b"")
+
+
+def measure(
+    loop: asyncio.AbstractEventLoop, request: Callable[[], Any], number: int, repeat: int
+) -> Dict[str, float]:
+    """
+    Times `repeat` rounds of `number` awaited calls of `request`, returning per-call statistics of
+    the rounds in microseconds.
+    """
+
+    async def rounds() -> List[float]:
+        await request()  # warm up caches and lazily built state
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                await request()
+            timings.append((time.perf_counter() - start) / number * 1e6)
+        return timings
+
+    timings = loop.run_until_complete(rounds())
+    return summarize(timings)
+
+
+def summarize(timings: List[float]) -> Dict[str, float]:
+    return {
+        "median": statistics.median(timings),
+        "min": min(timings),
+        "stdev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        "rounds": len(timings),
+    }
+
+
+def serve(server: Server, path: str) -> Callable[[], Any]:
+    scope = http_scope(path)
+
+    async def request() -> None:
+        sink = Sink()
+        await server.asgi(dict(scope), receive, sink)
+        assert sink.status == 200, (path, sink.status)
+
+    return request
+
+
+def result(name: str, params: Dict[str, Any], unit: str, stats: Dict[str, float]) -> Result:
+    return {"case": name, "params": params, "unit": unit, **stats}
+
+
+@case("dispatch")
+def dispatch(options: argparse.Namespace) -> Iterator[Result]:
+    loop = asyncio.new_event_loop()
+    for compiled in (False, True):
+        for routes in (10, 100, 1000) if options.quick else (10, 100, 1000, 5000):
+            server = Server(compiled_router=compiled)
+            for i in range(routes):
+                server.add_route(plain_async, f"/svc{i % 50}/v{i // 50}/items/{{item_id:int}}/detail{i}")
+            loop.run_until_complete(server.on_start())
+
+            last = routes - 1
+            path = f"/svc{last % 50}/v{last // 50}/items/42/detail{last}"
+            stats = measure(loop, serve(server, path), options.number, options.repeat)
+            yield result("dispatch", {"routes": routes, "compiled": compiled}, "us/request", stats)
+
+
+def chain(depth: int, routes: int) -> Tuple[Blueprint, str]:
+    """
+    Builds `depth` blueprints, each mounting the next, with `routes` routes each, returning the root
+    and the path of the last route of the innermost blueprint.
+    """
+    blueprints = [Blueprint(f"b{level}") for level in range(depth)]
+    for bp in blueprints:
+        for i in range(routes):
+            bp.route(f"/r{i}")(plain_async)
+
+    for outer, inner in zip(blueprints, blueprints[1:]):
+        outer.mount(inner)
+
+    path = "".join(bp.url_prefix for bp in blueprints) + f"/r{routes - 1}"
+    return blueprints[0], path
+
+
+@case("nesting")
+def nesting(options: argparse.Namespace) -> Iterator[Result]:
+    loop = asyncio.new_event_loop()
+    for depth in (1, 4, 16):
+        registration = []
+        for _ in range(options.repeat):
+            root, path = chain(depth, 20)
+            server = Server()
+            start = time.perf_counter()
+            root.jab(server)
+            registration.append((time.perf_counter() - start) * 1e6)
+
+        params = {"depth": depth, "routes": depth * 20}
+        yield result("nesting.register", params, "us", summarize(registration))
+
+        stats = measure(loop, serve(server, path), options.number, options.repeat)
+        yield result("nesting.dispatch", params, "us/request", stats)
+
+
+@case("handlers")
+def handlers(options: argparse.Namespace) -> Iterator[Result]:
+    loop = asyncio.new_event_loop()
+    server = Server()
+    server.add_route(plain, "/sync")
+    server.add_route(plain_async, "/async")
+
+    for kind in ("sync", "async"):
+        stats = measure(loop, serve(server, f"/{kind}"), options.number, options.repeat)
+        yield result("handlers", {"handler": kind}, "us/request", stats)
+
+
+@case("json")
+def payloads(options: argparse.Namespace) -> Iterator[Result]:
+    loop = asyncio.new_event_loop()
+    server = Server()
+    sizes = (10, 1000) if options.quick else (10, 1000, 10000)
+
+    for size in sizes:
+        payload = [
+            {"id": i, "name": f"user-{i}", "score": i * 0.5, "tags": ["a", "b"], "active": True}
+            for i in range(size)
+        ]
+
+        async def render(request: Request, payload: Any = payload) -> Response:
+            return JSONResponse(payload)
+
+        server.add_route(render, f"/json/{size}")
+
+    for size in sizes:
+        number = max(1, options.number * 10 // size)
+        stats = measure(loop, serve(server, f"/json/{size}"), number, options.repeat)
+        yield result("json", {"items": size}, "us/request", stats)
+
+
+@case("websocket")
+def websocket(options: argparse.Namespace) -> Iterator[Result]:
+    loop = asyncio.new_event_loop()
+    server = Server()
+    server.add_websocket_route(echo, "/echo")
+    messages = options.number
+    scope = {**http_scope("/echo"), "type": "websocket", "scheme": "ws", "subprotocols": []}
+    scope.pop("method")
+
+    async def session() -> None:
+        inbox = [{"type": "websocket.connect"}]
+        inbox += [{"type": "websocket.receive", "text": f"message {i}"} for i in range(messages)]
+        inbox.append({"type": "websocket.disconnect", "code": 1000})
+        inbox.reverse()
+        sent = []
+
+        async def receive_() -> Message:
+            return inbox.pop()
+
+        async def send_(message: Message) -> None:
+            sent.append(message)
+
+        await server.asgi(dict(scope), receive_, send_)
+        assert len(sent) == messages + 1, len(sent)
+
+    # One round is one session of `number` messages, reported per message.
+    stats = measure(loop, session, 1, options.repeat)
+    stats = {k: v / messages if k != "rounds" else v for k, v in stats.items()}
+    yield result("websocket", {"messages": messages}, "us/message", stats)
+
+
+@case("startup")
+def startup(options: argparse.Namespace) -> Iterator[Result]:
+    for count in (100, 1000):
+        timings = []
+        for _ in range(options.repeat):
+            bp = Blueprint("startup")
+            for i in range(count):
+                bp.route(f"/r{i}")(plain_async)
+
+            start = time.perf_counter()
+            bp.jab(Server())
+            timings.append((time.perf_counter() - start) * 1e3)
+
+        yield result("startup.functions", {"handlers": count}, "ms", summarize(timings))
+
+    timings = []
+    for _ in range(options.repeat):
+        bp = bench_startup.build().bp  # type: ignore
+        start = time.perf_counter()
+        constructor = bp.jab
+        deps = constructor.__annotations__.items()
+        kwargs = {arg: type_() for arg, type_ in deps if arg not in ("app", "return")}
+        constructor(Server(), **kwargs)
+        timings.append((time.perf_counter() - start) * 1e3)
+
+    handlers = bench_startup.CLASSES * bench_startup.HANDLERS
+    yield result("startup.classes", {"handlers": handlers}, "ms", summarize(timings))
+
+
+def commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=HERE, capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+    return out.stdout.strip()
+
+
+def key(entry: Result) -> str:
+    params = ",".join(f"{k}={v}" for k, v in sorted(entry["params"].items()))
+    return f"{entry['case']}[{params}]"
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: Optional[float]) -> bool:
+    """
+    Prints the change of every case measured in both runs, returning False if any got slower by
+    more than `threshold`.
+    """
+    before = {key(entry): entry for entry in baseline["results"]}
+    ok = True
+
+    print(f"{'case':<52} {'before':>12} {'after':>12} {'change':>8}", file=sys.stderr)
+    for entry in current["results"]:
+        old = before.get(key(entry))
+        if old is None:
+            continue
+
+        change = entry["median"] / old["median"] - 1
+        flag = ""
+        if threshold is not None and change > threshold:
+            ok = False
+            flag = "  slower"
+
+        print(
+            f"{key(entry):<52} {old['median']:>12.2f} {entry['median']:>12.2f} {change:>+8.1%}{flag}",
+            file=sys.stderr,
+        )
+
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--case", action="append", choices=sorted(CASES), help="cases to run, all by default")
+    parser.add_argument("--number", type=int, default=1000, help="calls per round")
+    parser.add_argument("--repeat", type=int, default=7, help="rounds per measurement")
+    parser.add_argument("--quick", action="store_true", help="fewer and smaller parameters")
+    parser.add_argument("--output", help="file to write the results to instead of stdout")
+    parser.add_argument("--compare", help="earlier results to compare against")
+    parser.add_argument("--threshold", type=float, help="fail when a case slowed down by more than this")
+    options = parser.parse_args()
+
+    results = []
+    for name in options.case or CASES:
+        for entry in CASES[name](options):
+            print(f"{key(entry):<52} {entry['median']:>12.2f} {entry['unit']}", file=sys.stderr)
+            results.append(entry)
+
+    report = {
+        "commit": commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "number": options.number,
+        "repeat": options.repeat,
+        "results": results,
+    }
+
+    if options.output:
+        with open(options.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if options.compare:
+        with open(options.compare) as f:
+            baseline = json.load(f)
+
+        if not compare(baseline, report, options.threshold):
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,26 @@
-from eggman.alias import (
-    FileResponse,
-    HTMLResponse,
-    JSONResponse,
-    PlainTextResponse,
-    RedirectResponse,
-    Request,
-    Response,
-    StreamingResponse,
-    UJSONResponse,
-    WebSocket,
-)
-from eggman.blueprint import Blueprint
-from eggman.server import Server
-from eggman.types import BlueprintAlreadyInvoked
+"""
+The names exported here are imported from their modules on first access, so that importing
+`eggman`, or only the parts of it a process uses, does not pay for Starlette and uvicorn up front.
+"""
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:  # pragma: no cover
+    from eggman.alias import (
+        HTMLResponse,
+        PlainTextResponse,
+        RedirectResponse,
+        Request,
+        Response,
+        UJSONResponse,
+        WebSocket,
+    )
+    from eggman.blueprint import Blueprint
+    from eggman.lazy import LazyHandler
+    from eggman.responses import JSONResponse, StreamingJSONResponse, StreamingResponse
+    from eggman.server import Server
+    from eggman.static import FileResponse, StaticFiles
+    from eggman.types import BlueprintAlreadyInvoked
 
 __all__ = [
     "Blueprint",
@@ -26,6 +34,42 @@ __all__ = [
     "UJSONResponse",
     "RedirectResponse",
     "StreamingResponse",
+    "StreamingJSONResponse",
     "FileResponse",
+    "StaticFiles",
+    "LazyHandler",
     "BlueprintAlreadyInvoked",
 ]
+
+_EXPORTS = {
+    "Blueprint": "eggman.blueprint",
+    "Server": "eggman.server",
+    "Request": "eggman.alias",
+    "Response": "eggman.alias",
+    "WebSocket": "eggman.alias",
+    "HTMLResponse": "eggman.alias",
+    "PlainTextResponse": "eggman.alias",
+    "JSONResponse": "eggman.responses",
+    "UJSONResponse": "eggman.alias",
+    "RedirectResponse": "eggman.alias",
+    "StreamingResponse": "eggman.responses",
+    "StreamingJSONResponse": "eggman.responses",
+    "FileResponse": "eggman.static",
+    "StaticFiles": "eggman.static",
+    "LazyHandler": "eggman.lazy",
+    "BlueprintAlreadyInvoked": "eggman.types",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module 'eggman' has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted([*globals(), *__all__])
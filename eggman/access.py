@@ -0,0 +1,307 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import socket
+import struct
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Iterator, List, NamedTuple, Optional, Union
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from eggman.metrics import WARM_UP, _size, _status
+
+JSON = "json"
+BINARY = "binary"
+
+# The fixed size head of a binary record: time, status, latency, request and response body bytes,
+# followed by the lengths of the method, blueprint and rule, which follow the head in UTF-8.
+_HEAD = struct.Struct("<dHfIIBHH")
+
+
+class Record(NamedTuple):
+    time: float
+    method: str
+    blueprint: str
+    rule: str
+    status: int
+    latency: float
+    bytes_in: int
+    bytes_out: int
+
+
+def encode_json(records: List[Record]) -> bytes:
+    lines = [json.dumps(record._asdict(), separators=(",", ":")) for record in records]
+    return "".join(line + "\n" for line in lines).encode()
+
+
+def encode_binary(records: List[Record]) -> bytes:
+    chunks = []
+    for record in records:
+        method = record.method.encode()
+        blueprint = record.blueprint.encode()
+        rule = record.rule.encode()
+        chunks.append(
+            _HEAD.pack(
+                record.time,
+                record.status,
+                record.latency,
+                min(record.bytes_in, 0xFFFFFFFF),
+                min(record.bytes_out, 0xFFFFFFFF),
+                len(method),
+                len(blueprint),
+                len(rule),
+            )
+        )
+        chunks += [method, blueprint, rule]
+
+    return b"".join(chunks)
+
+
+def decode_binary(data: bytes) -> Iterator[Record]:
+    """
+    Decodes the records of an access log written in the binary format.
+    """
+    offset = 0
+    while offset < len(data):
+        at, status, latency, bytes_in, bytes_out, *lengths = _HEAD.unpack_from(data, offset)
+        offset += _HEAD.size
+
+        fields = []
+        for length in lengths:
+            fields.append(data[offset : offset + length].decode())
+            offset += length
+
+        method, blueprint, rule = fields
+        yield Record(at, method, blueprint, rule, status, latency, bytes_in, bytes_out)
+
+
+ENCODERS = {JSON: encode_json, BINARY: encode_binary}
+
+
+class AccessLog:
+    """
+    `AccessLog` records a line per request to the routes it wraps, with the blueprint name, the rule
+    template, the method, the status, the latency and the body sizes of the request and response.
+
+    The request path only stores the record in a ring buffer of `capacity` preallocated slots and
+    never blocks: once the buffer is full, records are dropped and counted in `dropped` until it is
+    drained. A background task drains it every `interval` seconds, or as soon as `batch_size`
+    records are waiting, handing each batch to a writer thread that encodes it and writes it out.
+    Only one in every `sample` requests is recorded, counted in `skipped` otherwise, except for the
+    requests answered with a 5xx, which are always recorded.
+
+    `target` is where the log is written: `-` for stdout, `unix:` followed by the path of a Unix
+    stream socket, or the path of a file to append to. A socket that fails is reconnected on the
+    next batch and the records of the batch that failed are counted in `failed`. Records are
+    written as JSON lines, or with `format` set to `binary` as packed records that
+    `decode_binary` reads back.
+
+    An `AccessLog` is attached to every route of an `eggman.Server` through its `access_log`, either
+    as an instance or as its `target`. The server flushes it once it has stopped serving, and exports
+    its counters with its metrics when it has a `metrics_path`; otherwise call `stop`.
+    """
+
+    def __init__(
+        self,
+        target: str = "-",
+        format: str = JSON,
+        capacity: int = 65536,
+        batch_size: int = 1024,
+        interval: float = 0.5,
+        sample: int = 1,
+    ) -> None:
+        if format not in ENCODERS:
+            raise ValueError(f"unknown access log format {format!r}")
+
+        self.target = target
+        self.format = format
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.interval = interval
+        self.sample = max(1, sample)
+
+        # `logged` and `failed` are only updated by the writer thread, the others by the event loop.
+        self.logged = 0
+        self.failed = 0
+        self.dropped = 0
+        self.skipped = 0
+
+        self._ring: List[Optional[Record]] = [None] * capacity
+        # Records ever written to and drained from the ring, the slot of a record being its count
+        # modulo the capacity.
+        self._head = 0
+        self._tail = 0
+        self._seen = 0
+
+        self._task: Optional[asyncio.Future] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self._sink: Union[IO[bytes], socket.socket, None] = None
+
+    @classmethod
+    def from_option(cls, option: Union[AccessLog, str]) -> AccessLog:
+        if isinstance(option, AccessLog):
+            return option
+
+        return cls(target=option)
+
+    @property
+    def pending(self) -> int:
+        return self._head - self._tail
+
+    def wrap(self, app: ASGIApp, blueprint: str, rule: str) -> ASGIApp:
+        clock = time.perf_counter
+
+        async def logged(scope: Scope, receive: Receive, send: Send) -> None:
+            if scope["type"] != "http" or scope.get(WARM_UP):
+                await app(scope, receive, send)
+                return
+
+            status = 500
+            bytes_in = 0
+            bytes_out = 0
+
+            async def receive_() -> Message:
+                nonlocal bytes_in
+                message = await receive()
+                bytes_in += _size(message)
+                return message
+
+            async def send_(message: Message) -> None:
+                nonlocal status, bytes_out
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                else:
+                    bytes_out += _size(message)
+                await send(message)
+
+            start = clock()
+            try:
+                await app(scope, receive_, send_)
+            except BaseException as e:
+                status = _status(e)
+                raise
+            finally:
+                latency = clock() - start
+                self.record(
+                    Record(
+                        time.time(), scope["method"], blueprint, rule, status, latency, bytes_in, bytes_out
+                    )
+                )
+
+        return logged
+
+    def record(self, record: Record) -> None:
+        self._seen += 1
+        if self._seen % self.sample and record.status < 500:
+            self.skipped += 1
+            return
+
+        if self._head - self._tail >= self.capacity:
+            self.dropped += 1
+            return
+
+        self._ring[self._head % self.capacity] = record
+        self._head += 1
+
+        if self._task is None:
+            self.start()
+        elif self._head - self._tail >= self.batch_size:
+            self._wake.set()  # type: ignore
+
+    def start(self) -> None:
+        """
+        Starts draining the ring on the running event loop, which `record` does on its first record.
+        """
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.ensure_future(self._drain())
+
+    async def _drain(self) -> None:
+        assert self._wake is not None
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+            self._wake.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        """
+        Writes out every record in the ring.
+        """
+        while self._head != self._tail:
+            head, tail = min(self._head, self._tail + self.batch_size), self._tail
+            # Every slot from the tail up to the head holds a record.
+            batch: List[Record] = [self._ring[i % self.capacity] for i in range(tail, head)]  # type: ignore
+            for i in range(tail, head):
+                self._ring[i % self.capacity] = None
+            self._tail = head
+
+            loop = asyncio.get_event_loop()
+            self._writer = self._writer or ThreadPoolExecutor(1, thread_name_prefix="eggman-access-log")
+            await loop.run_in_executor(self._writer, self._write, batch)
+
+    async def stop(self) -> None:
+        """
+        Stops the background task, writes out every record left in the ring and closes the target.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        await self.flush()
+        if self._writer is not None:
+            await asyncio.get_event_loop().run_in_executor(self._writer, self._close)
+            self._writer.shutdown()
+            self._writer = None
+
+    def _write(self, batch: List[Record]) -> None:
+        data = ENCODERS[self.format](batch)  # type: ignore
+        try:
+            sink = self._open()
+            if isinstance(sink, socket.socket):
+                sink.sendall(data)
+            else:
+                sink.write(data)
+                sink.flush()
+        except OSError:
+            self.failed += len(batch)
+            self._close()
+            return
+
+        self.logged += len(batch)
+
+    def _open(self) -> Union[IO[bytes], socket.socket]:
+        if self._sink is not None:
+            return self._sink
+
+        sink: Union[IO[bytes], socket.socket]
+        if self.target == "-":
+            sink = sys.stdout.buffer
+        elif self.target.startswith("unix:"):
+            sink = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sink.connect(self.target[len("unix:") :])
+            except OSError:
+                sink.close()
+                raise
+        else:
+            sink = open(self.target, "ab")
+
+        self._sink = sink
+        return sink
+
+    def _close(self) -> None:
+        sink, self._sink = self._sink, None
+        if sink is not None and sink is not sys.stdout.buffer:
+            sink.close()
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    TypeVar,
+    Union,
+)
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+# What a batch function returns: a value per key, in the order of the keys, or a mapping from the
+# keys to their values. A value that is an exception is raised for the keys it belongs to alone.
+Results = Union[Sequence[V], Mapping[K, V]]
+
+_MISSING = object()
+
+
+class Batcher(Generic[K, V]):
+    """
+    `Batcher` gathers the keys requested through `get` by concurrent requests and loads them with a
+    single call of `load`, handing each caller back the value of its own key.
+
+    A batch is loaded `window` seconds after its first key was requested, or at once when it reaches
+    `max_batch` distinct keys. Callers asking for the same key share its value. Either pass the batch
+    function as `load` or subclass `Batcher` and override the method of the same name, which lets
+    the subclass declare its own dependencies, such as a `eggman.pools.Pool`, to the jab harness.
+
+    `load` returns a value for every key, in the order of the keys, or a mapping from the keys to
+    their values, in which case callers of a key it lacks get a KeyError. A value that is an
+    exception is raised in the callers of its key, and an exception raised by `load` in every
+    caller of the batch.
+
+    The methods of a class can be batched with the `batched` decorator instead, so that the handler
+    classes depending on the class through `Blueprint.jab` keep calling them one key at a time.
+    """
+
+    def __init__(
+        self,
+        load: Optional[Callable[[List[K]], Awaitable[Results]]] = None,
+        max_batch: int = 100,
+        window: float = 0.001,
+        name: Optional[str] = None,
+    ) -> None:
+        self._load = load
+        self.max_batch = max_batch
+        self.window = window
+        self.name = name or type(self).__name__
+
+        self.batches = 0
+        self.loaded = 0
+
+        # The futures of the callers of each key of the batch being gathered, in request order.
+        self._pending: Dict[K, List[asyncio.Future[V]]] = {}
+        self._timer: Optional[asyncio.Handle] = None
+
+    @property
+    def jab(self) -> Callable:
+        """
+        Provides a jab constructor to incorporate an already instantiated Batcher object.
+        """
+
+        def constructor() -> Batcher:
+            return self
+
+        constructor.__annotations__["return"] = type(self)
+        return constructor
+
+    async def load(self, keys: List[K]) -> Results:
+        if self._load is None:
+            raise NotImplementedError(f"{self.name} has no load")
+
+        return await self._load(keys)
+
+    async def get(self, key: K) -> V:
+        loop = asyncio.get_event_loop()
+        future: asyncio.Future[V] = loop.create_future()
+        self._pending.setdefault(key, []).append(future)
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            if self.window > 0:
+                self._timer = loop.call_later(self.window, self._flush)
+            else:
+                self._timer = loop.call_soon(self._flush)
+
+        return await future
+
+    async def get_many(self, keys: Iterable[K]) -> List[V]:
+        return list(await asyncio.gather(*(self.get(key) for key in keys)))
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        if self._pending:
+            pending, self._pending = self._pending, {}
+            asyncio.ensure_future(self._dispatch(pending))
+
+    async def _dispatch(self, pending: Dict[K, List[asyncio.Future]]) -> None:
+        keys = list(pending)
+        self.batches += 1
+        self.loaded += len(keys)
+
+        try:
+            results = await self.load(keys)
+            if isinstance(results, Mapping):
+                values = [results.get(key, _MISSING) for key in keys]
+            else:
+                values = list(results)
+                if len(values) != len(keys):
+                    raise ValueError(f"{self.name} loaded {len(values)} values for {len(keys)} keys")
+        except Exception as e:
+            for futures in pending.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+
+        for key, value in zip(keys, values):
+            for future in pending[key]:
+                if future.done():
+                    continue
+
+                if value is _MISSING:
+                    future.set_exception(KeyError(key))
+                elif isinstance(value, Exception):
+                    future.set_exception(value)
+                else:
+                    future.set_result(value)
+
+
+class batched:
+    """
+    `batched` turns a method loading a list of keys into a method loading a single key, whose
+    concurrent calls on an instance are gathered by that instance's `Batcher`, created with
+    `options`. The batcher itself is the `batcher` attribute of the returned method.
+
+        class Database:
+            @batched(window=0.002)
+            async def get_user(self, names: List[str]) -> Dict[str, dict]:
+                rows = await self.connection.fetch("SELECT * FROM users WHERE user_name = ANY($1)", names)
+                return {row["user_name"]: dict(row) for row in rows}
+
+        user = await database.get_user("eggman")
+    """
+
+    def __init__(self, **options: Any) -> None:
+        self.options = options
+        self.fn: Optional[Callable] = None
+        self.name = ""
+
+    def __call__(self, fn: Callable) -> batched:
+        self.fn = fn
+        self.name = fn.__name__
+        functools.update_wrapper(self, fn)  # type: ignore
+        return self
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+
+    def __get__(self, instance: Any, owner: type) -> Any:
+        if instance is None:
+            return self
+
+        assert self.fn is not None
+        batcher: Batcher = Batcher(
+            functools.partial(self.fn, instance), name=f"{owner.__name__}.{self.name}", **self.options
+        )
+
+        @functools.wraps(self.fn)
+        async def get(key: Any) -> Any:
+            return await batcher.get(key)
+
+        get.batcher = batcher  # type: ignore
+
+        # Cached on the instance, which shadows this non-data descriptor from then on.
+        instance.__dict__[self.name] = get
+        return get
@@ -1,17 +1,27 @@
 from __future__ import annotations
 
-from typing import Any, Callable, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Union
 
 from typing_extensions import Protocol
 
+from eggman import snapshot
 from eggman.types import (
     BlueprintAlreadyInvoked,
     Handler,
     HandlerPkg,
+    RouteTable,
     UnboundMethodConstructor,
     WebSocketHandler,
 )
 
+if TYPE_CHECKING:  # pragma: no cover
+    from eggman.body import BodyParser
+    from eggman.compression import Compressor
+    from eggman.executors import ExecutorOption
+    from eggman.lazy import LazyHandler
+    from eggman.limits import ConcurrencyLimit
+    from eggman.static import StaticFiles
+
 
 class Router(Protocol):
     def add_route(self, fn: Handler, rule: str, **options: Any) -> None:
@@ -29,10 +39,34 @@ class Blueprint:
         host: Optional[str] = None,
         version: Optional[str] = None,
         strict_slashes: bool = False,
+        executor: Optional[ExecutorOption] = None,
+        concurrency: Optional[Union[ConcurrencyLimit, int]] = None,
+        compress: Optional[Union[Compressor, bool]] = None,
+        body: Optional[Union[BodyParser, int]] = None,
     ) -> None:
         """
         `Blueprint` is an object that records handler functions that will be registered to
         and served by a Server object later.
+
+        `host`, `version` and `strict_slashes` are passed along as the options of the same name
+        of every route and websocket declared on this blueprint: the routes are only served for
+        requests to `host`, only for requests selecting API `version`, through a `/v{version}`
+        path segment or an `Accept-Version` header, and, unless `strict_slashes` is set, both with
+        and without a trailing slash. See `eggman.routing.Dispatcher`. The routes of a mounted
+        blueprint that sets no `host` or `version` of its own inherit those of this blueprint.
+
+        `executor` is the default `executor` option of the routes declared on this blueprint,
+        see `eggman.executors`.
+
+        `concurrency` bounds the number of requests served at once across all of the http routes
+        declared on this blueprint, unless a route sets its own `concurrency` option. A fixed limit
+        is turned into a single `eggman.limits.ConcurrencyLimit` shared by those routes.
+
+        `compress` is the default `compress` option of the routes declared on this blueprint, which
+        share a single `eggman.compression.Compressor` and its cache. See `eggman.compression`.
+
+        `body` is the default `body` option of the routes declared on this blueprint, limiting the
+        size of their request bodies and configuring how they are parsed. See `eggman.body`.
         """
 
         self.name = name
@@ -48,11 +82,59 @@ class Blueprint:
         self.deferred_websocket: List[HandlerPkg] = []
         self._instances: Dict[str, Any] = {}
         self._mounted_blueprints: List[Blueprint] = []
+        self._snapshot: Optional[str] = None
+        self._defaults: Dict[str, Any] = {}
+        self._dispatch: Dict[str, Any] = {"strict_slashes": strict_slashes}
+
+        if host is not None:
+            self._dispatch["host"] = host
+
+        if version is not None:
+            self._dispatch["version"] = version
+
+        if executor is not None:
+            self._defaults["executor"] = executor
+
+        # Blueprints are declared at import time, so the modules behind their options are only
+        # imported when an option is actually used.
+        if concurrency is not None:
+            from eggman.limits import ConcurrencyLimit
+
+            self._defaults["concurrency"] = ConcurrencyLimit.from_option(concurrency)
+
+        if compress:
+            from eggman.compression import Compressor
+
+            self._defaults["compress"] = Compressor.from_option(compress)
+
+        if body is not None:
+            from eggman.body import BodyParser
+
+            self._defaults["body"] = BodyParser.from_option(body)
 
     def mount(self, bp: Blueprint) -> None:
         self._mounted_blueprints.append(bp)
 
+    def _inherit(self, options: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Returns the options of a route moved up from a mounted blueprint, with this blueprint's
+        `host` and `version` unless the route has its own.
+        """
+        inherited = {k: v for k, v in self._dispatch.items() if k in ("host", "version")}
+        return {**inherited, **options}
+
+    def snapshot(self, path: str) -> None:
+        """
+        `snapshot` makes `jab` load this blueprint's resolved route table from the file at `path`
+        instead of resolving it again, as long as the file was written for the same set of handlers
+        and none of the source files it refers to have changed since. Otherwise the table is resolved
+        as usual and written to `path` for the next process to use. See `eggman.snapshot`.
+        """
+        self._snapshot = path
+
     def route(self, rule: str, **options: Any) -> Callable:
+        options = {"blueprint": self.name, **self._dispatch, **self._defaults, **options}
+
         def wrapper(fn: Handler) -> Handler:
             pkg = HandlerPkg(fn, rule, options)
             self.deferred_routes.append(pkg)
@@ -60,7 +142,50 @@ class Blueprint:
 
         return wrapper
 
+    def static(self, prefix: str, directory: str, **options: Any) -> StaticFiles:
+        """
+        `static` serves the files below `directory` under `prefix`, relative to the blueprint's
+        `url_prefix`, with GET and HEAD requests. Options are passed to `eggman.static.StaticFiles`
+        if it accepts them and are route options otherwise.
+        """
+        from eggman.static import StaticFiles
+
+        files_options = {k: options.pop(k) for k in ("precompressed", "max_age", "index") if k in options}
+        files = StaticFiles(directory, **files_options)
+
+        rule = prefix.rstrip("/") + "/{path:path}"
+        self.route(rule, methods=["GET", "HEAD"], **options)(files)
+        return files
+
+    def lazy(self, rule: str, target: str, **options: Any) -> LazyHandler:
+        """
+        `lazy` registers the handler function or ASGI app at the import path `target`, such as
+        `service.handlers:index`, for `rule` without importing it. The handler's module is imported on
+        the first request for `rule`, or in the background once the server starts when it was created
+        with `warm_up`. Only plain functions and ASGI apps can be loaded lazily, as the dependencies
+        of handler classes must be known when the blueprint is provided to the jab harness.
+        """
+        from eggman.lazy import LazyHandler
+
+        # Starlette only defaults the methods of function endpoints to GET.
+        options.setdefault("methods", ["GET"])
+        handler = LazyHandler(target)
+        self.route(rule, **options)(handler)
+        return handler
+
+    def lazy_websocket(self, rule: str, target: str, **options: Any) -> LazyHandler:
+        """
+        `lazy_websocket` is `lazy` for a websocket handler.
+        """
+        from eggman.lazy import LazyHandler
+
+        handler = LazyHandler(target, websocket=True)
+        self.websocket(rule, **options)(handler)
+        return handler
+
     def websocket(self, rule: str, **options: Any) -> Callable:
+        options = {"blueprint": self.name, **self._dispatch, **options}
+
         def wrapper(fn: WebSocketHandler) -> WebSocketHandler:
             pkg = HandlerPkg(fn, rule, options)
             self.deferred_websocket.append(pkg)
@@ -96,7 +221,7 @@ class Blueprint:
             prefix = bp.url_prefix
             for route in bp.move_routes(f"{caller} => {self.name}"):
                 rule = prefix + route.rule
-                routes.append(HandlerPkg(route.fn, rule, route.options))
+                routes.append(HandlerPkg(route.fn, rule, self._inherit(route.options)))
 
         self.tombstone = True
         self.caller = caller
@@ -134,12 +259,9 @@ class Blueprint:
             prefix = bp.url_prefix
             for pkg in bp.move_routes(self.name):
                 rule = prefix + pkg.rule
-                self.deferred_routes.append(HandlerPkg(pkg.fn, rule, pkg.options))
+                self.deferred_routes.append(HandlerPkg(pkg.fn, rule, self._inherit(pkg.options)))
 
-        unbound_routes = UnboundMethodConstructor()
-        unbound_ws = UnboundMethodConstructor()
-        func_routes: List[HandlerPkg] = []
-        func_ws: List[HandlerPkg] = []
+        unbound_routes, unbound_ws, func_routes, func_ws = self._route_table()
 
         def constructor(app: Router, **kwargs) -> Blueprint:
             """
@@ -189,11 +311,44 @@ class Blueprint:
 
                 app.add_websocket_route(fn, uri, **options)
 
+            # Pools shared by the handler classes are started and monitored by the server.
+            add_pool = getattr(app, "add_pool", None)
+            if add_pool is not None:
+                from eggman.pools import Pool
+
+                for dependency in kwargs.values():
+                    if isinstance(dependency, Pool):
+                        add_pool(dependency)
+
             self.tombstone = True
             self.caller = "jab"
 
             return self
 
+        for arg, type_ in unbound_routes.deps.items():
+            constructor.__annotations__[arg] = type_
+
+        for arg, type_ in unbound_ws.deps.items():
+            constructor.__annotations__[arg] = type_
+
+        return constructor
+
+    def _route_table(self) -> RouteTable:
+        if self._snapshot is None:
+            return self._compile()
+
+        routes, websockets = self.deferred_routes, self.deferred_websocket
+        shape = snapshot.fingerprint(self.name, routes, websockets)
+        table = snapshot.load(self._snapshot, shape, routes, websockets)
+        if table is None:
+            table = self._compile()
+            snapshot.dump(self._snapshot, table, shape, routes, websockets)
+
+        return table
+
+    def _compile(self) -> RouteTable:
+        table = RouteTable(UnboundMethodConstructor(), UnboundMethodConstructor(), [], [])
+
         for fn, rule, options in self.deferred_routes:
             # HACK: Right now when parsing a deferred function handler we try to split its
             # qualified name into a class name and a method name. If we're unable to do so
@@ -201,22 +356,16 @@ class Blueprint:
             # to the list of raw functions with the understanding that it does not need to
             # have a class instance in order for the function to be called.
             try:
-                unbound_routes.add(fn, rule, **options)
+                table.routes.add(fn, rule, **options)
             except ValueError:
-                func_routes.append(HandlerPkg(fn, rule, options))
+                table.func_routes.append(HandlerPkg(fn, rule, options))
 
-        unbound_ws.update_offset(len(unbound_routes.deps))
+        table.websockets.update_offset(len(table.routes.deps))
         for fn, rule, options in self.deferred_websocket:
 
             try:
-                unbound_ws.add(fn, rule, **options)
+                table.websockets.add(fn, rule, **options)
             except ValueError:
-                func_ws.append(HandlerPkg(fn, rule, options))
+                table.func_websockets.append(HandlerPkg(fn, rule, options))
 
-        for arg, type_ in unbound_routes.deps.items():
-            constructor.__annotations__[arg] = type_
-
-        for arg, type_ in unbound_ws.deps.items():
-            constructor.__annotations__[arg] = type_
-
-        return constructor
+        return table
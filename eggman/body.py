@@ -0,0 +1,592 @@
+from __future__ import annotations
+
+import codecs
+import dataclasses
+import functools
+import json
+import re
+import tempfile
+from typing import IO, Any, AsyncIterator, Dict, List, Optional, Tuple, Type, Union, get_type_hints
+from urllib.parse import parse_qsl
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import FormData, Headers, UploadFile
+from starlette.exceptions import HTTPException
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from eggman.alias import PlainTextResponse, Request
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover
+    msgspec = None  # type: ignore
+
+# The scope key under which a route's `BodyParser` is found by the readers of this module.
+SCOPE_KEY = "eggman.body"
+
+# Bounds the headers of a single multipart part.
+MAX_PART_HEADERS = 16 * 1024
+
+_OPTION = re.compile(r';\s*([^=;\s]+)\s*=\s*("(?:[^"\\]|\\.)*"|[^;]*)')
+_NONE = type(None)
+
+
+def _no_factory(field: dataclasses.Field) -> bool:
+    # Typeshed declares `default_factory` as a method, which mypy refuses to read off an instance.
+    return getattr(field, "default_factory") is dataclasses.MISSING
+
+
+class BodyTooLarge(HTTPException):
+    def __init__(self, detail: str = "Request body is too large") -> None:
+        super().__init__(413, detail)
+
+
+class InvalidBody(HTTPException):
+    def __init__(self, detail: str) -> None:
+        super().__init__(400, detail)
+
+
+class BodyParser:
+    """
+    `BodyParser` reads the bodies of the requests to the routes it is attached to as they stream in,
+    rather than buffering them whole before decoding them.
+
+    Bodies are limited to `max_size` bytes: requests declaring a larger `Content-Length` are
+    answered with a 413 before their handler runs, and bodies that turn out to be larger while they
+    are read abort the handler with a 413.
+
+    Multipart forms are parsed as they arrive. Uploaded files are spooled in memory up to
+    `spool_size` bytes and then written to a temporary file in `directory`, or written straight to
+    disk when `spool_size` is 0. A form may have at most `max_fields` fields of at most
+    `max_field_size` bytes each and at most `max_files` files.
+
+    A `BodyParser` is attached through the `body` option of `Blueprint.route` or `Server.add_route`,
+    or to every route of a blueprint through `Blueprint(body=...)`, either as an instance or as a
+    maximum size. Handlers read bodies with `read_body`, `read_json`, `iter_json` and `read_form`,
+    which use the parser of the route and unlimited defaults elsewhere. The limit also applies to
+    bodies read through Starlette's own `Request` methods.
+    """
+
+    def __init__(
+        self,
+        max_size: Optional[int] = None,
+        spool_size: int = 1024 * 1024,
+        directory: Optional[str] = None,
+        max_fields: int = 1000,
+        max_field_size: int = 1024 * 1024,
+        max_files: int = 100,
+    ) -> None:
+        self.max_size = max_size
+        self.spool_size = spool_size
+        self.directory = directory
+        self.max_fields = max_fields
+        self.max_field_size = max_field_size
+        self.max_files = max_files
+
+    @classmethod
+    def from_option(cls, option: Union[BodyParser, int]) -> BodyParser:
+        if isinstance(option, BodyParser):
+            return option
+
+        return cls(max_size=int(option))
+
+    def wrap(self, app: ASGIApp) -> ASGIApp:
+        max_size = self.max_size
+
+        async def limited(scope: Scope, receive: Receive, send: Send) -> None:
+            if scope["type"] != "http":
+                await app(scope, receive, send)
+                return
+
+            scope[SCOPE_KEY] = self
+            if max_size is None:
+                await app(scope, receive, send)
+                return
+
+            length = Headers(scope=scope).get("content-length")
+            if length is not None and (not length.isdigit() or int(length) > max_size):
+                # The body is never read, so the connection cannot be reused.
+                if length.isdigit():
+                    response = PlainTextResponse("Request body is too large", status_code=413)
+                else:
+                    response = PlainTextResponse("Invalid Content-Length", status_code=400)
+                response.headers["connection"] = "close"
+                await response(scope, receive, send)
+                return
+
+            limit = max_size
+            received = 0
+
+            async def bounded() -> Message:
+                nonlocal received
+                message = await receive()
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise BodyTooLarge()
+                return message
+
+            await app(scope, bounded, send)
+
+        return limited
+
+    async def chunks(self, request: Request) -> AsyncIterator[bytes]:
+        size = 0
+        async for chunk in request.stream():
+            size += len(chunk)
+            if self.max_size is not None and size > self.max_size:
+                raise BodyTooLarge()
+
+            if chunk:
+                yield chunk
+
+    async def read(self, request: Request) -> bytes:
+        if hasattr(request, "_body"):
+            return request._body  # type: ignore
+
+        body = bytearray()
+        async for chunk in self.chunks(request):
+            body += chunk
+
+        # Cached the way Starlette does, so `request.body()` and friends keep working.
+        request._body = bytes(body)  # type: ignore
+        return request._body  # type: ignore
+
+    async def json(self, request: Request, into: Optional[Type] = None) -> Any:
+        body = await self.read(request)
+
+        if msgspec is not None:
+            try:
+                return msgspec.json.decode(body, type=Any if into is None else into)
+            except msgspec.DecodeError as e:
+                raise InvalidBody(str(e))
+
+        try:
+            value = orjson.loads(body) if orjson is not None else json.loads(body)
+        except ValueError as e:
+            raise InvalidBody(f"Invalid JSON: {e}")
+
+        return value if into is None else convert(value, into)
+
+    async def iter_json(self, request: Request, into: Optional[Type] = None) -> AsyncIterator[Any]:
+        sequence = _JSONSequence()
+        decoder = codecs.getincrementaldecoder("utf-8")()
+
+        try:
+            async for chunk in self.chunks(request):
+                for value in sequence.feed(decoder.decode(chunk), final=False):
+                    yield value if into is None else convert(value, into)
+
+            for value in sequence.feed(decoder.decode(b"", final=True), final=True):
+                yield value if into is None else convert(value, into)
+        except UnicodeDecodeError as e:
+            raise InvalidBody(f"Invalid JSON: {e}")
+
+    async def form(self, request: Request) -> FormData:
+        if hasattr(request, "_form"):
+            return request._form  # type: ignore
+
+        content_type, options = parse_options(request.headers.get("content-type", ""))
+        if content_type == "multipart/form-data":
+            boundary = options.get("boundary")
+            if not boundary:
+                raise InvalidBody("Missing multipart boundary")
+
+            parser = _Multipart(self, boundary.encode("latin-1"))
+            try:
+                async for chunk in self.chunks(request):
+                    await parser.feed(chunk)
+                parser.finish()
+            except BaseException:
+                parser.close()
+                raise
+
+            form = FormData(parser.items)
+        elif content_type == "application/x-www-form-urlencoded":
+            body = await self.read(request)
+            try:
+                fields = parse_qsl(
+                    body.decode("latin-1"), keep_blank_values=True, max_num_fields=self.max_fields
+                )
+            except ValueError as e:
+                raise InvalidBody(str(e))
+            form = FormData(fields)  # type: ignore
+        else:
+            form = FormData()
+
+        request._form = form  # type: ignore
+        return form
+
+
+_DEFAULT = BodyParser()
+
+
+def parser(request: Request) -> BodyParser:
+    return request.scope.get(SCOPE_KEY) or _DEFAULT
+
+
+async def read_body(request: Request) -> bytes:
+    """
+    Reads the whole body of `request` within the limit of its route.
+    """
+    return await parser(request).read(request)
+
+
+async def read_json(request: Request, into: Optional[Type] = None) -> Any:
+    """
+    Reads and decodes the JSON body of `request`. When `into` is given, such as a dataclass or a
+    `List` of them, the body is decoded into that type and a body that does not match is answered
+    with a 400. With msgspec installed the body is decoded straight into `into` in a single pass.
+    """
+    return await parser(request).json(request, into)
+
+
+def iter_json(request: Request, into: Optional[Type] = None) -> AsyncIterator[Any]:
+    """
+    Yields the values of a JSON array body, or of a body of whitespace separated values such as
+    NDJSON, as soon as each has arrived, so that a large body never has to be held whole.
+    """
+    return parser(request).iter_json(request, into)
+
+
+async def read_form(request: Request) -> FormData:
+    """
+    Parses a multipart or url-encoded form body as it arrives. Uploaded files are
+    `starlette.datastructures.UploadFile`s backed by temporary files, see `BodyParser`.
+    """
+    return await parser(request).form(request)
+
+
+def parse_options(value: str) -> Tuple[str, Dict[str, str]]:
+    """
+    Splits a header such as `Content-Type` or `Content-Disposition` into its lowercased value and
+    its parameters.
+    """
+    main, _, rest = value.partition(";")
+    options = {}
+    for name, option in _OPTION.findall(";" + rest):
+        if option.startswith('"'):
+            option = re.sub(r"\\(.)", r"\1", option[1:-1])
+        options[name.lower()] = option.strip()
+
+    return main.strip().lower(), options
+
+
+@functools.lru_cache(maxsize=None)
+def _hints(cls: Type) -> Dict[str, Any]:
+    return get_type_hints(cls)
+
+
+def convert(value: Any, into: Any, path: str = "$") -> Any:
+    """
+    Converts a decoded JSON `value` into the type `into`: dataclasses, `List`, `Dict`, `Optional`
+    and `Union` of them, and the JSON scalar types. `path` locates `value` in the body for errors.
+    """
+    if into is Any:
+        return value
+
+    origin = getattr(into, "__origin__", None)
+    if origin is Union:
+        if value is None and _NONE in into.__args__:
+            return None
+
+        for arg in into.__args__:
+            if arg is not _NONE:
+                try:
+                    return convert(value, arg, path)
+                except InvalidBody:
+                    continue
+
+        raise InvalidBody(f"Invalid value at {path}")
+
+    if origin is list:
+        if not isinstance(value, list):
+            raise InvalidBody(f"Expected an array at {path}")
+
+        (item,) = getattr(into, "__args__", None) or (Any,)
+        return [convert(v, item, f"{path}[{i}]") for i, v in enumerate(value)]
+
+    if origin is dict:
+        if not isinstance(value, dict):
+            raise InvalidBody(f"Expected an object at {path}")
+
+        _, item = getattr(into, "__args__", None) or (str, Any)
+        return {k: convert(v, item, f"{path}.{k}") for k, v in value.items()}
+
+    if isinstance(into, type) and dataclasses.is_dataclass(into):
+        if not isinstance(value, dict):
+            raise InvalidBody(f"Expected an object at {path}")
+
+        hints = _hints(into)
+        fields = {}
+        for field in dataclasses.fields(into):
+            if field.name in value:
+                fields[field.name] = convert(value[field.name], hints[field.name], f"{path}.{field.name}")
+            elif field.default is dataclasses.MISSING and _no_factory(field):
+                raise InvalidBody(f"Missing {path}.{field.name}")
+
+        return into(**fields)
+
+    if into is float and isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+
+    if isinstance(into, type):
+        if not isinstance(value, into) or (into is int and isinstance(value, bool)):
+            raise InvalidBody(f"Expected {into.__name__} at {path}")
+
+    return value
+
+
+class _JSONSequence:
+    """
+    `_JSONSequence` decodes a JSON array, or whitespace separated JSON values, one value at a time
+    from text fed to it in arbitrary pieces.
+
+    A value that is still incomplete at the end of a piece is only decoded again once the text
+    buffered for it has doubled, so that a single large value is decoded in linear rather than
+    quadratic time. Text that can no longer become valid JSON is rejected as soon as it is fed.
+    """
+
+    _WHITESPACE = re.compile(r"[ \t\n\r]*")
+    _NUMBER = re.compile(r"[0-9eE.+-]*")
+    _LITERALS = ("true", "false", "null", "NaN", "Infinity", "-Infinity")
+
+    def __init__(self) -> None:
+        self.decoder = json.JSONDecoder()
+        self.pending: List[str] = []
+        self.size = 0
+        self.retry_at = 0
+        self.array: Optional[bool] = None
+        self.expect = "value"
+        self.closed = False
+
+    def feed(self, text: str, final: bool) -> List[Any]:
+        self.pending.append(text)
+        self.size += len(text)
+        if self.size < self.retry_at and not final:
+            return []
+
+        text = "".join(self.pending)
+        values = []
+        pos = 0
+        self.retry_at = 0
+
+        while True:
+            pos = self._WHITESPACE.match(text, pos).end()  # type: ignore
+            if pos == len(text):
+                break
+
+            if self.closed:
+                raise InvalidBody("Unexpected data after the JSON array")
+
+            if self.array is None:
+                self.array = text[pos] == "["
+                if self.array:
+                    self.expect = "value or end"
+                    pos += 1
+                    continue
+
+            if self.array:
+                char = text[pos]
+                if char == "]" and self.expect != "value":
+                    self.closed = True
+                    pos += 1
+                    continue
+
+                if char == "," and self.expect == "separator":
+                    self.expect = "value"
+                    pos += 1
+                    continue
+
+                if self.expect == "separator":
+                    raise InvalidBody(f"Expected ',' or ']' in the JSON array, found {char!r}")
+
+            try:
+                value, end = self.decoder.raw_decode(text, pos)
+            except json.JSONDecodeError as e:
+                if final or not self._incomplete(text, e):
+                    raise InvalidBody(f"Invalid JSON: {e}")
+                # The value continues in the next pieces.
+                self.retry_at = 2 * (len(text) - pos)
+                break
+
+            if not final and (end == len(text) or self._continues(value, text, end)):
+                # A number or literal at the end of a piece may not be complete yet.
+                break
+
+            values.append(value)
+            pos = end
+            self.expect = "separator"
+
+        self.pending = [text[pos:]]
+        self.size = len(text) - pos
+        if final and self.array and not self.closed:
+            raise InvalidBody("Unterminated JSON array")
+
+        return values
+
+    def _incomplete(self, text: str, e: json.JSONDecodeError) -> bool:
+        """
+        Tells whether the text could still become valid JSON with more text.
+        """
+        if e.pos >= len(text) or e.msg.startswith("Unterminated string"):
+            return True
+
+        if e.msg.startswith("Invalid \\uXXXX escape") and len(text) - e.pos < 6:
+            return True
+
+        rest = text[e.pos :]
+        return any(literal.startswith(rest) for literal in self._LITERALS)
+
+    def _continues(self, value: Any, text: str, end: int) -> bool:
+        """
+        Tells whether the number decoded up to `end` may go on, such as `1` followed by `e`.
+        """
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return False
+
+        return self._NUMBER.match(text, end).end() == len(text)  # type: ignore
+
+
+class _Multipart:
+    """
+    `_Multipart` parses a `multipart/form-data` body fed to it in arbitrary pieces, writing each
+    part out as soon as it is known not to contain the next boundary.
+    """
+
+    def __init__(self, parser: BodyParser, boundary: bytes) -> None:
+        self.parser = parser
+        self.delimiter = b"\r\n--" + boundary
+        # The first boundary is not preceded by a line break of its own.
+        self.buffer = bytearray(b"\r\n")
+        self.state = "preamble"
+        self.items: List[Tuple[str, Union[str, UploadFile]]] = []
+        self.files: List[IO] = []
+        self.fields = 0
+        self.name = ""
+        self.field: Optional[bytearray] = None
+        self.upload: Optional[UploadFile] = None
+        self.written = 0
+
+    async def feed(self, data: bytes) -> None:
+        buffer = self.buffer
+        buffer += data
+
+        while True:
+            if self.state in ("preamble", "data"):
+                index = buffer.find(self.delimiter)
+                if index < 0:
+                    # Hold back what may be the start of a delimiter split across pieces.
+                    keep = len(self.delimiter) - 1
+                    if len(buffer) > keep:
+                        if self.state == "data":
+                            await self._write(buffer[:-keep])
+                        del buffer[:-keep]
+                    return
+
+                if self.state == "data":
+                    await self._write(buffer[:index])
+                    self._finish_part()
+
+                del buffer[: index + len(self.delimiter)]
+                self.state = "boundary"
+            elif self.state == "boundary":
+                if len(buffer) < 2:
+                    return
+
+                if buffer[:2] == b"--":
+                    self.state = "end"
+                    continue
+
+                self.state = "headers"
+            elif self.state == "headers":
+                index = buffer.find(b"\r\n\r\n")
+                if index < 0:
+                    if len(buffer) > MAX_PART_HEADERS:
+                        raise InvalidBody("Multipart part headers are too large")
+                    return
+
+                self._start_part(bytes(buffer[:index]))
+                del buffer[: index + 4]
+                self.state = "data"
+            else:
+                buffer.clear()
+                return
+
+    def finish(self) -> None:
+        if self.state != "end":
+            raise InvalidBody("Multipart body ended before its closing boundary")
+
+    def close(self) -> None:
+        for file in self.files:
+            file.close()
+
+    def _start_part(self, block: bytes) -> None:
+        headers = {}
+        for line in block.decode("latin-1").split("\r\n"):
+            name, sep, value = line.partition(":")
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+
+        _, options = parse_options(headers.get("content-disposition", ""))
+        if "name" not in options:
+            raise InvalidBody("Multipart part without a name")
+
+        self.name = options["name"]
+        filename = options.get("filename")
+        if filename is None:
+            if self.fields >= self.parser.max_fields:
+                raise InvalidBody("Too many form fields")
+
+            self.fields += 1
+            self.field = bytearray()
+            return
+
+        if len(self.files) >= self.parser.max_files:
+            raise InvalidBody("Too many files")
+
+        spool_size, directory = self.parser.spool_size, self.parser.directory
+        if spool_size:
+            file: IO = tempfile.SpooledTemporaryFile(max_size=spool_size, dir=directory)
+        else:
+            file = tempfile.TemporaryFile(dir=directory)
+
+        self.files.append(file)
+        self.upload = UploadFile(filename, file, headers.get("content-type", ""))
+        self.written = 0
+
+    async def _write(self, data: bytearray) -> None:
+        if not data:
+            return
+
+        if self.field is not None:
+            if len(self.field) + len(data) > self.parser.max_field_size:
+                raise BodyTooLarge(f"Form field {self.name!r} is too large")
+            self.field += data
+            return
+
+        assert self.upload is not None
+        self.written += len(data)
+        if self.written <= self.parser.spool_size:
+            # Still spooled in memory.
+            self.upload.file.write(bytes(data))
+        else:
+            await run_in_threadpool(self.upload.file.write, bytes(data))
+
+    def _finish_part(self) -> None:
+        if self.field is not None:
+            try:
+                self.items.append((self.name, self.field.decode("utf-8")))
+            except UnicodeDecodeError:
+                raise InvalidBody(f"Form field {self.name!r} is not valid UTF-8")
+            self.field = None
+            return
+
+        assert self.upload is not None
+        self.upload.file.seek(0)
+        self.items.append((self.name, self.upload))
+        self.upload = None
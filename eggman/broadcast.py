@@ -0,0 +1,351 @@
+from __future__ import annotations
+
+import asyncio
+import fcntl
+import logging
+import marshal
+import os
+import struct
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set
+
+from starlette.types import Message
+from typing_extensions import Protocol
+
+from eggman.alias import WebSocket
+from eggman.responses import Encoder, default_encoder
+
+logger = logging.getLogger("eggman.broadcast")
+
+# What a subscriber whose send queue is full does with a new message: drop the oldest queued
+# messages to make room for it, or be disconnected.
+DROP = "drop"
+DISCONNECT = "disconnect"
+
+# Close code sent to subscribers disconnected for falling behind, "Try Again Later".
+SLOW_CONSUMER = 1013
+
+_LENGTH = struct.Struct("!I")
+
+
+class Subscriber:
+    """
+    `Subscriber` is a websocket subscribed to channels of a `Hub`. Messages published to its channels
+    are queued, up to the hub's `max_queue`, and written to the websocket by a task of its own so that
+    a slow client only ever holds up itself.
+    """
+
+    def __init__(self, hub: Hub, websocket: WebSocket, channels: Set[str]) -> None:
+        self.hub = hub
+        self.websocket = websocket
+        self.channels = channels
+        self.dropped = 0
+        self.closed = False
+        self._queue: Deque[Message] = deque()
+        self._ready = asyncio.Event()
+        self._writer = asyncio.ensure_future(self._write())
+
+    def offer(self, message: Message) -> None:
+        if self.closed:
+            return
+
+        if len(self._queue) >= self.hub.max_queue:
+            if self.hub.policy == DISCONNECT:
+                asyncio.ensure_future(self.close(SLOW_CONSUMER))
+                return
+
+            self._queue.popleft()
+            self.dropped += 1
+
+        self._queue.append(message)
+        self._ready.set()
+
+    async def close(self, code: int = 1000) -> None:
+        if self.closed:
+            return
+
+        self.hub.unsubscribe(self)
+        try:
+            await self.websocket.close(code)
+        except Exception:
+            # The client may already be gone.
+            pass
+
+    def stop(self) -> None:
+        self.closed = True
+        self._writer.cancel()
+
+    async def _write(self) -> None:
+        try:
+            while True:
+                while not self._queue:
+                    self._ready.clear()
+                    await self._ready.wait()
+
+                for message in self._batch():
+                    await self.websocket.send(message)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.hub.unsubscribe(self)
+
+    def _batch(self) -> List[Message]:
+        separator = self.hub.batch_separator
+        if separator is None or len(self._queue) == 1:
+            return [self._queue.popleft()]
+
+        batch: List[Message] = []
+        texts: List[str] = []
+        size = 0
+        while self._queue and size < self.hub.max_batch:
+            message = self._queue.popleft()
+            text = message.get("text")
+            if text is None:
+                # Flush the texts queued before it so that frames keep their order.
+                if texts:
+                    batch.append({"type": "websocket.send", "text": separator.join(texts)})
+                    texts = []
+                batch.append(message)
+                continue
+
+            texts.append(text)
+            size += len(text)
+
+        if texts:
+            batch.append({"type": "websocket.send", "text": separator.join(texts)})
+
+        return batch
+
+
+class Backend(Protocol):
+    async def start(self, hub: Hub) -> None:
+        pass  # pragma: no cover
+
+    async def stop(self) -> None:
+        pass  # pragma: no cover
+
+    def publish(self, channel: str, message: Message) -> None:
+        pass  # pragma: no cover
+
+
+class Hub:
+    """
+    `Hub` fans messages published to a channel out to every websocket subscribed to it.
+
+    A message is encoded once, however many subscribers it goes to: strings are sent as text frames,
+    bytes as binary frames and anything else as JSON text encoded with `encoder`. Every subscriber
+    has a send queue of at most `max_queue` messages. When it is full, the `DROP` policy discards the
+    oldest queued messages and the `DISCONNECT` policy closes the connection with code 1013. When
+    `batch_separator` is set, text messages that queued up behind a slow client are joined with it
+    into frames of about `max_batch` characters.
+
+    With a `backend`, such as `UnixSocketBackend`, messages are also delivered to the subscribers of
+    hubs in other worker processes. A hub can be provided to the jab harness, which starts and stops
+    its backend.
+    """
+
+    def __init__(
+        self,
+        max_queue: int = 256,
+        policy: str = DROP,
+        batch_separator: Optional[str] = None,
+        max_batch: int = 64 * 1024,
+        backend: Optional[Backend] = None,
+        encoder: Optional[Encoder] = None,
+    ) -> None:
+        if policy not in (DROP, DISCONNECT):
+            raise ValueError(f"unknown policy {policy!r}")
+
+        self.max_queue = max_queue
+        self.policy = policy
+        self.batch_separator = batch_separator
+        self.max_batch = max_batch
+        self.backend = backend
+        self.encoder = encoder or default_encoder()
+        self.channels: Dict[str, Set[Subscriber]] = {}
+
+    def subscribe(self, websocket: WebSocket, *channels: str) -> Subscriber:
+        subscriber = Subscriber(self, websocket, set(channels))
+        for channel in channels:
+            self.channels.setdefault(channel, set()).add(subscriber)
+
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        subscriber.stop()
+        for channel in subscriber.channels:
+            subscribers = self.channels.get(channel)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self.channels[channel]
+
+    async def serve(self, websocket: WebSocket, *channels: str) -> None:
+        """
+        Accepts `websocket`, subscribes it to `channels` and returns once the client disconnects.
+        Messages the client sends are ignored.
+        """
+        await websocket.accept()
+        subscriber = self.subscribe(websocket, *channels)
+        try:
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+        finally:
+            self.unsubscribe(subscriber)
+
+    def publish(self, channel: str, data: Any) -> int:
+        """
+        Publishes `data` to the subscribers of `channel` without waiting for any of them, returning
+        the number of local subscribers it was queued for.
+        """
+        message: Message
+        if isinstance(data, str):
+            message = {"type": "websocket.send", "text": data}
+        elif isinstance(data, bytes):
+            message = {"type": "websocket.send", "bytes": data}
+        else:
+            message = {"type": "websocket.send", "text": self.encoder(data).decode("utf-8")}
+
+        if self.backend is not None:
+            self.backend.publish(channel, message)
+
+        return self.deliver(channel, message)
+
+    def deliver(self, channel: str, message: Message) -> int:
+        subscribers = self.channels.get(channel, ())
+        for subscriber in tuple(subscribers):
+            subscriber.offer(message)
+
+        return len(subscribers)
+
+    async def on_start(self) -> None:
+        if self.backend is not None:
+            await self.backend.start(self)
+
+    async def on_stop(self) -> None:
+        if self.backend is not None:
+            await self.backend.stop()
+
+
+def _pack(channel: str, message: Message) -> bytes:
+    payload = marshal.dumps((channel, message.get("text"), message.get("bytes")))
+    return _LENGTH.pack(len(payload)) + payload
+
+
+async def _read(reader: asyncio.StreamReader) -> bytes:
+    header = await reader.readexactly(_LENGTH.size)
+    return await reader.readexactly(_LENGTH.unpack(header)[0])
+
+
+class UnixSocketBackend:
+    """
+    `UnixSocketBackend` relays published messages between the hubs of the worker processes of one
+    host over a Unix socket at `path`. The worker holding an advisory lock on `path + ".lock"` serves
+    the socket and forwards every message it receives to all other workers, which connect to it. If
+    that worker exits its lock is released, another worker takes over and the rest reconnect, so
+    messages published in the meantime only reach the publishing worker's own subscribers.
+
+    Frames for a worker that stops reading are dropped once `max_pending` bytes are waiting for it.
+    """
+
+    def __init__(self, path: str, retry: float = 0.5, max_pending: int = 8 * 1024 * 1024) -> None:
+        self.path = path
+        self.retry = retry
+        self.max_pending = max_pending
+        self._hub: Optional[Hub] = None
+        self._lock: Optional[int] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._peers: Set[asyncio.StreamWriter] = set()
+        self._upstream: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Future] = None
+
+    @property
+    def relay(self) -> bool:
+        return self._server is not None
+
+    async def start(self, hub: Hub) -> None:
+        self._hub = hub
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+
+        for writer in [*self._peers, *filter(None, [self._upstream])]:
+            writer.close()
+
+        if self._lock is not None:
+            os.close(self._lock)
+            self._lock = None
+
+    def publish(self, channel: str, message: Message) -> None:
+        frame = _pack(channel, message)
+        if self._server is not None:
+            self._forward(frame, None)
+        elif self._upstream is not None:
+            self._upstream.write(frame)
+
+    def _forward(self, frame: bytes, origin: Optional[asyncio.StreamWriter]) -> None:
+        for peer in self._peers:
+            transport: asyncio.WriteTransport = peer.transport  # type: ignore
+            if peer is not origin and transport.get_write_buffer_size() < self.max_pending:
+                peer.write(frame)
+
+    def _deliver(self, frame: bytes) -> None:
+        assert self._hub is not None
+        channel, text, data = marshal.loads(frame)
+        if text is not None:
+            self._hub.deliver(channel, {"type": "websocket.send", "text": text})
+        else:
+            self._hub.deliver(channel, {"type": "websocket.send", "bytes": data})
+
+    async def _run(self) -> None:
+        while True:
+            if self._elect():
+                self._server = await asyncio.start_unix_server(self._accept, path=self.path)
+                return
+
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.path)
+            except OSError:
+                # The relay has not started listening yet, or it just exited.
+                await asyncio.sleep(self.retry)
+                continue
+
+            self._upstream = writer
+            try:
+                while True:
+                    self._deliver(await _read(reader))
+            except (asyncio.IncompleteReadError, OSError):
+                logger.info("Lost the broadcast relay at %s, reconnecting", self.path)
+            finally:
+                self._upstream = None
+                writer.close()
+
+    def _elect(self) -> bool:
+        if self._lock is None:
+            self._lock = os.open(self.path + ".lock", os.O_CREAT | os.O_RDWR, 0o600)
+
+        try:
+            fcntl.flock(self._lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+
+        return True
+
+    async def _accept(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._peers.add(writer)
+        try:
+            while True:
+                frame = await _read(reader)
+                self._forward(_LENGTH.pack(len(frame)) + frame, writer)
+                self._deliver(frame)
+        except (asyncio.IncompleteReadError, OSError):
+            pass
+        finally:
+            self._peers.discard(writer)
+            writer.close()
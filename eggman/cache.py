@@ -0,0 +1,343 @@
+from __future__ import annotations
+
+import asyncio
+import fcntl
+import hashlib
+import marshal
+import mmap
+import struct
+import tempfile
+import time
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from typing_extensions import Protocol
+
+Headers = List[Tuple[bytes, bytes]]
+
+# Request headers identifying a user, whose requests a shared cache must not answer for another.
+_CREDENTIALS = (b"authorization", b"cookie")
+
+
+class Entry(NamedTuple):
+    status: int
+    headers: Headers
+    body: bytes
+    expires: float
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(k) + len(v) for k, v in self.headers)
+
+
+class CacheBackend(Protocol):
+    def get(self, key: bytes) -> Optional[Entry]:
+        pass  # pragma: no cover
+
+    def set(self, key: bytes, entry: Entry) -> None:
+        pass  # pragma: no cover
+
+
+class MemoryBackend:
+    """
+    `MemoryBackend` keeps entries in process memory, evicting the least recently used entries once
+    either `max_entries` or `max_bytes` is exceeded.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: OrderedDict[bytes, Entry] = OrderedDict()
+
+    def get(self, key: bytes) -> Optional[Entry]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+
+        return entry
+
+    def set(self, key: bytes, entry: Entry) -> None:
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.size -= previous.size
+
+        self._entries[key] = entry
+        self.size += entry.size
+
+        while self._entries and (len(self._entries) > self.max_entries or self.size > self.max_bytes):
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= evicted.size
+
+
+_SLOT_HEADER = struct.Struct("=Q20sdI")
+
+
+class SharedMemoryBackend:
+    """
+    `SharedMemoryBackend` stores entries in a fixed number of fixed size slots of an anonymous shared
+    memory mapping. A backend created before an `eggman.workers.Supervisor` forks its workers, for
+    instance at import time when routes are declared, is shared by all of them.
+
+    Keys are hashed directly to a slot and a newer entry simply replaces whatever occupied its slot.
+    Writers hold a lock on their slot, a byte range lock of an unlinked file that every process
+    shares, so that only one of them writes a slot at a time. Each slot is also guarded by a sequence
+    number that writers make odd while they write, so that readers, which take no lock, can detect
+    and discard a torn read. Entries larger than a slot are not stored.
+    """
+
+    def __init__(self, slots: int = 1024, slot_size: int = 64 * 1024) -> None:
+        self.slots = slots
+        self.slot_size = slot_size
+        self._map = mmap.mmap(-1, slots * slot_size)
+        # POSIX record locks belong to a process, so unlike flock they exclude forked workers too.
+        self._locks = tempfile.TemporaryFile()
+
+    def _offset(self, key: bytes) -> int:
+        return int.from_bytes(key[:8], "little") % self.slots * self.slot_size
+
+    def get(self, key: bytes) -> Optional[Entry]:
+        offset = self._offset(key)
+
+        seq, slot_key, expires, length = _SLOT_HEADER.unpack_from(self._map, offset)
+        if seq & 1 or slot_key != key or not length:
+            return None
+
+        start = offset + _SLOT_HEADER.size
+        payload = self._map[start : start + length]
+
+        if _SLOT_HEADER.unpack_from(self._map, offset)[0] != seq:
+            return None
+
+        try:
+            status, headers, body = marshal.loads(payload)
+        except (EOFError, ValueError, TypeError):
+            # Whatever went wrong writing the slot, a slot that does not decode is a miss.
+            return None
+
+        return Entry(status, headers, body, expires)
+
+    def set(self, key: bytes, entry: Entry) -> None:
+        payload = marshal.dumps((entry.status, entry.headers, entry.body))
+        if len(payload) > self.slot_size - _SLOT_HEADER.size:
+            return
+
+        offset = self._offset(key)
+        slot = offset // self.slot_size
+        fcntl.lockf(self._locks, fcntl.LOCK_EX, 1, slot)
+        try:
+            seq = _SLOT_HEADER.unpack_from(self._map, offset)[0]
+            seq += 2 if seq & 1 else 1
+
+            struct.pack_into("=Q", self._map, offset, seq)
+            start = offset + _SLOT_HEADER.size
+            self._map[start : start + len(payload)] = payload
+            _SLOT_HEADER.pack_into(self._map, offset, seq + 1, key, entry.expires, len(payload))
+        finally:
+            fcntl.lockf(self._locks, fcntl.LOCK_UN, 1, slot)
+
+
+class _Recorder:
+    """
+    `_Recorder` forwards the response of the wrapped app to the client, if there is one, while
+    keeping a copy of it to store in the cache.
+    """
+
+    def __init__(self, send: Optional[Send], max_size: int) -> None:
+        self.send = send
+        self.max_size = max_size
+        self.status = 0
+        self.headers: Headers = []
+        self.body: List[bytes] = []
+        self.size = 0
+        self.complete = False
+
+    async def __call__(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.status = message["status"]
+            self.headers = [(bytes(k), bytes(v)) for k, v in message.get("headers", [])]
+        elif message["type"] == "http.response.body":
+            body = message.get("body", b"")
+            self.size += len(body)
+            if self.size <= self.max_size:
+                self.body.append(body)
+            self.complete = not message.get("more_body", False)
+
+        if self.send is not None:
+            await self.send(message)
+
+    @property
+    def sets_cookie(self) -> bool:
+        return any(name.lower() == b"set-cookie" for name, _ in self.headers)
+
+    def entry(self, expires: float, keyed: Sequence[bytes] = ()) -> Optional[Entry]:
+        """
+        Returns the entry to store for the response, or None if it must not be stored, including when
+        it varies on request headers other than the `keyed` ones.
+        """
+        if not self.complete or self.status != 200 or self.size > self.max_size or self.sets_cookie:
+            return None
+
+        for name, value in self.headers:
+            name = name.lower()
+            if name == b"cache-control" and (b"no-store" in value or b"private" in value):
+                return None
+
+            if name == b"vary":
+                fields = (field.strip().lower() for field in value.split(b","))
+                if any(field and field not in keyed for field in fields):
+                    return None
+
+        return Entry(self.status, self.headers, b"".join(self.body), expires)
+
+
+def _empty_receive() -> Receive:
+    """
+    Returns the receive of a request sent by eggman itself: an empty body, then nothing, as a
+    server's receive blocks until the client disconnects once the body has been read.
+    """
+    sent = False
+
+    async def receive() -> Message:
+        nonlocal sent
+        if sent:
+            await asyncio.get_event_loop().create_future()
+
+        sent = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    return receive
+
+
+class ResponseCache:
+    """
+    `ResponseCache` caches the successful GET and HEAD responses of a route, keyed by the request
+    method, host and path, which includes its path parameters, the query string if `query` is set
+    and the values of the request `headers` listed.
+
+    Entries are fresh for `ttl` seconds. For `stale_while_revalidate` seconds after that a stale
+    entry is still served while a single background request refreshes it. Concurrent misses for the
+    same key are coalesced: one request is passed on to the handler and the others wait for its
+    response rather than calling the handler themselves.
+
+    Requests sent with `Cache-Control: no-cache`, and those carrying an `Authorization` or a `Cookie`
+    header not listed in `headers`, bypass the cache, as a shared cache must. Responses that are not
+    a 200, that are marked `no-store` or `private`, that set a cookie, that vary on request headers
+    other than the host and the `headers` listed or that are larger than `max_entry_size` bytes are
+    not cached. Entries live in a
+    `MemoryBackend` unless another `backend` is given.
+
+    A `ResponseCache` is attached to a route through the `cache` option of `Blueprint.route` or
+    `Server.add_route`, either as an instance or as a number of seconds to use as its `ttl`.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        stale_while_revalidate: float = 0.0,
+        query: bool = True,
+        headers: Sequence[str] = (),
+        max_entry_size: int = 1024 * 1024,
+        backend: Optional[CacheBackend] = None,
+    ) -> None:
+        self.ttl = ttl
+        self.stale_while_revalidate = stale_while_revalidate
+        self.query = query
+        self.headers = [h.lower().encode("latin-1") for h in headers]
+        self._keyed = self.headers + [b"host"]
+        self.max_entry_size = max_entry_size
+        self.backend: CacheBackend = backend if backend is not None else MemoryBackend()
+        self._inflight: Dict[bytes, asyncio.Future] = {}
+
+    @classmethod
+    def from_option(cls, option: Union[ResponseCache, float]) -> ResponseCache:
+        if isinstance(option, ResponseCache):
+            return option
+
+        return cls(ttl=float(option))
+
+    def key(self, scope: Scope) -> bytes:
+        request_headers = dict(scope.get("headers", []))
+        digest = hashlib.sha1(f'{scope["method"]} {scope["path"]}'.encode())
+        digest.update(b"\nhost:" + request_headers.get(b"host", b""))
+        if self.query:
+            digest.update(b"?" + scope.get("query_string", b""))
+
+        if self.headers:
+            for name in self.headers:
+                digest.update(b"\n" + name + b":" + request_headers.get(name, b""))
+
+        return digest.digest()
+
+    def wrap(self, app: ASGIApp) -> ASGIApp:
+        async def cached(scope: Scope, receive: Receive, send: Send) -> None:
+            if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD") or self._bypass(scope):
+                await app(scope, receive, send)
+                return
+
+            key = self.key(scope)
+            now = time.time()
+
+            entry = self.backend.get(key)
+            if entry is not None and now < entry.expires + self.stale_while_revalidate:
+                if now >= entry.expires and key not in self._inflight:
+                    asyncio.ensure_future(self._refresh(app, dict(scope), key))
+
+                await self._replay(entry, send)
+                return
+
+            leader = self._inflight.get(key)
+            if leader is not None:
+                entry = await asyncio.shield(leader)
+                if entry is not None:
+                    await self._replay(entry, send)
+                    return
+
+                await app(scope, receive, send)
+                return
+
+            await self._fetch(app, scope, receive, send, key)
+
+        return cached
+
+    def _bypass(self, scope: Scope) -> bool:
+        for name, value in scope.get("headers", []):
+            if name in _CREDENTIALS and name not in self.headers:
+                return True
+
+            if name == b"cache-control" and b"no-cache" in value:
+                return True
+
+        return False
+
+    async def _fetch(
+        self, app: ASGIApp, scope: Scope, receive: Receive, send: Optional[Send], key: bytes
+    ) -> None:
+        future: asyncio.Future = asyncio.get_event_loop().create_future()
+        self._inflight[key] = future
+
+        recorder = _Recorder(send, self.max_entry_size)
+        entry = None
+        try:
+            await app(scope, receive, recorder)
+            entry = recorder.entry(time.time() + self.ttl, self._keyed)
+            if entry is not None:
+                self.backend.set(key, entry)
+        finally:
+            del self._inflight[key]
+            future.set_result(entry)
+
+    async def _refresh(self, app: ASGIApp, scope: Scope, key: bytes) -> None:
+        if key in self._inflight:
+            return
+
+        try:
+            await self._fetch(app, scope, _empty_receive(), None, key)
+        except Exception:
+            # A failed refresh leaves the stale entry in place until it is refreshed or it expires.
+            pass
+
+    async def _replay(self, entry: Entry, send: Send) -> None:
+        await send({"type": "http.response.start", "status": entry.status, "headers": entry.headers})
+        await send({"type": "http.response.body", "body": entry.body})
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+from typing import Any, Callable, Dict, NamedTuple, Optional, Sequence, TypeVar, Union
+from urllib.parse import parse_qsl
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from eggman.cache import Entry, _Recorder
+
+# The attribute `coalesce` marks a handler with, read by `eggman.Server` when the handler is
+# registered as a route.
+MARKER = "__eggman_coalesce__"
+
+# Request headers that make a response personal, unless they are part of the key.
+_CREDENTIALS = (b"authorization", b"cookie")
+
+F = TypeVar("F", bound=Callable)
+
+
+class _Outcome(NamedTuple):
+    """
+    What the leader of a key leaves its followers: the response to replay, or else the exception to
+    raise, and neither when they must call the handler themselves.
+    """
+
+    entry: Optional[Entry]
+    error: Optional[BaseException]
+
+
+class Coalescer:
+    """
+    `Coalescer` lets identical requests to a route that arrive while one of them is being handled
+    share its response rather than all calling the handler: the first request is passed on to the
+    handler and those arriving before it completes wait for its response and replay it.
+
+    Requests are identical when they share their method and path parameters, the query string, or
+    only the query parameters listed in `query` when it is a sequence of names, and the values of
+    the request `headers` listed. Only `methods`, GET and HEAD by default, are coalesced, and only
+    requests without credentials: a request carrying `Authorization` or `Cookie` is passed on to
+    the handler unless that header is listed in `headers`, so that its value is part of the key.
+    A response that sets a cookie is never shared, its followers calling the handler themselves.
+
+    Followers wait at most `timeout` seconds for the leader, and call the handler themselves when it
+    takes longer, when its response is larger than `max_size` bytes or when it was cancelled, for
+    instance because its client disconnected. An exception raised by the leader's handler is raised
+    in each of its followers too. Nothing is kept once the leader completes: unlike a
+    `eggman.cache.ResponseCache`, a request arriving after it calls the handler again.
+
+    A `Coalescer` is attached through the `coalesce` option of `Blueprint.route` or
+    `Server.add_route`, either as an instance or as True for the defaults, or with the `coalesce`
+    decorator, which also works on the methods of handler classes.
+    """
+
+    def __init__(
+        self,
+        query: Union[bool, Sequence[str]] = True,
+        headers: Sequence[str] = (),
+        methods: Sequence[str] = ("GET", "HEAD"),
+        timeout: float = 10.0,
+        max_size: int = 1024 * 1024,
+    ) -> None:
+        self.query = query if isinstance(query, bool) else list(query)
+        self.headers = [h.lower().encode("latin-1") for h in headers]
+        self.methods = [method.upper() for method in methods]
+        self.timeout = timeout
+        self.max_size = max_size
+        self.coalesced = 0
+
+    @classmethod
+    def from_option(cls, option: Union[Coalescer, bool]) -> Coalescer:
+        if isinstance(option, Coalescer):
+            return option
+
+        return cls()
+
+    def key(self, scope: Scope) -> bytes:
+        params = sorted((k, str(v)) for k, v in scope.get("path_params", {}).items())
+        digest = hashlib.sha1(f'{scope["method"]} {params}'.encode())
+
+        query_string = scope.get("query_string", b"")
+        if self.query is True:
+            digest.update(b"?" + query_string)
+        elif isinstance(self.query, list) and self.query:
+            pairs = parse_qsl(query_string.decode("latin-1"), keep_blank_values=True)
+            digest.update(repr(sorted(pair for pair in pairs if pair[0] in self.query)).encode())
+
+        if self.headers:
+            request_headers = dict(scope.get("headers", []))
+            for name in self.headers:
+                digest.update(b"\n" + name + b":" + request_headers.get(name, b""))
+
+        return digest.digest()
+
+    def _credentialed(self, scope: Scope) -> bool:
+        for name, _ in scope.get("headers", []):
+            if name in _CREDENTIALS and name not in self.headers:
+                return True
+
+        return False
+
+    def wrap(self, app: ASGIApp) -> ASGIApp:
+        inflight: Dict[bytes, asyncio.Future] = {}
+
+        async def coalesced(scope: Scope, receive: Receive, send: Send) -> None:
+            if scope["type"] != "http" or scope["method"] not in self.methods or self._credentialed(scope):
+                await app(scope, receive, send)
+                return
+
+            key = self.key(scope)
+            leader = inflight.get(key)
+            if leader is None:
+                await self._lead(app, scope, receive, send, key, inflight)
+                return
+
+            try:
+                outcome = await asyncio.wait_for(asyncio.shield(leader), self.timeout)
+            except asyncio.TimeoutError:
+                outcome = _Outcome(None, None)
+
+            if outcome.error is not None:
+                self.coalesced += 1
+                raise outcome.error
+
+            if outcome.entry is None:
+                await app(scope, receive, send)
+                return
+
+            self.coalesced += 1
+            entry = outcome.entry
+            await send({"type": "http.response.start", "status": entry.status, "headers": entry.headers})
+            await send({"type": "http.response.body", "body": entry.body})
+
+        return coalesced
+
+    async def _lead(
+        self,
+        app: ASGIApp,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+        key: bytes,
+        inflight: Dict[bytes, asyncio.Future],
+    ) -> None:
+        future: asyncio.Future = asyncio.get_event_loop().create_future()
+        inflight[key] = future
+
+        recorder = _Recorder(send, self.max_size)
+        outcome = _Outcome(None, None)
+        try:
+            await app(scope, receive, recorder)
+            if recorder.complete and recorder.size <= self.max_size and not recorder.sets_cookie:
+                entry = Entry(recorder.status, recorder.headers, b"".join(recorder.body), 0.0)
+                outcome = _Outcome(entry, None)
+        except Exception as e:
+            outcome = _Outcome(None, e)
+            raise
+        finally:
+            del inflight[key]
+            future.set_result(outcome)
+
+
+def coalesce(**options: Any) -> Callable[[F], F]:
+    """
+    Marks a handler, or a method of a handler class, to have its identical in-flight requests
+    coalesced by a `Coalescer` created with `options`, unless its route sets `coalesce` itself.
+    """
+    coalescer = Coalescer(**options)
+
+    def mark(fn: F) -> F:
+        setattr(fn, MARKER, coalescer)
+        return fn
+
+    return mark
@@ -0,0 +1,348 @@
+from __future__ import annotations
+
+import hashlib
+import math
+import zlib
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from eggman.cache import Entry, MemoryBackend
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None  # type: ignore
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None  # type: ignore
+
+# A streaming compressor: `push` compresses and flushes a chunk, `finish` ends the stream.
+Stream = Tuple[Callable[[bytes], bytes], Callable[[], bytes]]
+# A content coding's one-shot compressor, taking the body and a level, and streaming compressor factory.
+Codec = Tuple[Callable[[bytes, int], bytes], Callable[[int], Stream]]
+
+# Content codings in order of preference when the client accepts several equally.
+PREFERENCE = ("br", "zstd", "gzip")
+
+DEFAULT_LEVELS = {"br": 4, "zstd": 3, "gzip": 6}
+
+COMPRESSIBLE = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/x-ndjson",
+    "image/svg+xml",
+)
+
+
+def _gzip(body: bytes, level: int) -> bytes:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(body) + compressor.flush()
+
+
+def _gzip_stream(level: int) -> Stream:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return (lambda chunk: compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)), compressor.flush
+
+
+# brotli and zstandard ship without type hints, hence the annotated results below.
+
+
+def _br(body: bytes, level: int) -> bytes:
+    compressed: bytes = brotli.compress(body, quality=level)
+    return compressed
+
+
+def _br_stream(level: int) -> Stream:
+    compressor = brotli.Compressor(quality=level)
+
+    def push(chunk: bytes) -> bytes:
+        compressed: bytes = compressor.process(chunk) + compressor.flush()
+        return compressed
+
+    return push, compressor.finish
+
+
+def _zstd(body: bytes, level: int) -> bytes:
+    compressed: bytes = zstandard.ZstdCompressor(level=level).compress(body)
+    return compressed
+
+
+def _zstd_stream(level: int) -> Stream:
+    compressor = zstandard.ZstdCompressor(level=level).compressobj()
+    block = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+
+    def push(chunk: bytes) -> bytes:
+        compressed: bytes = compressor.compress(chunk) + compressor.flush(block)
+        return compressed
+
+    return push, compressor.flush
+
+
+CODECS: Dict[str, Codec] = {"gzip": (_gzip, _gzip_stream)}
+
+if brotli is not None:
+    CODECS["br"] = (_br, _br_stream)
+
+if zstandard is not None:
+    CODECS["zstd"] = (_zstd, _zstd_stream)
+
+
+def negotiate(accept_encoding: str, available: Sequence[str]) -> Optional[str]:
+    """
+    Returns the content coding of `available` the client prefers according to its `Accept-Encoding`,
+    ties broken by `PREFERENCE`, or None if it accepts none of them.
+    """
+    weights: Dict[str, float] = {}
+    for token in accept_encoding.split(","):
+        coding, _, params = token.partition(";")
+        weight = 1.0
+        name, _, value = params.strip().partition("=")
+        if name.strip() == "q":
+            try:
+                weight = float(value)
+            except ValueError:
+                weight = 0.0
+        weights[coding.strip().lower()] = weight
+
+    best, best_weight = None, 0.0
+    for coding in available:
+        weight = weights.get(coding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = coding, weight
+
+    return best
+
+
+def _tag(etag: str, encoding: str) -> str:
+    """
+    Returns the entity tag of the representation tagged `etag` compressed with `encoding`.
+    """
+    return f'{etag[:-1]}-{encoding}"' if etag.endswith('"') else f"{etag}-{encoding}"
+
+
+def _untag(scope: Scope, encoding: str) -> Scope:
+    """
+    Returns `scope` with the entity tags its `If-None-Match` header lists for the representation
+    compressed with `encoding` turned back into the tags of the uncompressed one, for the app to
+    compare with its own, and the tags of other representations dropped.
+    """
+    headers = scope.get("headers", [])
+    if not any(name == b"if-none-match" for name, _ in headers):
+        return scope
+
+    suffix = f"-{encoding}"
+    raw = []
+    for name, value in headers:
+        if name != b"if-none-match":
+            raw.append((name, value))
+            continue
+
+        tags = []
+        for tag in value.decode("latin-1").split(","):
+            tag = tag.strip()
+            quoted = tag.endswith('"')
+            bare = tag[:-1] if quoted else tag
+            if tag == "*":
+                tags.append(tag)
+            elif bare.endswith(suffix):
+                tags.append(bare[: -len(suffix)] + ('"' if quoted else ""))
+
+        if tags:
+            raw.append((name, ", ".join(tags).encode("latin-1")))
+
+    return {**scope, "headers": raw}
+
+
+class Compressor:
+    """
+    `Compressor` compresses the responses of the routes it is attached to with the content coding
+    the client prefers among `encodings`: brotli and zstd when their packages are installed, and gzip.
+    Each coding is compressed at its level in `levels`.
+
+    Only successful responses of a compressible `Content-Type` are compressed, and whole bodies only
+    when they are at least `minimum_size` bytes. Bodies of `offload_size` bytes or more are compressed
+    in the threadpool rather than on the event loop. Compressed bodies are cached, keyed by the
+    request path and the `ETag` of the response or else by a digest of the body, so that identical
+    responses are only compressed once.
+    Streaming responses are compressed chunk by chunk, flushing after each chunk.
+
+    A compressed response's `ETag` is suffixed with its content coding. `If-None-Match` tags carrying
+    the suffix of the negotiated coding are passed to the route without it, so that the route's own
+    conditional handling answers with a 304 for the compressed representation too.
+
+    A `Compressor` is attached through the `compress` option of `Blueprint.route` or
+    `Server.add_route`, or to every route of a blueprint through `Blueprint(compress=...)`, either as
+    an instance or as True for the defaults.
+    """
+
+    def __init__(
+        self,
+        minimum_size: int = 500,
+        offload_size: int = 256 * 1024,
+        levels: Optional[Dict[str, int]] = None,
+        encodings: Sequence[str] = PREFERENCE,
+        cache_bytes: int = 16 * 1024 * 1024,
+    ) -> None:
+        self.minimum_size = minimum_size
+        self.offload_size = offload_size
+        self.levels = {**DEFAULT_LEVELS, **(levels or {})}
+        self.encodings = [encoding for encoding in encodings if encoding in CODECS]
+        self.cache = MemoryBackend(max_entries=2 ** 31, max_bytes=cache_bytes)
+        self.compressed = 0
+        self.hits = 0
+
+    @classmethod
+    def from_option(cls, option: Union[Compressor, bool]) -> Compressor:
+        if isinstance(option, Compressor):
+            return option
+
+        return cls()
+
+    def wrap(self, app: ASGIApp) -> ASGIApp:
+        async def compressed(scope: Scope, receive: Receive, send: Send) -> None:
+            if scope["type"] != "http" or scope["method"] == "HEAD":
+                await app(scope, receive, send)
+                return
+
+            encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+            if encoding is None:
+                await app(scope, receive, send)
+                return
+
+            scope = _untag(scope, encoding)
+            await app(scope, receive, _Responder(self, encoding, scope, send))
+
+        return compressed
+
+    def eligible(self, status: int, headers: Headers) -> bool:
+        if status < 200 or status >= 300 or status in (204, 206):
+            return False
+
+        if "content-encoding" in headers or "no-transform" in headers.get("cache-control", ""):
+            return False
+
+        content_type = headers.get("content-type", "")
+        return content_type.startswith(COMPRESSIBLE) or "+json" in content_type or "+xml" in content_type
+
+    async def compress(self, body: bytes, encoding: str, etag: Optional[str] = None, path: str = "") -> bytes:
+        if etag is not None:
+            key = hashlib.sha1(f"{encoding} {path} {etag}".encode()).digest()
+        else:
+            key = hashlib.sha1(encoding.encode() + b" " + body).digest()
+
+        entry = self.cache.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry.body
+
+        compress = CODECS[encoding][0]
+        result: bytes
+        if len(body) >= self.offload_size:
+            result = await run_in_threadpool(compress, body, self.levels[encoding])
+        else:
+            result = compress(body, self.levels[encoding])
+
+        self.compressed += 1
+        self.cache.set(key, Entry(200, [], result, math.inf))
+        return result
+
+    def stream(self, encoding: str) -> Stream:
+        return CODECS[encoding][1](self.levels[encoding])
+
+
+class _Responder:
+    """
+    `_Responder` holds back the start of a response until its first body message shows whether
+    the response is compressed whole, compressed as a stream or passed through untouched.
+    """
+
+    def __init__(self, compressor: Compressor, encoding: str, scope: Scope, send: Send) -> None:
+        self.compressor = compressor
+        self.encoding = encoding
+        self.scope = scope
+        self.send = send
+        self.start: Optional[Message] = None
+        self.stream: Optional[Stream] = None
+        self.passthrough = False
+
+    async def __call__(self, message: Message) -> None:
+        if self.passthrough:
+            await self.send(message)
+            return
+
+        if message["type"] == "http.response.start":
+            self.start = message
+            return
+
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        if self.stream is not None:
+            await self._send_chunk(message)
+            return
+
+        assert self.start is not None
+        headers = MutableHeaders(raw=list(self.start.get("headers", [])))
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start["status"] == 304:
+            # The client holds the compressed representation, so it is told that one's tag.
+            self.passthrough = True
+            self._describe(headers, headers.get("etag"))
+            await self.send({**self.start, "headers": headers.raw})
+            await self.send(message)
+            return
+
+        if not self.compressor.eligible(self.start["status"], headers) or (
+            not more_body and len(body) < self.compressor.minimum_size
+        ):
+            self.passthrough = True
+            await self.send(self.start)
+            await self.send(message)
+            return
+
+        headers["content-encoding"] = self.encoding
+        etag = headers.get("etag")
+        self._describe(headers, etag)
+
+        if more_body:
+            del headers["content-length"]
+            self.stream = self.compressor.stream(self.encoding)
+            await self.send({**self.start, "headers": headers.raw})
+            await self._send_chunk(message)
+            return
+
+        scope = self.scope
+        path = f'{scope.get("root_path", "")}{scope["path"]}?{scope.get("query_string", b"").decode()}'
+        compressed = await self.compressor.compress(body, self.encoding, etag, path)
+        headers["content-length"] = str(len(compressed))
+        await self.send({**self.start, "headers": headers.raw})
+        await self.send({"type": "http.response.body", "body": compressed})
+
+    def _describe(self, headers: MutableHeaders, etag: Optional[str]) -> None:
+        vary = headers.get("vary")
+        headers["vary"] = f"{vary}, Accept-Encoding" if vary else "Accept-Encoding"
+
+        # The compressed representation needs an entity tag of its own.
+        if etag is not None:
+            headers["etag"] = _tag(etag, self.encoding)
+
+    async def _send_chunk(self, message: Message) -> None:
+        assert self.stream is not None
+        push, finish = self.stream
+
+        chunks: List[bytes] = [push(message.get("body", b""))]
+        more_body = message.get("more_body", False)
+        if not more_body:
+            chunks.append(finish())
+
+        await self.send({"type": "http.response.body", "body": b"".join(chunks), "more_body": more_body})
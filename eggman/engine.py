@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import socket
+from typing import TYPE_CHECKING, Any, Optional, Union
+
+if TYPE_CHECKING:  # pragma: no cover
+    import hypercorn.config
+    import uvicorn
+
+AUTO = "auto"
+UVICORN = "uvicorn"
+HYPERCORN = "hypercorn"
+
+SERVERS = (AUTO, UVICORN, HYPERCORN)
+PROTOCOLS = (AUTO, "h11", "httptools")
+
+
+def available(server: str) -> bool:
+    """
+    Returns whether the package of the ASGI `server` can be imported, without importing it.
+    """
+    import importlib.util
+
+    return importlib.util.find_spec(server) is not None
+
+
+class Engine:
+    """
+    `Engine` picks and tunes the ASGI server `eggman.Server.run` serves the app with.
+
+    `server` is either uvicorn, an HTTP/1.1 server parsing requests with h11 or httptools as
+    chosen by `http`, or hypercorn, which also speaks HTTP/2, cleartext with prior knowledge or an
+    upgrade, and negotiated through ALPN behind TLS. The default picks hypercorn when `http2` is
+    set and it is installed, and uvicorn otherwise. `max_streams` bounds the concurrent streams of
+    an HTTP/2 connection.
+
+    The listening socket is bound by eggman rather than by the server, queueing up to `backlog`
+    connections not yet accepted and, with `reuse_port`, setting `SO_REUSEPORT` so that several
+    independent processes can listen on the same port, with the kernel balancing connections
+    between them. Unsetting `nodelay` turns Nagle's algorithm back on for the connections of
+    uvicorn, coalescing small writes at the cost of latency.
+
+    Idle keep-alive connections are closed after `keep_alive` seconds. With uvicorn, requests beyond
+    `max_connections` concurrent connections and requests are answered with a 503, and the process
+    exits after `max_requests` requests, leaving it to its `eggman.workers.Supervisor` to replace it.
+
+    An `Engine` is passed to `eggman.Server` as its `engine`, either as an instance or as the name of
+    the server with the defaults.
+    """
+
+    def __init__(
+        self,
+        server: str = AUTO,
+        http: str = AUTO,
+        http2: bool = False,
+        keep_alive: float = 5.0,
+        backlog: int = 2048,
+        nodelay: bool = True,
+        reuse_port: bool = False,
+        max_connections: Optional[int] = None,
+        max_requests: Optional[int] = None,
+        max_streams: int = 100,
+    ) -> None:
+        if server not in SERVERS:
+            raise ValueError(f"unknown server {server!r}")
+
+        if http not in PROTOCOLS:
+            raise ValueError(f"unknown HTTP/1.1 protocol {http!r}")
+
+        if reuse_port and not hasattr(socket, "SO_REUSEPORT"):
+            raise ValueError("SO_REUSEPORT is not supported on this platform")
+
+        self.server = server
+        self.http = http
+        self.http2 = http2
+        self.keep_alive = keep_alive
+        self.backlog = backlog
+        self.nodelay = nodelay
+        self.reuse_port = reuse_port
+        self.max_connections = max_connections
+        self.max_requests = max_requests
+        self.max_streams = max_streams
+
+    @classmethod
+    def from_option(cls, option: Union[Engine, str, None]) -> Engine:
+        if isinstance(option, Engine):
+            return option
+
+        return cls(server=option or AUTO)
+
+    @property
+    def name(self) -> str:
+        """
+        The server this engine runs, resolving `auto` against the installed packages.
+        """
+        if self.server != AUTO:
+            return self.server
+
+        return HYPERCORN if self.http2 and available(HYPERCORN) else UVICORN
+
+    def bind(self, host: str, port: int) -> socket.socket:
+        """
+        Binds and listens on the socket for `host` and `port`, with the engine's socket options.
+        """
+        family = socket.AF_INET6 if ":" in host else socket.AF_INET
+        # asyncio only enables TCP_NODELAY on accepted sockets that are explicitly IPPROTO_TCP.
+        sock = socket.socket(family, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if self.reuse_port:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+
+            sock.bind((host, port))
+            sock.listen(self.backlog)
+        except OSError:
+            sock.close()
+            raise
+
+        sock.set_inheritable(True)
+        return sock
+
+    def uvicorn_config(self, app: Any, **options: Any) -> uvicorn.Config:
+        import uvicorn
+
+        return uvicorn.Config(
+            app,
+            http=self._protocol(),
+            timeout_keep_alive=self.keep_alive,
+            limit_concurrency=self.max_connections,
+            limit_max_requests=self.max_requests,
+            **options,
+        )
+
+    def hypercorn_config(
+        self, sock: socket.socket, drain_timeout: Optional[float] = None
+    ) -> hypercorn.config.Config:
+        from hypercorn.config import Config
+
+        config = Config()
+        config.bind = [f"fd://{sock.fileno()}"]
+        config.backlog = self.backlog
+        config.keep_alive_timeout = self.keep_alive
+        config.h2_max_concurrent_streams = self.max_streams
+        config.alpn_protocols = ["h2", "http/1.1"] if self.http2 else ["http/1.1"]
+        if drain_timeout is not None:
+            config.graceful_timeout = drain_timeout
+
+        return config
+
+    def _protocol(self) -> Any:
+        """
+        Returns the uvicorn HTTP/1.1 protocol: its name, or a subclass when the accepted sockets must
+        be tuned, since asyncio enables `TCP_NODELAY` on every TCP connection it accepts.
+        """
+        if self.nodelay:
+            return self.http
+
+        from uvicorn.config import HTTP_PROTOCOLS
+        from uvicorn.importer import import_from_string
+
+        protocol = import_from_string(HTTP_PROTOCOLS[self.http])
+
+        class Delayed(protocol):  # type: ignore
+            def connection_made(self, transport: Any) -> None:
+                sock = transport.get_extra_info("socket")
+                if sock is not None and sock.family in (socket.AF_INET, socket.AF_INET6):
+                    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 0)
+
+                super().connection_made(transport)
+
+        return Delayed
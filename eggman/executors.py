@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import inspect
+import itertools
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional, Union
+
+from eggman.alias import PlainTextResponse, Request, Response
+from eggman.types import Handler
+
+INLINE = "inline"
+
+
+class ExecutorSaturated(Exception):
+    def __init__(self, name: str, limit: int) -> None:
+        super(ExecutorSaturated, self).__init__(f"{name} already has {limit} pending calls")
+
+
+class BoundedExecutor:
+    """
+    `BoundedExecutor` runs blocking calls on a `concurrent.futures` executor from the event loop while
+    bounding the number of calls queued or running on it. Calls beyond `max_pending` are rejected with
+    `ExecutorSaturated` instead of queueing without bound.
+
+    `threads` creates a dedicated thread pool, suited to blocking I/O and to handlers. `processes`
+    creates a process pool for CPU-bound pure functions; its arguments must be picklable, so it
+    cannot run handlers themselves but can be called from inside a handler through `run`.
+    """
+
+    def __init__(self, executor: Executor, max_pending: int, name: str = "executor") -> None:
+        self.executor = executor
+        self.max_pending = max_pending
+        self.name = name
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    @classmethod
+    def threads(
+        cls, max_workers: int, max_pending: Optional[int] = None, name: str = "threads"
+    ) -> BoundedExecutor:
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"eggman-{name}")
+        return cls(executor, max_pending or 4 * max_workers, name)
+
+    @classmethod
+    def processes(
+        cls, max_workers: int, max_pending: Optional[int] = None, name: str = "processes"
+    ) -> BoundedExecutor:
+        return cls(ProcessPoolExecutor(max_workers=max_workers), max_pending or 4 * max_workers, name)
+
+    @property
+    def saturated(self) -> bool:
+        return self.pending >= self.max_pending
+
+    async def run(self, fn: Callable, *args: Any) -> Any:
+        if self.saturated:
+            self.rejected += 1
+            raise ExecutorSaturated(self.name, self.max_pending)
+
+        self.pending += 1
+        try:
+            return await asyncio.get_event_loop().run_in_executor(self.executor, functools.partial(fn, *args))
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    def shutdown(self, wait: bool = True) -> None:
+        self.executor.shutdown(wait=wait)
+
+
+ExecutorOption = Union[str, BoundedExecutor, Executor]
+
+_unnamed = itertools.count(1)
+
+
+def bounded(executor: ExecutorOption) -> Union[str, BoundedExecutor]:
+    """
+    Normalizes an `executor` option, wrapping a plain `concurrent.futures` executor in an unbounded
+    `BoundedExecutor` so that its queue depth can still be observed. An executor is wrapped once,
+    however many routes it is given to, so that its calls are counted together. The wrapper is named
+    after the thread name prefix of a thread pool, and numbered after the executor's class otherwise.
+    """
+    if isinstance(executor, BoundedExecutor):
+        return executor
+
+    if isinstance(executor, Executor):
+        # Kept on the executor itself so that both are collected together.
+        wrapper: Optional[BoundedExecutor] = getattr(executor, "_eggman_bounded", None)
+        if wrapper is None:
+            name = (
+                getattr(executor, "_thread_name_prefix", None)
+                or f"{type(executor).__name__}-{next(_unnamed)}"
+            )
+            wrapper = BoundedExecutor(executor, max_pending=2 ** 31, name=name)
+            try:
+                executor._eggman_bounded = wrapper  # type: ignore
+            except AttributeError:
+                pass
+
+        return wrapper
+
+    if executor == INLINE:
+        return executor
+
+    raise ValueError(f"unknown executor {executor!r}")
+
+
+def offload(fn: Handler, executor: ExecutorOption) -> Callable:
+    """
+    Returns a coroutine handler that runs the synchronous handler `fn` on `executor`: either `INLINE`,
+    directly on the event loop for trivial handlers, or on a thread pool. A bounded executor that is
+    saturated answers with a 503 instead of running the handler. Coroutine handlers, and ASGI apps
+    which Starlette serves as they are, are returned as is.
+    """
+    if asyncio.iscoroutinefunction(fn) or not (inspect.isfunction(fn) or inspect.ismethod(fn)):
+        return fn
+
+    if executor == INLINE:
+
+        @functools.wraps(fn)
+        async def inline(request: Request) -> Response:
+            response: Response = fn(request)
+            return response
+
+        return inline
+
+    pool = bounded(executor)
+    assert isinstance(pool, BoundedExecutor)
+
+    if isinstance(pool.executor, ProcessPoolExecutor):
+        raise ValueError("handlers cannot run on a process pool, call its `run` from the handler instead")
+
+    runner = pool
+
+    @functools.wraps(fn)
+    async def offloaded(request: Request) -> Response:
+        try:
+            response: Response = await runner.run(fn, request)
+            return response
+        except ExecutorSaturated:
+            return PlainTextResponse("Service Unavailable", status_code=503, headers={"Retry-After": "1"})
+
+    return offloaded
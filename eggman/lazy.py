@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import importlib
+import inspect
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Optional
+
+if TYPE_CHECKING:  # pragma: no cover
+    from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+def load(target: str) -> Any:
+    """
+    Imports the object at `target`, given either as `package.module:attribute` or as a dotted path
+    whose last component is the attribute.
+    """
+    if ":" in target:
+        module, _, attribute = target.partition(":")
+    else:
+        module, _, attribute = target.rpartition(".")
+
+    if not module or not attribute:
+        raise ValueError(f"{target!r} is not an import path of the form package.module:attribute")
+
+    obj: Any = importlib.import_module(module)
+    for name in attribute.split("."):
+        obj = getattr(obj, name)
+
+    return obj
+
+
+class LazyHandler:
+    """
+    `LazyHandler` is an ASGI app standing in for the handler at the import path `target`, a function
+    or ASGI app, so that the handler's module is not imported until the first request for it or until
+    it is resolved ahead of time by `warm_up`. `adapt`, when set, is applied to the handler once it
+    has been imported, as `eggman.Server` does to run it on its executor.
+    """
+
+    def __init__(self, target: str, websocket: bool = False) -> None:
+        self.target = target
+        self.websocket = websocket
+        self.adapt: Optional[Callable[[Callable], Callable]] = None
+        self._app: Optional[ASGIApp] = None
+
+    def __repr__(self) -> str:
+        return f"LazyHandler({self.target!r})"
+
+    def __getstate__(self) -> dict:
+        return {"target": self.target, "websocket": self.websocket, "adapt": None, "_app": None}
+
+    @property
+    def resolved(self) -> bool:
+        return self._app is not None
+
+    def resolve(self) -> ASGIApp:
+        if self._app is None:
+            handler = load(self.target)
+            if self.adapt is not None:
+                handler = self.adapt(handler)
+
+            if inspect.isfunction(handler) or inspect.ismethod(handler):
+                # Blueprints declaring lazy handlers are imported before Starlette is.
+                from starlette.routing import request_response, websocket_session
+
+                handler = websocket_session(handler) if self.websocket else request_response(handler)
+
+            self._app = handler
+
+        return self._app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await (self._app or self.resolve())(scope, receive, send)
+
+
+async def warm_up(handlers: Iterable[LazyHandler]) -> None:
+    """
+    Resolves `handlers` one at a time in the threadpool, keeping the event loop free to serve
+    requests while their modules are imported.
+    """
+    from starlette.concurrency import run_in_threadpool
+
+    for handler in handlers:
+        if not handler.resolved:
+            await run_in_threadpool(handler.resolve)
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import time
+from typing import Dict, Optional, Union
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from eggman.alias import PlainTextResponse
+
+# The share of a limit that requests of each priority class may use. Lower priority requests are
+# shed first, leaving headroom for more important ones.
+PRIORITIES: Dict[str, float] = {"critical": 1.0, "normal": 0.9, "sheddable": 0.5}
+
+
+class ConcurrencyLimit:
+    """
+    `ConcurrencyLimit` bounds the number of requests served at once by the routes it is attached to.
+    Requests over the limit are rejected before their handler runs: http requests with a 503 and a
+    `Retry-After` header and websocket connections with close code 1013.
+
+    Requests of a `priority` class may only use that class's share of the limit, see `PRIORITIES`,
+    so sheddable traffic is rejected well before critical traffic is.
+
+    When `adaptive` is set the limit is tuned AIMD-style from observed latency: it grows by one for
+    every `limit` requests completed within `target_latency` while the limit was in use, and shrinks
+    by `backoff` at most once per `target_latency` when a request is slower or fails.
+
+    A `ConcurrencyLimit` is attached through the `concurrency` option of `Blueprint.route` or
+    `Server.add_route`, or to every route of a blueprint through `Blueprint(concurrency=...)`, either
+    as an instance or as a fixed limit.
+    """
+
+    def __init__(
+        self,
+        limit: int,
+        adaptive: bool = False,
+        min_limit: int = 1,
+        max_limit: Optional[int] = None,
+        target_latency: float = 0.1,
+        backoff: float = 0.9,
+        retry_after: int = 1,
+    ) -> None:
+        self.limit = float(limit)
+        self.adaptive = adaptive
+        self.min_limit = min_limit
+        self.max_limit = max_limit or 10 * limit
+        self.target_latency = target_latency
+        self.backoff = backoff
+        self.retry_after = retry_after
+
+        self.in_flight = 0
+        self.rejected = 0
+        self._last_decrease = 0.0
+
+    @classmethod
+    def from_option(cls, option: Union[ConcurrencyLimit, int]) -> ConcurrencyLimit:
+        if isinstance(option, ConcurrencyLimit):
+            return option
+
+        return cls(int(option))
+
+    def acquire(self, priority: str = "normal") -> bool:
+        if self.in_flight >= max(self.limit * PRIORITIES[priority], 1.0):
+            self.rejected += 1
+            return False
+
+        self.in_flight += 1
+        return True
+
+    def release(self, latency: float, failed: bool = False) -> None:
+        saturated = self.in_flight >= int(self.limit)
+        self.in_flight -= 1
+
+        if not self.adaptive:
+            return
+
+        if failed or latency > self.target_latency:
+            now = time.monotonic()
+            if now - self._last_decrease >= self.target_latency:
+                self._last_decrease = now
+                self.limit = max(float(self.min_limit), self.limit * self.backoff)
+        elif saturated:
+            self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+
+    def wrap(self, app: ASGIApp, priority: str = "normal") -> ASGIApp:
+        if priority not in PRIORITIES:
+            raise ValueError(f"unknown priority {priority!r}, expected one of {', '.join(PRIORITIES)}")
+
+        clock = time.perf_counter
+        headers = {"Retry-After": str(self.retry_after)}
+
+        async def limited(scope: Scope, receive: Receive, send: Send) -> None:
+            if not self.acquire(priority):
+                if scope["type"] == "websocket":
+                    await send({"type": "websocket.close", "code": 1013})
+                else:
+                    response = PlainTextResponse("Service Unavailable", status_code=503, headers=headers)
+                    await response(scope, receive, send)
+                return
+
+            start = clock()
+            failed = True
+            try:
+                await app(scope, receive, send)
+                failed = False
+            finally:
+                self.release(clock() - start, failed)
+
+        return limited
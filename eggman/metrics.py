@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+
+from starlette.exceptions import HTTPException
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+if TYPE_CHECKING:
+    from eggman.access import AccessLog  # pragma: no cover
+    from eggman.executors import BoundedExecutor  # pragma: no cover
+    from eggman.pools import Pool  # pragma: no cover
+
+# The scope key marking the requests eggman sends itself to warm a route up, which are left out of
+# the metrics and the access log.
+WARM_UP = "eggman.warm_up"
+
+# Upper bounds, in seconds, of the cumulative buckets exported to Prometheus.
+EXPORT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """
+    `Histogram` records latencies in microseconds into HDR-style log-linear buckets: every power
+    of two is split into `2 ** precision` linear sub-buckets, so each recorded value is accurate to
+    within `1 / 2 ** precision` of its magnitude while recording stays a handful of integer
+    operations and the memory used is fixed.
+    """
+
+    __slots__ = ("precision", "counts", "count", "total", "_sub", "_max")
+
+    def __init__(self, precision: int = 4, max_seconds: float = 3600.0) -> None:
+        self.precision = precision
+        self._sub = 1 << precision
+        self._max = int(max_seconds * 1e6)
+        self.counts: List[int] = [0] * (self._index(self._max) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def _index(self, value: int) -> int:
+        if value < self._sub << 1:
+            return value
+
+        shift = value.bit_length() - self.precision - 1
+        return (shift << self.precision) + (value >> shift)
+
+    def _upper(self, index: int) -> int:
+        if index < self._sub << 1:
+            return index
+
+        shift = (index >> self.precision) - 1
+        mantissa = index - (shift << self.precision)
+        return ((mantissa + 1) << shift) - 1
+
+    def record(self, seconds: float) -> None:
+        value = int(seconds * 1e6)
+        if value > self._max:
+            value = self._max
+
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def quantile(self, q: float) -> float:
+        """
+        Returns the upper bound, in seconds, of the bucket holding the `q`th quantile.
+        """
+        if not self.count:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= rank:
+                return self._upper(index) / 1e6
+
+        return self._max / 1e6  # pragma: no cover
+
+    def cumulative(self, bounds: Tuple[float, ...] = EXPORT_BUCKETS) -> Iterator[Tuple[float, int]]:
+        """
+        Yields the number of recorded values at or below each of `bounds`, given in seconds.
+        """
+        index = 0
+        seen = 0
+        for bound in bounds:
+            limit = int(bound * 1e6)
+            while index < len(self.counts) and self._upper(index) <= limit:
+                seen += self.counts[index]
+                index += 1
+            yield bound, seen
+
+
+class RouteMetrics:
+    """
+    `RouteMetrics` holds the request counters and latency histogram of a single route.
+    """
+
+    __slots__ = ("blueprint", "rule", "latency", "in_flight", "requests", "errors", "bytes_in", "bytes_out")
+
+    def __init__(self, blueprint: str, rule: str) -> None:
+        self.blueprint = blueprint
+        self.rule = rule
+        self.latency = Histogram()
+        self.in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+
+def _status(exc: BaseException) -> int:
+    """
+    Returns the status of the response the exception raised by a route's app turns into.
+    """
+    return exc.status_code if isinstance(exc, HTTPException) else 500
+
+
+def _label(value: str) -> str:
+    """
+    Escapes a label value for the Prometheus text format.
+    """
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _size(message: Message) -> int:
+    body = message.get("body") or message.get("bytes") or message.get("text")
+    return len(body) if body else 0
+
+
+class MetricsRegistry:
+    """
+    `MetricsRegistry` records per-route metrics, keyed by blueprint name and rule template, for the
+    ASGI apps it `instrument`s and renders them in the Prometheus text exposition format.
+    """
+
+    def __init__(self, namespace: str = "eggman") -> None:
+        self.namespace = namespace
+        self.routes: Dict[Tuple[str, str], RouteMetrics] = {}
+        self.executors: Dict[int, BoundedExecutor] = {}
+        self.pools: Dict[int, Pool] = {}
+        self.access_log: Optional[AccessLog] = None
+
+    def route(self, blueprint: str, rule: str) -> RouteMetrics:
+        key = (blueprint, rule)
+        if key not in self.routes:
+            self.routes[key] = RouteMetrics(blueprint, rule)
+
+        return self.routes[key]
+
+    def instrument(self, app: ASGIApp, blueprint: str, rule: str) -> ASGIApp:
+        metrics = self.route(blueprint, rule)
+        clock = time.perf_counter
+
+        async def instrumented(scope: Scope, receive: Receive, send: Send) -> None:
+            if scope.get(WARM_UP):
+                await app(scope, receive, send)
+                return
+
+            status = 200
+
+            async def receive_() -> Message:
+                message = await receive()
+                metrics.bytes_in += _size(message)
+                return message
+
+            async def send_(message: Message) -> None:
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                else:
+                    metrics.bytes_out += _size(message)
+                await send(message)
+
+            metrics.in_flight += 1
+            start = clock()
+            try:
+                await app(scope, receive_, send_)
+            except BaseException as e:
+                status = _status(e)
+                raise
+            finally:
+                metrics.latency.record(clock() - start)
+                metrics.in_flight -= 1
+                metrics.requests += 1
+                if status >= 500:
+                    metrics.errors += 1
+
+        return instrumented
+
+    def render(self) -> str:
+        ns = self.namespace
+        lines = [
+            f"# HELP {ns}_request_duration_seconds Request latency by route.",
+            f"# TYPE {ns}_request_duration_seconds histogram",
+        ]
+
+        for m in self.routes.values():
+            labels = f'blueprint="{_label(m.blueprint)}",rule="{_label(m.rule)}"'
+            for bound, count in m.latency.cumulative():
+                lines.append(f'{ns}_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{ns}_request_duration_seconds_bucket{{{labels},le="+Inf"}} {m.latency.count}')
+            lines.append(f"{ns}_request_duration_seconds_sum{{{labels}}} {m.latency.total}")
+            lines.append(f"{ns}_request_duration_seconds_count{{{labels}}} {m.latency.count}")
+
+        counters = [
+            ("requests_total", "counter", "Requests served by route.", "requests"),
+            (
+                "errors_total",
+                "counter",
+                "Requests by route that failed with a 5xx or an exception.",
+                "errors",
+            ),
+            ("requests_in_flight", "gauge", "Requests by route currently being served.", "in_flight"),
+            ("request_bytes_total", "counter", "Request body bytes received by route.", "bytes_in"),
+            ("response_bytes_total", "counter", "Response body bytes sent by route.", "bytes_out"),
+        ]
+
+        for name, kind, doc, attr in counters:
+            lines.append(f"# HELP {ns}_{name} {doc}")
+            lines.append(f"# TYPE {ns}_{name} {kind}")
+            for m in self.routes.values():
+                labels = f'blueprint="{_label(m.blueprint)}",rule="{_label(m.rule)}"'
+                lines.append(f"{ns}_{name}{{{labels}}} {getattr(m, attr)}")
+
+        executor_metrics = [
+            ("executor_pending", "gauge", "Calls queued or running on an executor.", "pending"),
+            ("executor_completed_total", "counter", "Calls completed by an executor.", "completed"),
+            ("executor_rejected_total", "counter", "Calls rejected by a saturated executor.", "rejected"),
+        ]
+
+        if self.executors:
+            for name, kind, doc, attr in executor_metrics:
+                lines.append(f"# HELP {ns}_{name} {doc}")
+                lines.append(f"# TYPE {ns}_{name} {kind}")
+                for executor in self.executors.values():
+                    labels = f'executor="{_label(executor.name)}"'
+                    lines.append(f"{ns}_{name}{{{labels}}} {getattr(executor, attr)}")
+
+        pool_metrics = [
+            ("pool_size", "gauge", "Connections open in a pool.", "size"),
+            ("pool_in_use", "gauge", "Connections of a pool currently acquired.", "in_use"),
+            ("pool_waiting", "gauge", "Acquisitions waiting for a connection of a pool.", "waiting"),
+            ("pool_timeouts_total", "counter", "Acquisitions that timed out waiting on a pool.", "timeouts"),
+        ]
+
+        if self.pools:
+            for name, kind, doc, attr in pool_metrics:
+                lines.append(f"# HELP {ns}_{name} {doc}")
+                lines.append(f"# TYPE {ns}_{name} {kind}")
+                for pool in self.pools.values():
+                    lines.append(f'{ns}_{name}{{pool="{_label(pool.name)}"}} {getattr(pool, attr)}')
+
+            lines.append(f"# HELP {ns}_pool_acquire_wait_seconds Time spent waiting to acquire a connection.")
+            lines.append(f"# TYPE {ns}_pool_acquire_wait_seconds histogram")
+            for pool in self.pools.values():
+                labels = f'pool="{_label(pool.name)}"'
+                for bound, count in pool.waits.cumulative():
+                    lines.append(f'{ns}_pool_acquire_wait_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                inf = f'{ns}_pool_acquire_wait_seconds_bucket{{{labels},le="+Inf"}}'
+                lines.append(f"{inf} {pool.waits.count}")
+                lines.append(f"{ns}_pool_acquire_wait_seconds_sum{{{labels}}} {pool.waits.total}")
+                lines.append(f"{ns}_pool_acquire_wait_seconds_count{{{labels}}} {pool.waits.count}")
+
+        access_log_metrics = [
+            ("access_log_records_total", "counter", "Access log records written out.", "logged"),
+            ("access_log_failed_total", "counter", "Access log records lost to a failed write.", "failed"),
+            ("access_log_dropped_total", "counter", "Access log records dropped when full.", "dropped"),
+            ("access_log_skipped_total", "counter", "Requests sampled out of the access log.", "skipped"),
+            ("access_log_pending", "gauge", "Access log records waiting to be written out.", "pending"),
+        ]
+
+        if self.access_log is not None:
+            for name, kind, doc, attr in access_log_metrics:
+                lines.append(f"# HELP {ns}_{name} {doc}")
+                lines.append(f"# TYPE {ns}_{name} {kind}")
+                lines.append(f"{ns}_{name} {getattr(self.access_log, attr)}")
+
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,327 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Deque, Generic, Iterable, Optional, Tuple, TypeVar
+
+from starlette.exceptions import HTTPException
+
+from eggman import workers
+from eggman.metrics import Histogram
+
+logger = logging.getLogger("eggman.pools")
+
+T = TypeVar("T")
+
+
+class PoolTimeout(HTTPException):
+    def __init__(self, name: str) -> None:
+        super().__init__(503, f"Timed out waiting for a connection from {name}")
+
+
+class PoolClosed(HTTPException):
+    def __init__(self, name: str) -> None:
+        super().__init__(503, f"{name} is shutting down")
+
+
+class Pool(Generic[T]):
+    """
+    `Pool` keeps up to `max_size` connections, or any other reusable resource, open for the handlers
+    of every blueprint that depends on it.
+
+    Connections are opened by `connect`, closed by `close` and, when they have been idle for
+    `check_interval` seconds or were in use when a handler failed, checked by `check` before they
+    are handed out again, discarding those that fail the check. Either pass the callables or
+    subclass `Pool` and override the methods of the same names, which lets the subclass declare its
+    own dependencies, such as its configuration, to the jab harness.
+
+    `start`, which the jab harness calls through `on_start`, opens `min_size` connections at once,
+    so a misconfigured pool fails the startup rather than the first request. A pool registered with
+    a server serving several workers is started by each worker rather than by the harness of the
+    supervisor, which serves no request. When `total_size` is set, `max_size` is reduced to this
+    process's share of `total_size` across the workers forked by `eggman.workers`. A pool used in a
+    process forked after it started drops the connections it inherited and opens its own.
+
+    `acquire` waits at most `acquire_timeout` seconds for a connection, recording how long it waited
+    in `waits`, and then fails with a 503. `stop`, called through `on_stop`, refuses new
+    acquisitions, waits up to `drain_timeout` seconds for the connections in use to be released and
+    closes every connection.
+
+    A pool the handler classes of a blueprint depend on is registered with the `eggman.Server`
+    serving them, which starts every such pool in parallel and exports their metrics. Provide one
+    pool to the harness per resource, using a subclass per pool when there are several.
+    """
+
+    def __init__(
+        self,
+        connect: Optional[Callable[[], Awaitable[T]]] = None,
+        close: Optional[Callable[[T], Awaitable[None]]] = None,
+        check: Optional[Callable[[T], Awaitable[bool]]] = None,
+        name: Optional[str] = None,
+        min_size: int = 1,
+        max_size: int = 10,
+        total_size: Optional[int] = None,
+        acquire_timeout: float = 10.0,
+        check_interval: float = 30.0,
+        drain_timeout: float = 10.0,
+    ) -> None:
+        self._connect = connect
+        self._close = close
+        self._check = check
+        self.name = name or type(self).__name__
+        self.min_size = min_size
+        self.max_size = max_size
+        self.total_size = total_size
+        self.acquire_timeout = acquire_timeout
+        self.check_interval = check_interval
+        self.drain_timeout = drain_timeout
+
+        self.waits = Histogram()
+        self.timeouts = 0
+        self.size = 0
+        self.in_use = 0
+
+        # Idle connections with the time they were last released, most recently released last.
+        self._idle: Deque[Tuple[T, float]] = deque()
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._started: Optional[asyncio.Future] = None
+        self._drained: Optional[asyncio.Event] = None
+        self._closing = False
+        self._stopped = False
+        self._pid = os.getpid()
+
+        # Set by the `eggman.Server` the pool is registered with when it forks several workers.
+        self.supervised = False
+
+    @property
+    def jab(self) -> Callable:
+        """
+        Provides a jab constructor to incorporate an already instantiated Pool object.
+        """
+
+        def constructor() -> Pool:
+            return self
+
+        constructor.__annotations__["return"] = type(self)
+        return constructor
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def connect(self) -> T:
+        if self._connect is None:
+            raise NotImplementedError(f"{self.name} has no connect")
+
+        return await self._connect()
+
+    async def close(self, connection: T) -> None:
+        if self._close is not None:
+            await self._close(connection)
+
+    async def check(self, connection: T) -> bool:
+        if self._check is None:
+            return True
+
+        return await self._check(connection)
+
+    async def on_start(self) -> None:
+        # A supervisor serves no request, the pool is started in each of its workers instead.
+        if not self.supervised or workers.current() is not None:
+            await self.start()
+
+    async def on_stop(self) -> None:
+        await self.stop()
+
+    async def start(self) -> None:
+        self._forked()
+        if self._started is None:
+            self._started = asyncio.ensure_future(self._fill())
+
+        await asyncio.shield(self._started)
+
+    async def _fill(self) -> None:
+        worker = workers.current()
+        if self.total_size is not None and worker is not None:
+            self.max_size = min(self.max_size, max(1, self.total_size // worker.workers))
+
+        count = min(self.min_size, self.max_size) - self.size
+        self.size += count
+        results = await asyncio.gather(*(self.connect() for _ in range(count)), return_exceptions=True)
+
+        now = time.monotonic()
+        failure: Optional[BaseException] = None
+        for result in results:
+            if isinstance(result, BaseException):
+                self.size -= 1
+                failure = result
+            else:
+                self._idle.append((result, now))
+
+        if failure is not None:
+            self._started = None
+            raise failure
+
+        logger.info("Opened %d connections for %s", count, self.name)
+
+    def _forked(self) -> None:
+        pid = os.getpid()
+        if pid == self._pid:
+            return
+
+        # The connections belong to the parent process and must neither be used nor closed here.
+        self._pid = pid
+        self._idle.clear()
+        self._waiters.clear()
+        self._started = None
+        self.size = 0
+        self.in_use = 0
+
+    async def acquire(self) -> T:
+        self._forked()
+        if self._closing:
+            raise PoolClosed(self.name)
+
+        if self._started is None or not self._started.done():
+            await self.start()
+
+        start = time.perf_counter()
+        try:
+            connection = await self._acquire()
+        finally:
+            self.waits.record(time.perf_counter() - start)
+
+        self.in_use += 1
+        return connection
+
+    async def _acquire(self) -> T:
+        deadline = time.monotonic() + self.acquire_timeout
+
+        while True:
+            if self._idle:
+                connection, released = self._idle.pop()
+                if released < 0 or time.monotonic() - released >= self.check_interval:
+                    if not await self._healthy(connection):
+                        continue
+
+                return connection
+
+            if self.size < self.max_size:
+                self.size += 1
+                try:
+                    return await self.connect()
+                except BaseException:
+                    self.size -= 1
+                    raise
+
+            waiter = asyncio.get_event_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await asyncio.wait_for(waiter, deadline - time.monotonic())
+            except asyncio.TimeoutError:
+                if waiter.done() and not waiter.cancelled():
+                    # Woken just as it timed out, so the connection it was woken for goes to the next.
+                    self._wake()
+                self.timeouts += 1
+                raise PoolTimeout(self.name)
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+
+            if self._closing:
+                raise PoolClosed(self.name)
+
+    async def _healthy(self, connection: T) -> bool:
+        try:
+            if await self.check(connection):
+                return True
+        except Exception:
+            pass
+
+        logger.info("Discarding a connection of %s that failed its check", self.name)
+        await self._discard(connection)
+        return False
+
+    async def _discard(self, connection: T) -> None:
+        self.size -= 1
+        try:
+            await self.close(connection)
+        except Exception:
+            logger.exception("Failed to close a connection of %s", self.name)
+
+        self._wake()
+
+    def release(self, connection: T, suspect: bool = False) -> None:
+        """
+        Returns `connection` to the pool. A `suspect` connection is checked before it is reused.
+        """
+        if os.getpid() != self._pid:
+            return
+
+        self.in_use -= 1
+        if self._stopped:
+            asyncio.ensure_future(self._discard(connection))
+            return
+
+        self._idle.append((connection, -1.0 if suspect else time.monotonic()))
+        self._wake()
+
+        if self._drained is not None and not self.in_use:
+            self._drained.set()
+
+    def _wake(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[T]:
+        """
+        Acquires a connection for the duration of an `async with` block. A connection used in a block
+        that raised is checked before it is reused.
+        """
+        connection = await self.acquire()
+        suspect = True
+        try:
+            yield connection
+            suspect = False
+        finally:
+            self.release(connection, suspect)
+
+    async def stop(self) -> None:
+        self._closing = True
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+        if self.in_use:
+            self._drained = asyncio.Event()
+            try:
+                await asyncio.wait_for(self._drained.wait(), self.drain_timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Closing %s with %d connections still in use", self.name, self.in_use)
+
+        self._stopped = True
+        idle = [connection for connection, _ in self._idle]
+        self._idle.clear()
+        await asyncio.gather(*(self._discard(connection) for connection in idle))
+
+
+async def start(pools: Iterable[Pool]) -> None:
+    """
+    Starts `pools` in parallel, failing if any of them fails to start.
+    """
+    await asyncio.gather(*(pool.start() for pool in pools))
+
+
+async def stop(pools: Iterable[Pool]) -> None:
+    """
+    Stops `pools` in parallel, letting each of them drain.
+    """
+    await asyncio.gather(*(pool.stop() for pool in pools))
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from types import CodeType, FrameType
+from typing import Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from eggman.alias import PlainTextResponse, Request, Response
+
+# Leaf of the stacks sampled while a profiled request's task was suspended, waiting on I/O, a
+# timer or the threadpool.
+AWAITING = "(awaiting)"
+
+
+def _label(code: CodeType) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class Profiler:
+    """
+    `Profiler` samples the call stacks of a share of the requests to every route and aggregates them
+    by blueprint and rule into collapsed stacks, the input format of flamegraph.pl, speedscope and
+    most other flame graph tools.
+
+    While enabled, one in every `rate` requests to a route is profiled, and, when `allow_header` is
+    set, every request carrying the `header` header too. A thread samples the stack of each request
+    being profiled every `interval` seconds: the frames of the handler and of whatever it calls while
+    it runs on the event loop, and the chain of coroutines it is awaiting, ending in `AWAITING`,
+    while it is suspended. Synchronous handlers running in the threadpool show up as awaiting.
+
+    The profiler is disabled until enabled at runtime, through `enable` or through the admin
+    endpoint `eggman.Server` serves at its `profile_path`, and costs a single attribute check per
+    request while disabled.
+
+    Its state lives in the process it runs in: with several workers, each has its own profiler, and
+    an admin request only enables, renders or clears the profiler of the worker that accepted it.
+    """
+
+    def __init__(
+        self,
+        rate: int = 100,
+        interval: float = 0.001,
+        header: str = "x-eggman-profile",
+        allow_header: bool = False,
+        max_depth: int = 256,
+    ) -> None:
+        self.rate = rate
+        self.interval = interval
+        self.header = header.lower()
+        self.allow_header = allow_header
+        self.max_depth = max_depth
+        self.enabled = False
+
+        self.stacks: Dict[Tuple[str, str], Counter] = {}
+        self.profiled = 0
+        self.samples = 0
+
+        # The route, thread and loop of every request being profiled, by the task serving it.
+        self._active: Dict[asyncio.Task, Tuple[Tuple[str, str], int, asyncio.AbstractEventLoop]] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._wrapper: Optional[CodeType] = None
+
+    def enable(self, rate: Optional[int] = None) -> None:
+        if rate is not None:
+            self.rate = max(1, rate)
+
+        self.enabled = True
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="eggman-profiler", daemon=True)
+            self._thread.start()
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def clear(self) -> None:
+        with self._lock:
+            self.stacks = {}
+            self.profiled = 0
+            self.samples = 0
+
+    def wrap(self, app: ASGIApp, blueprint: str, rule: str) -> ASGIApp:
+        key = (blueprint, rule)
+        seen = 0
+
+        async def profiled(scope: Scope, receive: Receive, send: Send) -> None:
+            nonlocal seen
+            if not self.enabled or scope["type"] != "http":
+                await app(scope, receive, send)
+                return
+
+            seen += 1
+            flagged = self.allow_header and self.header in Headers(scope=scope)
+            task = asyncio.current_task()
+            if task is None or task in self._active or not (flagged or seen % self.rate == 0):
+                await app(scope, receive, send)
+                return
+
+            with self._lock:
+                self._active[task] = (key, threading.get_ident(), asyncio.get_event_loop())
+                self.profiled += 1
+                self._wake.set()
+
+            try:
+                await app(scope, receive, send)
+            finally:
+                with self._lock:
+                    del self._active[task]
+
+        self._wrapper = profiled.__code__
+        return profiled
+
+    def collapsed(self, blueprint: Optional[str] = None, rule: Optional[str] = None) -> str:
+        """
+        Renders the sampled stacks of the routes matching `blueprint` and `rule`, one line per stack
+        of `;`-separated frames, rooted at `blueprint:rule`, followed by its sample count.
+        """
+        lines = []
+        with self._lock:
+            for (bp, route_rule), stacks in sorted(self.stacks.items()):
+                if (blueprint is None or bp == blueprint) and (rule is None or route_rule == rule):
+                    root = f"{bp}:{route_rule}"
+                    for stack, count in stacks.most_common():
+                        lines.append(f"{root};{stack} {count}")
+
+        return "\n".join(lines) + "\n" if lines else ""
+
+    async def admin(self, request: Request) -> Response:
+        """
+        The admin endpoint: GET renders the collapsed stacks, optionally of a single `blueprint` and
+        `rule`, POST enables profiling, at a new `rate` if given, or disables it with `enabled=false`,
+        and DELETE discards the stacks sampled so far. A `rate` that is not a positive integer is
+        answered with a 400.
+        """
+        params = request.query_params
+        if request.method == "POST":
+            if params.get("enabled", "true").lower() in ("0", "false", "no", "off"):
+                self.disable()
+            else:
+                try:
+                    rate = int(params["rate"]) if "rate" in params else None
+                except ValueError:
+                    rate = 0
+                if rate is not None and rate < 1:
+                    return PlainTextResponse("Invalid rate", status_code=400)
+                self.enable(rate)
+        elif request.method == "DELETE":
+            self.clear()
+        else:
+            return PlainTextResponse(
+                self.collapsed(params.get("blueprint"), params.get("rule")), media_type="text/plain"
+            )
+
+        state = f"enabled rate={self.rate}" if self.enabled else "disabled"
+        return PlainTextResponse(
+            f"{state} profiled={self.profiled} samples={self.samples}\n", media_type="text/plain"
+        )
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait()
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    self._wake.clear()
+                    continue
+
+                active = list(self._active.items())
+
+            frames = sys._current_frames()
+            for task, (key, thread, loop) in active:
+                stack = self._stack(task, loop, frames.get(thread))
+                if stack is None:
+                    continue
+
+                with self._lock:
+                    self.stacks.setdefault(key, Counter())[";".join(stack)] += 1
+                    self.samples += 1
+
+    def _stack(
+        self, task: asyncio.Task, loop: asyncio.AbstractEventLoop, frame: Optional[FrameType]
+    ) -> Optional[List[str]]:
+        """
+        Returns the frames of `task` below the profiling wrapper, root first: the frames executing on
+        its thread if it is the task running there, the coroutines it awaits otherwise.
+        """
+        if frame is not None and asyncio.current_task(loop) is task:
+            frames = []
+            while frame is not None and frame.f_code is not self._wrapper:
+                frames.append(frame.f_code)
+                frame = frame.f_back
+
+            if frame is None:
+                return None
+
+            frames.reverse()
+            return [_label(code) for code in frames[-self.max_depth :]]
+
+        codes: List[CodeType] = []
+        # `Task.get_coro` only exists from Python 3.8.
+        coroutine = task._coro  # type: ignore
+        found = False
+        while coroutine is not None and len(codes) < self.max_depth:
+            code = getattr(coroutine, "cr_code", None) or getattr(coroutine, "gi_code", None)
+            if found and code is not None:
+                codes.append(code)
+            found = found or code is self._wrapper
+            coroutine = getattr(coroutine, "cr_await", None) or getattr(coroutine, "gi_yieldfrom", None)
+
+        if not found:
+            return None
+
+        return [_label(code) for code in codes] + [AWAITING]
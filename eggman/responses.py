@@ -0,0 +1,408 @@
+import asyncio
+import dataclasses
+import enum
+import json
+import math
+import uuid
+from collections import deque
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Deque,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Union,
+)
+
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
+
+Encoder = Callable[[Any], bytes]
+
+
+def _default(obj: Any) -> Any:
+    """
+    `_default` serializes the types neither encoder handles on its own. Dataclasses become
+    JSON objects of their fields and namedtuples become arrays, as the stdlib encodes them.
+    Enums are encoded as their value and UUIDs as strings, as orjson encodes them.
+    """
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return {f.name: getattr(obj, f.name) for f in dataclasses.fields(obj)}
+
+    if isinstance(obj, tuple):
+        return list(obj)
+
+    if isinstance(obj, enum.Enum):
+        return obj.value
+
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def _nonfinite(content: Any) -> bool:
+    """
+    `_nonfinite` tells whether `content` holds a NaN or an infinite float, which orjson encodes as
+    null where the stdlib encoder refuses them.
+    """
+    stack = [content]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            values: Iterable[Any] = value.values()
+        elif isinstance(value, (list, tuple)):
+            values = value
+        elif dataclasses.is_dataclass(value) and not isinstance(value, type):
+            values = [getattr(value, f.name) for f in dataclasses.fields(value)]
+        elif isinstance(value, float) and not math.isfinite(value):
+            return True
+        else:
+            continue
+
+        # Scalars are checked in place, only containers and other objects go through the stack.
+        for item in values:
+            kind = type(item)
+            if kind is float:
+                if not math.isfinite(item):
+                    return True
+            elif kind is not str and kind is not int and kind is not bool and item is not None:
+                stack.append(item)
+
+    return False
+
+
+# Dataclasses and datetimes are left to `_default`, as they are with the stdlib encoder.
+_ORJSON_OPTIONS = (
+    0
+    if orjson is None
+    else orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_PASSTHROUGH_DATETIME
+)
+
+
+def orjson_encoder(content: Any) -> bytes:
+    """
+    Encodes `content` with orjson, producing the same JSON as `stdlib_encoder` and failing the same
+    way: non-string keys are converted, NaN and infinities are refused, and whatever orjson cannot
+    encode, such as integers beyond 64 bits, is handed to the stdlib encoder.
+    """
+    try:
+        data = orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+    except TypeError:
+        return stdlib_encoder(content)
+
+    # A NaN or an infinity can only have been written as a null.
+    if b"null" in data and _nonfinite(content):
+        raise ValueError("Out of range float values are not JSON compliant")
+
+    return data
+
+
+def stdlib_encoder(content: Any) -> bytes:
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"), default=_default
+    ).encode("utf-8")
+
+
+def default_encoder() -> Encoder:
+    """
+    Returns the fastest available JSON encoder: orjson when it is installed and the
+    standard library otherwise.
+    """
+    if orjson is not None:
+        return orjson_encoder
+
+    return stdlib_encoder  # pragma: no cover
+
+
+class JSONResponse(Response):
+    """
+    `JSONResponse` serializes its content straight to bytes with a pluggable `encoder`,
+    defaulting to `default_encoder()`. Dataclasses are serialized as JSON objects, namedtuples
+    as arrays, enums as their value and UUIDs as strings, whichever encoder is used.
+    """
+
+    media_type = "application/json"
+    encoder: Encoder = staticmethod(default_encoder())  # type: ignore
+
+    def __init__(
+        self,
+        content: Any = None,
+        status_code: int = 200,
+        headers: Optional[dict] = None,
+        media_type: Optional[str] = None,
+        background: Optional[BackgroundTask] = None,
+        encoder: Optional[Encoder] = None,
+    ) -> None:
+        if encoder is not None:
+            self.encoder = encoder  # type: ignore
+
+        super().__init__(content, status_code, headers, media_type, background)  # type: ignore
+
+    def render(self, content: Any) -> bytes:
+        return self.encoder(content)  # type: ignore
+
+
+class _Buffer:
+    """
+    `_Buffer` is the bounded queue of chunks between the producer and the sender of a
+    `StreamingResponse`. `put` waits while `limit` bytes or more are buffered, and `take` returns the
+    buffered chunks joined up to roughly `target` bytes, or None once the producer is done. An
+    `error` the producer failed with is raised by `take` instead.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.size = 0
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self._chunks: Deque[bytes] = deque()
+        self._readable = asyncio.Event()
+        self._writable = asyncio.Event()
+        self._writable.set()
+
+    async def put(self, chunk: bytes) -> None:
+        while self.size >= self.limit:
+            self._writable.clear()
+            await self._writable.wait()
+
+        self._chunks.append(chunk)
+        self.size += len(chunk)
+        self._readable.set()
+
+    def close(self) -> None:
+        self.done = True
+        self._readable.set()
+
+    async def take(self, target: int) -> Optional[bytes]:
+        while not self._chunks and not self.done:
+            self._readable.clear()
+            await self._readable.wait()
+
+        parts: List[bytes] = []
+        size = 0
+        while self._chunks and size < target:
+            chunk = self._chunks.popleft()
+            parts.append(chunk)
+            size += len(chunk)
+
+        self.size -= size
+        self._writable.set()
+
+        if not parts and self.error is not None:
+            raise self.error
+
+        return b"".join(parts) if parts else None
+
+
+class StreamingResponse(Response):
+    """
+    `StreamingResponse` streams the chunks of an iterable or async iterable to the client with
+    bounded memory. The producer runs ahead of the client by at most `max_buffer` bytes, after which
+    it waits for the client to catch up, and buffered chunks are coalesced into writes of about
+    `write_size` bytes. Items of a regular iterable are pulled in the threadpool, batched up to
+    `write_size` bytes per trip, so that a blocking iterator never runs on the event loop.
+
+    When the client disconnects the producer is cancelled and an async generator is closed, so that
+    nothing keeps producing for a client that is gone. Its constructor is compatible with Starlette's
+    `StreamingResponse`.
+    """
+
+    write_size = 64 * 1024
+    max_buffer = 1024 * 1024
+
+    def __init__(
+        self,
+        content: Union[Iterable, AsyncIterable],
+        status_code: int = 200,
+        headers: Optional[dict] = None,
+        media_type: Optional[str] = None,
+        background: Optional[BackgroundTask] = None,
+        write_size: Optional[int] = None,
+        max_buffer: Optional[int] = None,
+    ) -> None:
+        self.content = content
+        self.status_code = status_code
+        self.media_type = self.media_type if media_type is None else media_type
+        self.background = background  # type: ignore
+        if write_size is not None:
+            self.write_size = write_size
+        if max_buffer is not None:
+            self.max_buffer = max_buffer
+
+        self.init_headers(headers)  # type: ignore
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        buffer = _Buffer(self.max_buffer)
+        producer = asyncio.ensure_future(self._produce(buffer))
+        sender = asyncio.ensure_future(self._send(buffer, send))
+        watcher = asyncio.ensure_future(self._watch(receive))
+
+        try:
+            done, _ = await asyncio.wait({sender, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in (producer, sender, watcher):
+                task.cancel()
+
+        if sender in done:
+            sender.result()
+            if self.background is not None:
+                await self.background()
+
+    async def _watch(self, receive: Receive) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            if not message.get("more_body", False):
+                break
+
+        # Once the request body is complete a server only has the disconnect left to send, so its
+        # receive blocks until then. A synthetic receive, such as a cache refresh's, answers at once
+        # instead and is not polled again, the response then ending with its stream.
+        if (await receive())["type"] != "http.disconnect":
+            await asyncio.get_event_loop().create_future()
+
+    async def _send(self, buffer: _Buffer, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+
+        while True:
+            chunk = await buffer.take(self.write_size)
+            if chunk is None:
+                break
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def _produce(self, buffer: _Buffer) -> None:
+        try:
+            if hasattr(self.content, "__aiter__"):
+                await self._produce_async(self.content, buffer)  # type: ignore
+            else:
+                await self._produce_sync(iter(self.content), buffer)  # type: ignore
+        except Exception as e:
+            # The stream is aborted rather than ended, so the client can tell it is incomplete.
+            buffer.error = e
+        finally:
+            buffer.close()
+
+    async def _produce_async(self, content: AsyncIterable, buffer: _Buffer) -> None:
+        try:
+            async for chunk in content:
+                await buffer.put(chunk if isinstance(chunk, bytes) else chunk.encode(self.charset))
+        finally:
+            aclose = getattr(content, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    async def _produce_sync(self, content: Iterator, buffer: _Buffer) -> None:
+        while True:
+            chunks = await run_in_threadpool(self._pull, content)
+            if not chunks:
+                break
+            for chunk in chunks:
+                await buffer.put(chunk)
+
+    def _pull(self, content: Iterator) -> List[bytes]:
+        chunks: List[bytes] = []
+        size = 0
+        for chunk in content:
+            chunks.append(chunk if isinstance(chunk, bytes) else chunk.encode(self.charset))
+            size += len(chunks[-1])
+            if size >= self.write_size:
+                break
+
+        return chunks
+
+
+class StreamingJSONResponse(StreamingResponse):
+    """
+    `StreamingJSONResponse` streams an iterable or async iterable of items to the client as a
+    single JSON array without building the whole document in memory. Encoded items are
+    gathered into chunks of roughly `chunk_size` bytes before being sent. Items of a regular
+    iterable are pulled and encoded in the threadpool, one chunk at a time.
+    """
+
+    media_type = "application/json"
+    chunk_size = 64 * 1024
+
+    def __init__(
+        self,
+        content: Union[Iterable, AsyncIterator],
+        status_code: int = 200,
+        headers: Optional[dict] = None,
+        media_type: Optional[str] = None,
+        background: Optional[BackgroundTask] = None,
+        encoder: Optional[Encoder] = None,
+        chunk_size: Optional[int] = None,
+    ) -> None:
+        self.encoder = encoder or default_encoder()
+        if chunk_size is not None:
+            self.chunk_size = chunk_size
+
+        if hasattr(content, "__aiter__"):
+            body = self._encode_async(content)  # type: ignore
+        else:
+            body = self._encode_sync(iter(content))  # type: ignore
+
+        super().__init__(body, status_code, headers, media_type, background, write_size=self.chunk_size)
+
+    def _fill(self, items: Iterator, first: bool) -> Optional[bytes]:
+        parts: List[bytes] = []
+        size = 0
+
+        for item in items:
+            encoded = self.encoder(item)
+            parts.append(encoded if first and not parts else b"," + encoded)
+            size += len(encoded) + 1
+            if size >= self.chunk_size:
+                break
+
+        if not parts:
+            return None
+
+        return b"".join(parts)
+
+    async def _encode_sync(self, items: Iterator) -> AsyncIterator[bytes]:
+        yield b"["
+
+        first = True
+        while True:
+            chunk = await run_in_threadpool(self._fill, items, first)
+            if chunk is None:
+                break
+
+            first = False
+            yield chunk
+
+        yield b"]"
+
+    async def _encode_async(self, items: AsyncIterator) -> AsyncIterator[bytes]:
+        parts: List[bytes] = [b"["]
+        size = 1
+        first = True
+
+        async for item in items:
+            encoded = self.encoder(item)
+            parts.append(encoded if first else b"," + encoded)
+            size += len(encoded) + 1
+            first = False
+
+            if size >= self.chunk_size:
+                yield b"".join(parts)
+                parts = []
+                size = 0
+
+        parts.append(b"]")
+        yield b"".join(parts)
@@ -0,0 +1,396 @@
+from __future__ import annotations
+
+import functools
+import re
+from typing import Any, Dict, List, Optional, Pattern, Set, Tuple, Union
+
+from starlette.convertors import Convertor
+from starlette.datastructures import URL
+from starlette.responses import RedirectResponse
+from starlette.routing import PARAM_REGEX, BaseRoute, Match, Route, Router, WebSocketRoute
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+Param = Tuple[str, Convertor, Pattern, "RadixNode"]
+Candidate = Tuple[BaseRoute, Scope]  # (route, child scope)
+
+# The request header a client may select an API version with instead of a `/v{version}` path segment.
+VERSION_HEADER = b"accept-version"
+
+
+class RadixNode:
+    """
+    `RadixNode` is a single path segment of a `RadixTree`. Static children are
+    looked up by exact segment in a hash map, typed path parameters are tried in order
+    of specificity and a trailing `{name:path}` parameter captures the rest of the path.
+    """
+
+    __slots__ = ("static", "params", "catchall", "routes")
+
+    def __init__(self) -> None:
+        self.static: Dict[str, RadixNode] = {}
+        self.params: List[Param] = []
+        self.catchall: List[Tuple[str, Convertor, RadixNode]] = []
+        self.routes: List[BaseRoute] = []
+
+    def param(self, name: str, convertor: Convertor) -> RadixNode:
+        for existing, conv, _, child in self.params:
+            if existing == name and conv is convertor:
+                return child
+
+        child = RadixNode()
+        self.params.append((name, convertor, re.compile(convertor.regex), child))
+        # Typed convertors (int, float, uuid) are more specific than the default `str`
+        # convertor so they are always tried first regardless of registration order.
+        self.params.sort(key=lambda p: p[1].regex == "[^/]+")
+        return child
+
+
+class RadixTree:
+    """
+    `RadixTree` maps request paths to routes by walking one path segment at a time rather
+    than running every route's regular expression against the path. Lookup cost depends on
+    the depth of the path, not on the number of registered routes.
+
+    Rules that cannot be expressed as whole-segment matches (e.g. `/file-{name}.txt`) are
+    reported back to the caller by `insert` so that they can be matched linearly instead.
+    """
+
+    def __init__(self) -> None:
+        self.root = RadixNode()
+
+    def insert(self, rule: str, route: BaseRoute) -> bool:
+        node = self.root
+        segments = rule[1:].split("/")
+
+        for i, segment in enumerate(segments):
+            match = PARAM_REGEX.fullmatch(segment)
+            if match is None:
+                if "{" in segment:
+                    return False
+
+                node = node.static.setdefault(segment, RadixNode())
+                continue
+
+            name = match.group(1)
+            convertor = route.param_convertors[name]  # type: ignore
+
+            if convertor.regex == ".*":
+                if i != len(segments) - 1:
+                    return False
+
+                child = RadixNode()
+                node.catchall.append((name, convertor, child))
+                child.routes.append(route)
+                return True
+
+            node = node.param(name, convertor)
+
+        node.routes.append(route)
+        return True
+
+    def lookup(self, path: str, method: Optional[str] = None) -> Tuple[Match, Optional[Candidate]]:
+        partial: List[Candidate] = []
+        found = self._search(self.root, path[1:].split("/"), 0, {}, method, partial)
+
+        if found is not None:
+            return Match.FULL, found
+
+        if partial:
+            return Match.PARTIAL, partial[0]
+
+        return Match.NONE, None
+
+    def _search(
+        self,
+        node: RadixNode,
+        segments: List[str],
+        index: int,
+        params: Dict[str, Any],
+        method: Optional[str],
+        partial: List[Candidate],
+    ) -> Optional[Candidate]:
+        if index == len(segments):
+            return self._accept(node.routes, params, method, partial)
+
+        segment = segments[index]
+
+        child = node.static.get(segment)
+        if child is not None:
+            found = self._search(child, segments, index + 1, params, method, partial)
+            if found is not None:
+                return found
+
+        if segment:
+            for name, convertor, regex, child in node.params:
+                if regex.fullmatch(segment) is None:
+                    continue
+
+                params[name] = convertor.convert(segment)
+                found = self._search(child, segments, index + 1, params, method, partial)
+                if found is not None:
+                    return found
+                del params[name]
+
+        for name, convertor, child in node.catchall:
+            params[name] = convertor.convert("/".join(segments[index:]))
+            found = self._accept(child.routes, params, method, partial)
+            if found is not None:
+                return found
+            del params[name]
+
+        return None
+
+    def _accept(
+        self, routes: List[BaseRoute], params: Dict[str, Any], method: Optional[str], partial: List[Candidate]
+    ) -> Optional[Candidate]:
+        for route in routes:
+            methods = getattr(route, "methods", None)
+            child_scope = {"endpoint": route.endpoint, "path_params": dict(params)}  # type: ignore
+            if method is None or not methods or method in methods:
+                return route, child_scope
+
+            if not partial:
+                partial.append((route, child_scope))
+
+        return None
+
+
+class CompiledRouter(Router):
+    """
+    `CompiledRouter` is a drop-in replacement for the Starlette `Router` that resolves
+    http and websocket requests through a `RadixTree` instead of scanning the route list.
+
+    Routes are collected as usual through `add_route` and `add_websocket_route`. The trees
+    are built by `freeze`, which `eggman.Server` invokes once the jab harness has finished
+    constructing every blueprint. Adding a route afterwards invalidates the trees and they
+    are rebuilt on the next request.
+
+    Static segments are preferred over path parameters, so a request for `/users/me` is
+    served by `/users/me` even if `/users/{name}` was registered first. Routes whose rules
+    cannot be compiled as well as `Mount` and `Host` routes are matched linearly, in
+    registration order, after the trees.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._http: Optional[RadixTree] = None
+        self._websocket: Optional[RadixTree] = None
+        self._fallback: List[BaseRoute] = []
+
+    @property
+    def frozen(self) -> bool:
+        return self._http is not None
+
+    def freeze(self) -> None:
+        http = RadixTree()
+        websocket = RadixTree()
+        fallback: List[BaseRoute] = []
+
+        for route in self.routes:
+            if isinstance(route, Route) and http.insert(route.path, route):
+                continue
+
+            if isinstance(route, WebSocketRoute) and websocket.insert(route.path, route):
+                continue
+
+            fallback.append(route)
+
+        self._http = http
+        self._websocket = websocket
+        self._fallback = fallback
+
+    def add_route(self, *args: Any, **kwargs: Any) -> None:
+        super().add_route(*args, **kwargs)
+        self._http = None
+
+    def add_websocket_route(self, *args: Any, **kwargs: Any) -> None:
+        super().add_websocket_route(*args, **kwargs)
+        self._http = None
+
+    def mount(self, *args: Any, **kwargs: Any) -> None:
+        super().mount(*args, **kwargs)
+        self._http = None
+
+    def host(self, *args: Any, **kwargs: Any) -> None:
+        super().host(*args, **kwargs)
+        self._http = None
+
+    def match(self, scope: Scope) -> Tuple[Match, Optional[Candidate]]:
+        if self._http is None or self._websocket is None:
+            self.freeze()
+
+        if scope["type"] == "http":
+            match, candidate = self._http.lookup(scope["path"], scope["method"])  # type: ignore
+        else:
+            match, candidate = self._websocket.lookup(scope["path"])  # type: ignore
+
+        if match == Match.FULL:
+            return match, candidate
+
+        for route in self._fallback:
+            fallback_match, child_scope = route.matches(scope)
+            if fallback_match == Match.FULL:
+                return fallback_match, (route, child_scope)
+
+            if fallback_match == Match.PARTIAL and candidate is None:
+                match, candidate = fallback_match, (route, child_scope)
+
+        return match, candidate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await super().__call__(scope, receive, send)
+            return
+
+        if "router" not in scope:
+            scope["router"] = self
+
+        match, candidate = self.match(scope)
+
+        if candidate is not None:
+            route, child_scope = candidate
+            if "path_params" in child_scope:
+                path_params = dict(scope.get("path_params", {}))
+                path_params.update(child_scope["path_params"])
+                child_scope = {**child_scope, "path_params": path_params}
+
+            scope.update(child_scope)
+            await route(scope, receive, send)
+            return
+
+        if scope["type"] == "http" and self.redirect_slashes and not scope["path"].endswith("/"):
+            redirect_scope = dict(scope)
+            redirect_scope["path"] += "/"
+
+            if self.match(redirect_scope)[0] != Match.NONE:
+                response = RedirectResponse(url=str(URL(scope=redirect_scope)))
+                await response(scope, receive, send)
+                return
+
+        await self.default(scope, receive, send)
+
+
+def alternate(rule: str) -> Optional[str]:
+    """
+    Returns `rule` with its trailing slash toggled, or None for the root and catch-all rules
+    which have no meaningful alternate.
+    """
+    if rule in ("", "/") or rule.endswith(":path}"):
+        return None
+
+    return rule[:-1] if rule.endswith("/") else rule + "/"
+
+
+def _host(scope: Scope) -> Optional[str]:
+    for name, value in scope.get("headers", []):
+        if name == b"host":
+            host: str = value.decode("latin-1").lower()
+            if not host.endswith("]"):
+                host = host.rsplit(":", 1)[0]
+            return host
+
+    return None
+
+
+class Dispatcher:
+    """
+    `Dispatcher` sits in front of the Starlette router and serves the routes bound to a virtual
+    host or an API version from a route table of their own, so that one `eggman.Server` can serve
+    many hosts and versions without checking each route against the request's host and version.
+
+    A request's table is found by hash lookup on its `Host` header, trying an exact host such as
+    `api.example.com` before a wildcard such as `*.example.com`, and on its version, taken from a
+    leading `/v{version}` path segment, which is stripped from the path, or else from the
+    `Accept-Version` header. Requests for a host without a table of its own, or that match none of
+    the routes in it, fall back to the routes that are not bound to a host, while requests that
+    select a version are only ever served by routes of that version. Routes that are bound to
+    neither a host nor a version are served by the `default` router as before.
+
+    Tables never redirect to add or remove a trailing slash: routes that are not strict about
+    slashes are registered under both forms instead, see `alternate`.
+    """
+
+    def __init__(self, default: Router, compiled: bool = False) -> None:
+        self.default = default
+        self.compiled = compiled
+        self.tables: Dict[Tuple[Optional[str], Optional[str]], Router] = {}
+        self.segments: Dict[str, str] = {}
+        self.versions: Set[str] = set()
+
+    def table(self, host: Optional[str] = None, version: Union[str, int, None] = None) -> Router:
+        if host is None and version is None:
+            return self.default
+
+        key = (host.lower() if host else None, str(version) if version is not None else None)
+        if key not in self.tables:
+            factory = CompiledRouter if self.compiled else Router
+            self.tables[key] = factory(redirect_slashes=False, default=functools.partial(self._miss, *key))
+
+            if key[1] is not None:
+                self.segments[f"v{key[1]}"] = key[1]
+                self.versions.add(key[1])
+
+        return self.tables[key]
+
+    def freeze(self) -> None:
+        for router in [self.default, *self.tables.values()]:
+            if isinstance(router, CompiledRouter):
+                router.freeze()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if not self.tables or scope["type"] == "lifespan":
+            await self.default(scope, receive, send)
+            return
+
+        version = None
+        if self.segments:
+            version, scope = self._version(scope)
+
+        await self._resolve(_host(scope), version)(scope, receive, send)
+
+    def _version(self, scope: Scope) -> Tuple[Optional[str], Scope]:
+        path = scope["path"]
+        end = path.find("/", 1)
+        segment = path[1:end] if end > 0 else path[1:]
+
+        version = self.segments.get(segment)
+        if version is not None:
+            rest = path[end:] if end > 0 else "/"
+            return version, {**scope, "path": rest, "root_path": scope.get("root_path", "") + "/" + segment}
+
+        for name, value in scope.get("headers", []):
+            if name == VERSION_HEADER:
+                requested = value.decode("latin-1").strip()
+                return (requested if requested in self.versions else None), scope
+
+        return None, scope
+
+    def _resolve(self, host: Optional[str], version: Optional[str]) -> ASGIApp:
+        tables = self.tables
+        if host is not None:
+            table = tables.get((host, version))
+            if table is None and "." in host:
+                table = tables.get(("*." + host.split(".", 1)[1], version))
+            if table is not None:
+                return table
+
+        return tables.get((None, version)) or self._last(version)
+
+    def _fallback(self, host: Optional[str], version: Optional[str]) -> ASGIApp:
+        if host is not None:
+            return self.tables.get((None, version)) or self._last(version)
+
+        return self._last(version)
+
+    def _last(self, version: Optional[str]) -> ASGIApp:
+        # Versioned paths have had their version segment stripped, so they must not fall back to
+        # the unversioned routes.
+        if version is None:
+            return self.default
+
+        return self.default.not_found
+
+    async def _miss(
+        self, host: Optional[str], version: Optional[str], scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        await self._fallback(host, version)(scope, receive, send)
@@ -1,11 +1,51 @@
+from __future__ import annotations
+
+import asyncio
+import functools
 import os
-from typing import Any, Callable, Optional
+import signal
+import socket
+from typing import TYPE_CHECKING, Any, Callable, List, Optional, Sequence, Tuple, Union
 
-import uvicorn
 from jab import Receive, Send
 from starlette.applications import Starlette
+from starlette.routing import BaseRoute, Router
+from starlette.types import Message
 
+from eggman import pools, workers
+from eggman.access import AccessLog
+from eggman.alias import PlainTextResponse, Request, Response
+from eggman.body import BodyParser
+from eggman.cache import ResponseCache, _empty_receive
+from eggman.coalesce import MARKER, Coalescer
+from eggman.engine import HYPERCORN, Engine
+from eggman.executors import BoundedExecutor, ExecutorOption, bounded, offload
+from eggman.lazy import LazyHandler, warm_up
+from eggman.limits import ConcurrencyLimit
+from eggman.metrics import WARM_UP, MetricsRegistry
+from eggman.profiling import Profiler
+from eggman.routing import CompiledRouter, Dispatcher, alternate
 from eggman.types import Handler, WebSocketHandler
+from eggman.workers import Supervisor
+
+if TYPE_CHECKING:  # pragma: no cover
+    import uvicorn
+
+
+# Route options that eggman handles itself rather than forwarding to Starlette.
+ROUTE_OPTIONS = (
+    "blueprint",
+    "body",
+    "cache",
+    "coalesce",
+    "compress",
+    "concurrency",
+    "executor",
+    "host",
+    "priority",
+    "strict_slashes",
+    "version",
+)
 
 
 class Server:
@@ -17,16 +57,230 @@ class Server:
     starlette toolkit.
     """
 
-    def __init__(self, host: Optional[str] = None, port: Optional[int] = None, debug: bool = False) -> None:
+    def __init__(
+        self,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        debug: bool = False,
+        compiled_router: bool = False,
+        workers: int = 1,
+        drain_timeout: Optional[float] = None,
+        metrics_path: Optional[str] = None,
+        executor: Optional[ExecutorOption] = None,
+        warm_up: bool = True,
+        profile_path: Optional[str] = None,
+        engine: Union[Engine, str, None] = None,
+        access_log: Union[AccessLog, str, None] = None,
+    ) -> None:
+        """
+        When `compiled_router` is set, requests are resolved through an `eggman.routing.CompiledRouter`
+        whose radix trees are frozen once the jab harness starts, rather than through Starlette's linear
+        scan of the route list.
+
+        When `workers` is greater than one, `run` pre-forks that many worker processes sharing a single
+        listening socket. See `eggman.workers` for details.
+
+        `drain_timeout` bounds, in seconds, how long a shutdown waits for open connections and
+        background tasks to finish before the requests still running are cancelled and the app shuts
+        down. By default it waits for all of them.
+
+        When `metrics_path` is set, every route records its latency histogram, in-flight requests,
+        bytes in and out and error count, keyed by blueprint name and rule, and the metrics are
+        served in the Prometheus text format at `metrics_path`. See `eggman.metrics`.
+
+        `executor` is where synchronous handlers run when neither their route nor their blueprint
+        picks one. By default they run on Starlette's shared threadpool. See `eggman.executors`.
+
+        When `warm_up` is set, the handlers registered through `Blueprint.lazy` are imported in the
+        background once the jab harness starts rather than on their first request. uvicorn itself is
+        only imported once the server is run.
+
+        When `profile_path` is set, every route can be profiled by an `eggman.profiling.Profiler`
+        that is disabled until enabled through the admin endpoint at `profile_path`: `POST` enables
+        it, optionally with a `rate` sampling one request in `rate`, or disables it with
+        `enabled=false`, `GET` serves the sampled stacks of each blueprint and rule in the collapsed
+        flame graph format and `DELETE` clears them. With `debug` set, requests carrying an
+        `X-Eggman-Profile` header are always profiled. Serve it only where operators can reach it.
+        With several `workers`, every worker profiles on its own and the admin endpoint only reaches
+        the worker that accepts the request.
+
+        `engine` is the ASGI server `run` serves the app with and its tuning: an `eggman.engine.Engine`,
+        or the name of the server. It picks between uvicorn and, for HTTP/2, hypercorn, and sets the
+        listening socket's backlog and options, keep-alive timeouts and connection limits.
+
+        When `access_log` is set, every route records a line per request, with its blueprint name and
+        rule, into an `eggman.access.AccessLog` that writes them out in batches off the request path:
+        either an instance or its target, `-` for stdout, `unix:` and a socket path, or a file path.
+
+        Every route can be replaced while the server runs, without dropping connections, see `reload`.
+        """
         self._app = Starlette(debug)
         self._host = host
         self._port = port
+        self._workers = workers
+        self._drain_timeout = drain_timeout
+        self._engine = Engine.from_option(engine)
+        self._server: Optional[uvicorn.Server] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._supervisor: Optional[Supervisor] = None
+        self._warm_up = warm_up
+        self._lazy: List[LazyHandler] = []
+        self._pools: List[pools.Pool] = []
+        self._reloading = False
+
+        # Routes served by the server itself rather than registered by blueprints, kept across reloads.
+        self._builtin: List[Tuple[str, Callable, Optional[List[str]]]] = []
+
+        self._compiled = compiled_router
+        if compiled_router:
+            self._app.router = CompiledRouter()
+
+        self._dispatcher = Dispatcher(self._app.router, compiled=compiled_router)
+        self._app.exception_middleware.app = self._dispatcher
+
+        self._executor = executor
+        self._metrics: Optional[MetricsRegistry] = None
+        if metrics_path is not None:
+            self._metrics = MetricsRegistry()
+            self._add_builtin(metrics_path, self._render_metrics)
+
+        self._profiler: Optional[Profiler] = None
+        if profile_path is not None:
+            self._profiler = Profiler(allow_header=debug)
+            self._add_builtin(profile_path, self._profiler.admin, ["GET", "POST", "DELETE"])
+
+        self._access_log: Optional[AccessLog] = None
+        if access_log is not None:
+            self._access_log = AccessLog.from_option(access_log)
+            if self._metrics is not None:
+                self._metrics.access_log = self._access_log
+
+    def _add_builtin(self, path: str, endpoint: Callable, methods: Optional[List[str]] = None) -> None:
+        self._builtin.append((path, endpoint, methods))
+        self._app.add_route(path, endpoint, methods=methods)  # type: ignore
 
     def add_route(self, fn: Handler, rule: str, **options: Any) -> None:
-        self._app.add_route(rule, fn, **options)
+        """
+        Registers `fn` as the handler of `rule`. Besides the options of Starlette's `add_route`
+        the following eggman options are accepted:
+
+        body: an `eggman.body.BodyParser`, or a maximum size in bytes, limiting and parsing request bodies.
+        cache: an `eggman.cache.ResponseCache`, or a TTL in seconds, caching the route's responses.
+        coalesce: an `eggman.coalesce.Coalescer`, or True, coalescing identical in-flight requests.
+        compress: an `eggman.compression.Compressor`, or True, compressing the route's responses.
+        concurrency: an `eggman.limits.ConcurrencyLimit`, or a fixed limit, shedding the route's excess load.
+        priority: the priority class of the route's requests under its `concurrency` limit.
+        executor: where a synchronous `fn` runs, see `eggman.executors.offload`.
+        host: the virtual host, or `*.`-prefixed wildcard host, the route is served for.
+        version: the API version the route is served for, see `eggman.routing.Dispatcher`.
+        strict_slashes: when False the route is served both with and without a trailing slash.
+        """
+        extras = {k: options.pop(k) for k in ROUTE_OPTIONS if k in options}
+        if "coalesce" not in extras and hasattr(fn, MARKER):
+            extras["coalesce"] = getattr(fn, MARKER)
+
+        executor = extras.pop("executor", None) or self._executor
+        if executor is not None and isinstance(fn, LazyHandler):
+            fn.adapt = functools.partial(self._offload, executor=executor)
+        elif executor is not None:
+            fn = self._offload(fn, executor)
+
+        self._register("add_route", fn, rule, options, extras)
 
     def add_websocket_route(self, fn: WebSocketHandler, rule: str, **options: Any) -> None:
-        self._app.add_websocket_route(rule, fn, **options)
+        extras = {k: options.pop(k) for k in ROUTE_OPTIONS if k in options}
+        extras.pop("executor", None)
+        self._register("add_websocket_route", fn, rule, options, extras)
+
+    def add_pool(self, pool: pools.Pool) -> None:
+        """
+        Registers a `eggman.pools.Pool` the handlers of this server depend on, which `Blueprint.jab`
+        does for every pool its handler classes depend on. Registered pools are started in parallel
+        with the server, in every worker process, and their metrics are exported with the server's.
+        """
+        if any(pool is registered for registered in self._pools):
+            return
+
+        self._pools.append(pool)
+        pool.supervised = self._workers > 1
+        if self._metrics is not None:
+            self._metrics.pools[id(pool)] = pool
+
+    def _register(self, method: str, fn: Callable, rule: str, options: dict, extras: dict) -> None:
+        """
+        `_register` adds a route to the table of its host and version and, unless the route is
+        strict about slashes, an alias for its `alternate` rule sharing the same wrapped app.
+        """
+        router = self._dispatcher.table(extras.pop("host", None), extras.pop("version", None))
+        strict_slashes = extras.pop("strict_slashes", True)
+        if isinstance(fn, LazyHandler):
+            self._lazy.append(fn)
+
+        getattr(router, method)(rule, fn, **options)
+        route = router.routes[-1]
+        self._wrap(route, **extras)
+
+        alias = None if strict_slashes else alternate(rule)
+        if alias is not None:
+            getattr(router, method)(alias, fn, **options)
+            router.routes[-1].app = route.app  # type: ignore
+            router.routes[-1].include_in_schema = False  # type: ignore
+
+    def _offload(self, fn: Handler, executor: ExecutorOption) -> Handler:
+        executor = bounded(executor)
+        if self._metrics is not None and isinstance(executor, BoundedExecutor):
+            self._metrics.executors[id(executor)] = executor
+
+        return offload(fn, executor)
+
+    def _wrap(
+        self,
+        route: BaseRoute,
+        blueprint: str = "",
+        body: Any = None,
+        cache: Any = None,
+        coalesce: Any = None,
+        compress: Any = None,
+        concurrency: Any = None,
+        priority: str = "normal",
+    ) -> None:
+        """
+        `_wrap` layers eggman's per-route behaviour around the ASGI app of a newly registered route.
+        The concurrency limit sits inside the cache so that cached responses are never shed, and the
+        cache inside compression so that a cached response can be served in any content coding.
+        The body limit sits outside the concurrency limit so oversized requests never take a slot.
+        Coalescing sits outside both, so requests waiting on an identical one take no slot either.
+        The access log sits just inside the metrics so that both see the same status and latency.
+        """
+        if concurrency is not None:
+            route.app = ConcurrencyLimit.from_option(concurrency).wrap(route.app, priority)  # type: ignore
+
+        if body is not None:
+            route.app = BodyParser.from_option(body).wrap(route.app)  # type: ignore
+
+        if coalesce:
+            route.app = Coalescer.from_option(coalesce).wrap(route.app)  # type: ignore
+
+        if cache is not None:
+            route.app = ResponseCache.from_option(cache).wrap(route.app)  # type: ignore
+
+        if compress:
+            from eggman.compression import Compressor
+
+            route.app = Compressor.from_option(compress).wrap(route.app)  # type: ignore
+
+        if self._profiler is not None:
+            route.app = self._profiler.wrap(route.app, blueprint, route.path)  # type: ignore
+
+        if self._access_log is not None:
+            route.app = self._access_log.wrap(route.app, blueprint, route.path)  # type: ignore
+
+        if self._metrics is not None:
+            route.app = self._metrics.instrument(route.app, blueprint, route.path)  # type: ignore
+
+    def _render_metrics(self, request: Request) -> Response:
+        assert self._metrics is not None
+        return PlainTextResponse(self._metrics.render(), media_type="text/plain; version=0.0.4")
 
     async def asgi(self, scope: dict, receive: Receive, send: Send) -> None:
         """
@@ -34,17 +288,282 @@ class Server:
         """
         await self._app(scope, receive, send)  # pragma: no cover
 
+    async def on_start(self) -> None:
+        """
+        Freezes the compiled routers once every blueprint constructor in the jab harness has
+        registered its routes, starts importing lazily registered handlers if `warm_up` is set and
+        opens the connections of every registered pool at once. With `workers` greater than one the
+        pools are only opened in the forked workers, which serve the requests.
+        """
+        self._dispatcher.freeze()
+        if self._warm_up and self._lazy:
+            asyncio.ensure_future(warm_up(self._lazy))
+
+        if self._workers == 1 or workers.current() is not None:
+            await pools.start(self._pools)
+
+    async def reload(self, build: Callable[[Server], Any], warm: Sequence[str] = ()) -> None:
+        """
+        Replaces every route of the running server with the routes `build` registers, without
+        dropping a connection or failing a request.
+
+        `build` is called with the server, on which it registers a fresh set of routes as a jab
+        harness would, e.g. `lambda server: api.jab(server, **deps)`. Since blueprints are single
+        use, the blueprint tree must be a fresh one, for instance from re-importing the modules that
+        declare it with `importlib.reload`. The routes are registered into a new route table while
+        requests are still served from the current one.
+
+        The new table is then frozen, its lazily registered handlers imported, any new pools started
+        and the GET requests for the paths in `warm` served from it, failing the reload and keeping
+        the current table if any of them fails. Warm-up requests are left out of the metrics and the
+        access log. Finally the new table replaces the current one in a single assignment. Requests
+        that were already dispatched finish on the table they were dispatched from, every later
+        request is dispatched from the new one.
+        """
+        if self._reloading:
+            raise RuntimeError("Another reload of the server is in progress")
+
+        self._reloading = True
+        try:
+            default = CompiledRouter() if self._compiled else Router()
+            default.lifespan = self._app.router.lifespan
+            for path, endpoint, methods in self._builtin:
+                default.add_route(path, endpoint, methods=methods)  # type: ignore
+
+            dispatcher = Dispatcher(default, compiled=self._compiled)
+
+            # Registration only ever touches `_dispatcher` and `_lazy`, and no request is served
+            # while the synchronous `build` runs, so they can be borrowed for the new table.
+            current = (self._dispatcher, self._lazy)
+            self._dispatcher, self._lazy = dispatcher, []
+            try:
+                build(self)
+            finally:
+                lazy = self._lazy
+                self._dispatcher, self._lazy = current
+
+            dispatcher.freeze()
+            if lazy:
+                await warm_up(lazy)
+
+            await pools.start(self._pools)
+            for path in warm:
+                await self._warm(dispatcher, path)
+
+            self._app.router = default
+            self._dispatcher, self._lazy = dispatcher, lazy
+            self._app.exception_middleware.app = dispatcher
+        finally:
+            self._reloading = False
+
+    async def _warm(self, dispatcher: Dispatcher, path: str) -> None:
+        path, _, query = path.partition("?")
+        scope = {
+            "type": "http",
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "root_path": "",
+            "query_string": query.encode("latin-1"),
+            "headers": [(b"host", (self._host or "localhost").encode("latin-1"))],
+            "server": (self._host or "localhost", self._port or 80),
+            "client": ("127.0.0.1", 0),
+            "app": self._app,
+            WARM_UP: True,
+        }
+        status = 0
+
+        async def send(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        await dispatcher(scope, _empty_receive(), send)
+        if not 200 <= status < 400:
+            raise RuntimeError(f"Warming up {path} after a reload failed with a {status}")
+
+    async def on_stop(self) -> None:
+        """
+        Begins a graceful shutdown of the running server when the jab harness stops.
+        """
+        self.shutdown()
+
+    def shutdown(self) -> None:
+        """
+        Stops accepting new connections and lets in-flight requests drain for at most
+        `drain_timeout` seconds before `run` returns.
+        """
+        if self._server is not None:
+            self._server.should_exit = True
+
+        if self._stopping is not None:
+            self._stopping.set()
+
+        if self._supervisor is not None:
+            self._supervisor.stop()
+
     async def run(self) -> None:
         """
-        Runs the app inside of uvicorn inside of the jab harness.
+        Runs the app inside of the server picked by its `engine`, uvicorn by default, inside of the
+        jab harness.
+
+        `run` serves the app on the event loop it is awaited from, so other coroutines in the jab
+        harness keep running alongside the server. It returns once the server has shut down, either
+        through `shutdown`/`on_stop` or a SIGINT/SIGTERM. Unless the engine picks a protocol,
+        httptools is used to parse requests when it is installed.
 
-        NOTE
-        ----
-        Despite the async definition this function immediately blocks. It's an ugly
-        vestige of when jab did not support an ASGI interface itself and the jab ASGI interface should
-        always be used instead of it.
+        When the Server was created with `workers` greater than one this process becomes an
+        `eggman.workers.Supervisor`, which supervises from the harness event loop, and the already
+        built app is served by the forked workers. When this process is itself a worker forked by
+        `eggman.workers.serve`, the app is served on the socket shared by the supervisor.
         """
-        uvicorn.run(self._app, host=self._host or "0.0.0.0", port=self._port or 8000, lifespan="on")
+        worker = workers.current()
+        if worker is not None:
+            await self._serve_worker(worker)
+            return
+
+        host = self._host or "0.0.0.0"
+        port = self._port or 8000
+
+        if self._workers > 1:
+            # Workers get a little longer than their own drain to exit before they are killed.
+            stop_timeout = 30.0 if self._drain_timeout is None else self._drain_timeout + 5.0
+            supervisor = Supervisor(self._workers, host, port, engine=self._engine, stop_timeout=stop_timeout)
+            self._supervisor = supervisor
+            try:
+                await supervisor.supervise(self._run_worker)
+            finally:
+                self._supervisor = None
+            return
+
+        sock = self._engine.bind(host, port)
+        try:
+            await self._serve(sock)
+        finally:
+            sock.close()
+
+    def _run_worker(self) -> None:
+        import uvicorn
+
+        worker = workers.current()
+        assert worker is not None
+
+        # Forked workers own their thread, so unlike `run` they are free to pick uvloop if it is installed.
+        uvicorn.Config(self._app).setup_event_loop()
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(self._serve_worker(worker))
+
+    async def _serve_worker(self, worker: workers.WorkerContext) -> None:
+        # The worker's signals are handled by its WorkerContext rather than by the server.
+        worker.on_stop(self.shutdown)
+        try:
+            # Pools opened before the fork belong to the supervisor, each worker opens its own.
+            await pools.start(self._pools)
+            if not worker.stopping:
+                await self._serve(worker.socket, install_signal_handlers=False, notify=worker.heartbeat)
+        finally:
+            # No harness stops the pools of a forked worker, which exits once it has served.
+            await pools.stop(self._pools)
+
+    async def _serve(
+        self,
+        sock: socket.socket,
+        install_signal_handlers: bool = True,
+        notify: Optional[Callable[[], Any]] = None,
+    ) -> None:
+        try:
+            if self._engine.name == HYPERCORN:
+                await self._serve_hypercorn(sock, install_signal_handlers, notify)
+            else:
+                await self._serve_uvicorn(sock, install_signal_handlers, notify)
+        finally:
+            # Records of the last requests are still in the ring once the server has drained.
+            if self._access_log is not None:
+                await self._access_log.stop()
+
+    async def _serve_uvicorn(
+        self, sock: socket.socket, install_signal_handlers: bool, notify: Optional[Callable[[], Any]]
+    ) -> None:
+        import uvicorn
+
+        options = {} if notify is None else {"callback_notify": notify, "timeout_notify": 1}
+        config = self._engine.uvicorn_config(self._app, lifespan="on", **options)
+        server = uvicorn.Server(config)
+        if self._drain_timeout is not None:
+            server.shutdown = self._bounded(server)  # type: ignore
+
+        if not install_signal_handlers:
+            server.install_signal_handlers = lambda: None
+
+        self._server = server
+        try:
+            await server.serve(sockets=[sock])
+        finally:
+            self._server = None
+
+    async def _serve_hypercorn(
+        self, sock: socket.socket, install_signal_handlers: bool, notify: Optional[Callable[[], Any]]
+    ) -> None:
+        from hypercorn.asyncio import serve
+
+        # hypercorn takes ownership of the socket it serves, so it is handed a duplicate.
+        listener = sock.dup()
+        config = self._engine.hypercorn_config(listener, self._drain_timeout)
+
+        loop = asyncio.get_event_loop()
+        self._stopping = asyncio.Event()
+        if install_signal_handlers:
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(sig, self.shutdown)
+
+        heartbeat = None if notify is None else asyncio.ensure_future(self._heartbeat(notify))
+        try:
+            await serve(self._app, config, shutdown_trigger=self._stopping.wait)  # type: ignore
+        finally:
+            self._stopping = None
+            if heartbeat is not None:
+                heartbeat.cancel()
+
+            if install_signal_handlers:
+                for sig in (signal.SIGINT, signal.SIGTERM):
+                    loop.remove_signal_handler(sig)
+
+    async def _heartbeat(self, notify: Callable[[], Any]) -> None:
+        while True:
+            await notify()
+            await asyncio.sleep(1)
+
+    def _bounded(self, server: uvicorn.Server) -> Callable:
+        """
+        Returns the `shutdown` of `server` with its graceful shutdown bounded by the drain timeout.
+        Once it is over, the requests still running are cancelled, their connections closed and the
+        app's shutdown handlers run as they would have after a complete drain.
+        """
+        shutdown = server.shutdown
+
+        async def bounded_shutdown(*args: Any, **kwargs: Any) -> None:
+            draining = asyncio.ensure_future(shutdown(*args, **kwargs))
+            await asyncio.wait([draining], timeout=self._drain_timeout)
+            if draining.done():
+                await draining
+                return
+
+            # uvicorn skips the lifespan shutdown when forced to exit, so it is sent here instead.
+            server.force_exit = True
+            await draining
+
+            tasks = list(server.server_state.tasks)
+            for task in tasks:
+                task.cancel()
+            for connection in list(server.server_state.connections):
+                connection.transport.close()
+
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await server.lifespan.shutdown()
+
+        return bounded_shutdown
 
     @property
     def starlette(self) -> Starlette:
@@ -0,0 +1,190 @@
+"""
+Route table snapshots.
+
+`Blueprint.jab` resolves every handler into a `RouteTable`: it parses qualified names to tell
+methods from functions, resolves type hints and hoists the dependencies of every handler class.
+A snapshot is that resolved table pickled to disk next to the modification time and size of the
+source of every module it refers to, so that a later process can skip the resolution as long as no
+source file changed.
+
+Route options and handler objects, such as a `ResponseCache` or a `StaticFiles` app, are not stored:
+they are written as references to the route they were registered on and bound back to the objects
+the loading process registered, so that their state is shared with the live registration.
+
+Snapshots are pickles and must only be loaded from locations the service itself controls.
+"""
+import copyreg
+import hashlib
+import io
+import logging
+import os
+import pickle
+import sys
+from typing import IO, Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from eggman.types import HandlerPkg, RouteTable
+
+logger = logging.getLogger("eggman.snapshot")
+
+VERSION = 2
+
+# Option values that are pickled as they are rather than bound back to the registered ones.
+_PLAIN = (str, bytes, int, float, bool, type(None))
+
+
+def fingerprint(name: str, routes: Iterable[HandlerPkg], websockets: Iterable[HandlerPkg]) -> str:
+    """
+    Returns a digest of the shape of a blueprint: which handlers are registered under which rules
+    and which options they set.
+    """
+    lines = [name]
+    for kind, pkgs in (("http", routes), ("websocket", websockets)):
+        for fn, rule, options in pkgs:
+            # ASGI app instances are bound back from the registered routes and only their class matters.
+            qualname = getattr(fn, "__qualname__", None) or type(fn).__qualname__
+            lines.append(f"{kind} {getattr(fn, '__module__', '')}:{qualname} {rule} {','.join(options)}")
+
+    return hashlib.sha1("\n".join(lines).encode()).hexdigest()
+
+
+def _reduce_pkg(pkg: HandlerPkg) -> Tuple[Any, ...]:
+    # Unpickled with the tuple constructor rather than the namedtuple's own, which is written in Python.
+    return tuple.__new__, (HandlerPkg, tuple(pkg))
+
+
+class _Pickler(pickle.Pickler):
+    def __init__(self, file: IO[bytes], live: Dict[int, Tuple[str, int, Optional[str]]]) -> None:
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.dispatch_table = {**copyreg.dispatch_table, HandlerPkg: _reduce_pkg}  # type: ignore
+        self.live = live
+
+    def persistent_id(self, obj: Any) -> Optional[Tuple[str, int, Optional[str]]]:
+        return self.live.get(id(obj))
+
+
+class _Unpickler(pickle.Unpickler):
+    def __init__(self, file: IO[bytes], pkgs: Dict[str, Sequence[HandlerPkg]]) -> None:
+        super().__init__(file)
+        self.pkgs = pkgs
+
+    def persistent_load(self, pid: Tuple[str, int, Optional[str]]) -> Any:
+        kind, index, key = pid
+        fn, _, options = self.pkgs[kind][index]
+        return fn if key is None else options[key]
+
+
+def _live(
+    routes: Sequence[HandlerPkg], websockets: Sequence[HandlerPkg]
+) -> Dict[int, Tuple[str, int, Optional[str]]]:
+    """
+    Maps the handlers and option values of the registered routes to references to the route that
+    registered them.
+    """
+    live: Dict[int, Tuple[str, int, Optional[str]]] = {}
+    for kind, pkgs in (("http", routes), ("websocket", websockets)):
+        for index, (fn, _, options) in enumerate(pkgs):
+            live.setdefault(id(fn), (kind, index, None))
+            for key, value in options.items():
+                if not isinstance(value, _PLAIN):
+                    live.setdefault(id(value), (kind, index, key))
+
+    return live
+
+
+def _modules(table: RouteTable) -> Set[str]:
+    modules: Set[str] = set()
+
+    for unbound in (table.routes, table.websockets):
+        modules.update(cls_.__module__ for cls_ in unbound.constructors.values())
+        modules.update(getattr(type_, "__module__", "") for type_ in unbound.deps.values())
+
+    for fn, _, _ in table.func_routes + table.func_websockets:
+        modules.add(getattr(fn, "__module__", ""))
+
+    return modules
+
+
+def _source_stamp(module: str) -> Optional[List[int]]:
+    path = getattr(sys.modules.get(module), "__file__", None)
+    if not path:
+        return None
+
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _source_stamps(modules: Iterable[str]) -> Optional[Dict[str, List[int]]]:
+    stamps = {}
+    for module in modules:
+        # Builtin and typing annotations have no source to track and never change underneath us.
+        if module in ("builtins", "typing", ""):
+            continue
+
+        stamp = _source_stamp(module)
+        if stamp is None:
+            return None
+
+        stamps[module] = stamp
+
+    return stamps
+
+
+def dump(
+    path: str, table: RouteTable, shape: str, routes: Sequence[HandlerPkg], websockets: Sequence[HandlerPkg]
+) -> bool:
+    """
+    Writes `table`, resolved from the registered `routes` and `websockets`, to `path`. Tables that
+    refer to handlers or types that cannot be pickled by reference, or that live in modules without
+    a source file, are not written.
+    """
+    stamps = _source_stamps(_modules(table))
+    if stamps is None:
+        logger.debug("Not writing route snapshot %s: some modules have no source file", path)
+        return False
+
+    buffer = io.BytesIO()
+    try:
+        pickle.dump({"version": VERSION, "shape": shape, "sources": stamps}, buffer)
+        _Pickler(buffer, _live(routes, websockets)).dump(table)
+    except (pickle.PicklingError, AttributeError, TypeError) as e:
+        logger.debug("Not writing route snapshot %s: %s", path, e)
+        return False
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(buffer.getbuffer())
+    os.replace(tmp, path)
+
+    return True
+
+
+def load(
+    path: str, shape: str, routes: Sequence[HandlerPkg], websockets: Sequence[HandlerPkg]
+) -> Optional[RouteTable]:
+    """
+    Reads the table stored at `path`, binding its handlers and options back to the registered
+    `routes` and `websockets`. Returns None if there is none or if it was built from a blueprint of
+    a different shape or from source files that have since changed.
+    """
+    try:
+        with open(path, "rb") as f:
+            header = pickle.load(f)
+            if header.get("version") != VERSION or header.get("shape") != shape:
+                return None
+
+            sources: Dict[str, List[int]] = header["sources"]
+            if _source_stamps(sources) != sources:
+                return None
+
+            table: RouteTable = _Unpickler(f, {"http": routes, "websocket": websockets}).load()
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning("Ignoring unreadable route snapshot %s: %s", path, e)
+        return None
+
+    return table
@@ -0,0 +1,302 @@
+from __future__ import annotations
+
+import mmap
+import os
+import re
+import stat
+import time
+from email.utils import formatdate
+from mimetypes import guess_type
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from starlette.background import BackgroundTask
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+# Precompressed siblings, in order of preference, by the content coding they are served with.
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+_BYTE_RANGE = re.compile(r"([0-9]*)-([0-9]*)")
+
+
+class FileStat(NamedTuple):
+    path: str
+    size: int
+    etag: str
+    last_modified: str
+
+
+def file_stat(path: str) -> Optional[FileStat]:
+    """
+    Returns the `FileStat` of the regular file at `path`, resolving symlinks, or None if there is none.
+    """
+    try:
+        real = os.path.realpath(path)
+        st = os.stat(real)
+    except OSError:
+        return None
+
+    if not stat.S_ISREG(st.st_mode):
+        return None
+
+    return _from_stat(real, st)
+
+
+def _from_stat(path: str, st: os.stat_result) -> FileStat:
+    etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+    return FileStat(path, st.st_size, etag, formatdate(st.st_mtime, usegmt=True))
+
+
+class StatIndex:
+    """
+    `StatIndex` caches the `FileStat` of files, including the absence of a file, so that serving a
+    file does not cost a `stat` of it and of each of its precompressed siblings on every request.
+    Entries are checked against the filesystem again once they are `ttl` seconds old. The index is
+    simply emptied when it grows past `max_entries`.
+    """
+
+    def __init__(self, ttl: float = 1.0, max_entries: int = 4096) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: Dict[str, Tuple[float, Optional[FileStat]]] = {}
+
+    def get(self, path: str) -> Optional[FileStat]:
+        now = time.monotonic()
+        cached = self._entries.get(path)
+        if cached is not None and now - cached[0] < self.ttl:
+            return cached[1]
+
+        if len(self._entries) >= self.max_entries:
+            self._entries.clear()
+
+        entry = file_stat(path)
+        self._entries[path] = (now, entry)
+        return entry
+
+
+def _parse_range(value: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Returns the `(start, end)` byte offsets, end exclusive, of a single range `Range` header, or None
+    if it cannot be satisfied. Raises ValueError for headers that are not a single valid byte range,
+    such as `bytes=5-3`, which are ignored in favour of serving the whole file.
+    """
+    unit, _, spec = value.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        raise ValueError(value)
+
+    match = _BYTE_RANGE.fullmatch(spec.strip())
+    if match is None or match.group(0) == "-":
+        raise ValueError(value)
+
+    first, last = match.groups()
+    if not first:
+        length = int(last)
+        if length == 0:
+            return None
+        return max(size - length, 0), size
+
+    start = int(first)
+    end = int(last) + 1 if last else size
+    if last and end <= start:
+        raise ValueError(value)
+
+    if start >= size:
+        return None
+
+    return start, min(end, size)
+
+
+class FileResponse(Response):
+    """
+    `FileResponse` serves a file from disk without reading it through Python when the server allows.
+    The body is handed over through the ASGI `http.response.zerocopy` extension, for the server
+    to `sendfile` it, or the `http.response.pathsend` extension when the server supports either.
+    Otherwise it is sent in `chunk_size` chunks sliced out of a memory mapping of the file.
+
+    Conditional `If-None-Match` requests are answered with a 304 and requests for a single byte
+    `Range`, optionally guarded by `If-Range`, with a 206. Its constructor is compatible with
+    Starlette's `FileResponse` and additionally accepts the file's `FileStat`.
+    """
+
+    chunk_size = 256 * 1024
+
+    def __init__(
+        self,
+        path: str,
+        status_code: int = 200,
+        headers: Optional[dict] = None,
+        media_type: Optional[str] = None,
+        background: Optional[BackgroundTask] = None,
+        filename: Optional[str] = None,
+        stat_result: Optional[os.stat_result] = None,
+        method: Optional[str] = None,
+        file: Optional[FileStat] = None,
+    ) -> None:
+        self.path = path
+        self.status_code = status_code
+        self.filename = filename
+        self.send_header_only = method is not None and method.upper() == "HEAD"
+        self.media_type = media_type or guess_type(filename or path)[0] or "text/plain"
+        self.background = background  # type: ignore
+        self.file = file
+        if file is None and stat_result is not None:
+            self.file = _from_stat(path, stat_result)
+
+        self.init_headers(headers)  # type: ignore
+
+        if self.filename is not None:
+            self.headers.setdefault("content-disposition", f'attachment; filename="{self.filename}"')
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        file = self.file or file_stat(self.path)
+        if file is None:
+            raise RuntimeError(f"File at path {self.path} does not exist or is not a file.")
+
+        request = Headers(scope=scope)
+        self.headers.setdefault("etag", file.etag)
+        self.headers.setdefault("last-modified", file.last_modified)
+        self.headers.setdefault("accept-ranges", "bytes")
+
+        if self._not_modified(request.get("if-none-match"), file.etag):
+            del self.headers["content-type"]
+            await self._send(send, 304, b"")
+            return
+
+        status, start, end = self.status_code, 0, file.size
+        if status == 200 and "range" in request and request.get("if-range", file.etag) == file.etag:
+            try:
+                satisfiable = _parse_range(request["range"], file.size)
+            except ValueError:
+                satisfiable = (0, file.size)
+
+            if satisfiable is None:
+                self.headers["content-range"] = f"bytes */{file.size}"
+                self.headers["content-length"] = "0"
+                await self._send(send, 416, b"")
+                return
+
+            start, end = satisfiable
+            if (start, end) != (0, file.size):
+                status = 206
+                self.headers["content-range"] = f"bytes {start}-{end - 1}/{file.size}"
+
+        self.headers["content-length"] = str(end - start)
+        await send({"type": "http.response.start", "status": status, "headers": self.raw_headers})
+
+        if self.send_header_only or scope.get("method") == "HEAD" or end == start:
+            await send({"type": "http.response.body", "body": b""})
+        else:
+            await self._send_body(scope, send, file, start, end)
+
+        if self.background is not None:
+            await self.background()
+
+    def _not_modified(self, if_none_match: Optional[str], etag: str) -> bool:
+        if not if_none_match:
+            return False
+
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+    async def _send(self, send: Send, status: int, body: bytes) -> None:
+        await send({"type": "http.response.start", "status": status, "headers": self.raw_headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def _send_body(self, scope: Scope, send: Send, file: FileStat, start: int, end: int) -> None:
+        extensions = scope.get("extensions") or {}
+
+        if "http.response.zerocopy" in extensions:
+            with open(file.path, "rb") as f:
+                message = {"type": "http.response.zerocopy", "file": f, "offset": start, "count": end - start}
+                await send(message)
+            return
+
+        if "http.response.pathsend" in extensions and (start, end) == (0, file.size):
+            await send({"type": "http.response.pathsend", "path": file.path})
+            return
+
+        with open(file.path, "rb") as f:
+            # A file that shrank since it was stat'ed must not be read past its end through the
+            # mapping, that would fault.
+            end = min(end, os.fstat(f.fileno()).st_size)
+            if end <= start:
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                position = start
+                while position < end:
+                    chunk = mapped[position : min(position + self.chunk_size, end)]
+                    position += len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": position < end})
+
+
+class StaticFiles:
+    """
+    `StaticFiles` is an ASGI app serving the files below `directory` with `FileResponse`, taking
+    the path of the file from the route's `path` parameter, or the request path when there is none.
+    Paths that resolve outside of `directory` are not served.
+
+    When `precompressed` is set and the client accepts it, a `.br` or `.gz` sibling of the file is
+    served in its place with the matching `Content-Encoding`. File metadata is looked up through a
+    `StatIndex`, and `max_age` sets the `Cache-Control` max-age of the responses.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        precompressed: bool = True,
+        max_age: Optional[int] = None,
+        index: Optional[StatIndex] = None,
+    ) -> None:
+        self.directory = os.path.realpath(directory)
+        self.precompressed = precompressed
+        self.max_age = max_age
+        self.index = index if index is not None else StatIndex()
+
+    def __repr__(self) -> str:
+        return f"StaticFiles({self.directory!r})"
+
+    def lookup(self, relative: str) -> Optional[FileStat]:
+        file = self.index.get(os.path.join(self.directory, relative.lstrip("/")))
+        if file is None or os.path.commonpath([self.directory, file.path]) != self.directory:
+            return None
+
+        return file
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        relative = scope.get("path_params", {}).get("path", scope["path"])
+
+        file = self.lookup(relative)
+        if file is None:
+            await Response("Not Found", status_code=404, media_type="text/plain")(scope, receive, send)
+            return
+
+        headers = {}
+        if self.max_age is not None:
+            headers["cache-control"] = f"public, max-age={self.max_age}"
+
+        if self.precompressed:
+            headers["vary"] = "Accept-Encoding"
+            accepted = self._accepted(Headers(scope=scope).get("accept-encoding", ""))
+
+            for encoding, suffix in ENCODINGS:
+                sibling = self.lookup(relative + suffix) if encoding in accepted else None
+                if sibling is not None:
+                    headers["content-encoding"] = encoding
+                    media_type = guess_type(file.path)[0]
+                    response = FileResponse(file.path, headers=headers, media_type=media_type, file=sibling)
+                    await response(scope, receive, send)
+                    return
+
+        await FileResponse(file.path, headers=headers, file=file)(scope, receive, send)
+
+    def _accepted(self, accept_encoding: str) -> Tuple[str, ...]:
+        accepted = []
+        for token in accept_encoding.split(","):
+            coding, _, params = token.partition(";")
+            if params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+                accepted.append(coding.strip().lower())
+
+        return tuple(accepted)
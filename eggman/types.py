@@ -1,12 +1,26 @@
 from collections import namedtuple
-from inspect import getmodule
-from typing import Any, Callable, Dict, List, Type, get_type_hints
+from inspect import getmodule, isfunction
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, NamedTuple, Type, get_type_hints
 
-from eggman.alias import Request, Response, WebSocket
+if TYPE_CHECKING:  # pragma: no cover
+    from eggman.alias import Request, Response, WebSocket  # noqa: F401
 
-Handler = Callable[[Request], Response]
+# Forward references keep Starlette from being imported along with the blueprint declarations.
+Handler = Callable[["Request"], "Response"]
 HandlerPkg = namedtuple("HandlerPkg", ["fn", "rule", "options"])
-WebSocketHandler = Callable[[WebSocket], None]
+WebSocketHandler = Callable[["WebSocket"], None]
+
+
+class RouteTable(NamedTuple):
+    """
+    `RouteTable` holds the handlers of a blueprint once they have been split into the unbound
+    methods of handler classes, whose dependencies have been hoisted, and plain functions.
+    """
+
+    routes: "UnboundMethodConstructor"
+    websockets: "UnboundMethodConstructor"
+    func_routes: List[HandlerPkg]
+    func_websockets: List[HandlerPkg]
 
 
 class BlueprintAlreadyInvoked(Exception):
@@ -19,6 +33,7 @@ class BlueprintAlreadyInvoked(Exception):
 class UnboundMethodConstructor:
     def __init__(self) -> None:
         self._offset = 0
+        self._shadows: Dict[Type, str] = {}
         self.deps: Dict[str, Type] = {}
         self.constructors: Dict[str, Type] = {}
         self.constructor_deps: Dict[str, Dict[str, str]] = {}
@@ -28,33 +43,50 @@ class UnboundMethodConstructor:
         self._offset += n
 
     def add(self, fn: Callable, rule: str, **options: Any) -> None:
-        mod = getmodule(fn)
+        if not isfunction(fn):
+            # ASGI apps such as `eggman.static.StaticFiles` are served as they are.
+            raise ValueError(f"{fn!r} is not a function")
 
         cls_name, fn_name = tuple(fn.__qualname__.split("<locals>", 1)[0].rsplit(".", 1))
 
-        class_ = getattr(mod, cls_name)
+        if cls_name not in self.constructors:
+            # A class's dependencies only need to be resolved and hoisted the first time one of its
+            # methods is seen, every other method of the class shares them.
+            class_ = getattr(getmodule(fn), cls_name)
 
-        if not self.constructors.get(cls_name):
             self.constructors[cls_name] = class_
-
-        if not self.constructor_routes.get(cls_name):
             self.constructor_routes[cls_name] = []
-
-        if not self.constructor_deps.get(cls_name):
-            self.constructor_deps[cls_name] = {}
+            self.constructor_deps[cls_name] = self._hoist(class_)
 
         self.constructor_routes[cls_name].append(HandlerPkg(fn_name, rule, options))
 
+    def _hoist(self, class_: Type) -> Dict[str, str]:
+        deps = {}
+
         for arg, type_ in get_type_hints(class_.__init__).items():
             if arg == "return":
                 continue
 
+            deps[arg] = self._shadow(type_)
+
+        return deps
+
+    def _shadow(self, type_: Type) -> str:
+        try:
+            existing = self._shadows.get(type_)
+        except TypeError:
+            # Unhashable annotations fall back to comparing against every hoisted dependency.
             existing = next((k for k, v in self.deps.items() if v == type_), None)
 
-            if existing:
-                self.constructor_deps[cls_name][arg] = existing
-                continue
+        if existing:
+            return existing
+
+        shadow_arg = f"arg{len(self.deps) + self._offset}"
+        self.deps[shadow_arg] = type_
+
+        try:
+            self._shadows[type_] = shadow_arg
+        except TypeError:
+            pass
 
-            shadow_arg = f"arg{len(self.deps) + self._offset}"
-            self.deps[shadow_arg] = type_
-            self.constructor_deps[cls_name][arg] = shadow_arg
+        return shadow_arg
@@ -0,0 +1,342 @@
+from __future__ import annotations
+
+import asyncio
+import copy
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+from typing import Callable, Dict, List, MutableSequence, NamedTuple, Optional
+
+from typing_extensions import Protocol
+
+from eggman.engine import Engine
+
+logger = logging.getLogger("eggman.workers")
+
+HANDLED_SIGNALS = (signal.SIGINT, signal.SIGTERM)
+
+
+class Runnable(Protocol):
+    def run(self) -> None:
+        pass  # pragma: no cover
+
+
+class WorkerHealth(NamedTuple):
+    slot: int
+    pid: int
+    alive: bool
+    last_heartbeat: float
+    restarts: int
+
+
+class WorkerContext:
+    """
+    `WorkerContext` is the state a forked worker process inherits from its `Supervisor`:
+    the shared listening socket and the slot in which it reports its heartbeat.
+    """
+
+    def __init__(self, slot: int, sock: socket.socket, heartbeats: MutableSequence[float]) -> None:
+        self.slot = slot
+        self.socket = sock
+        self._heartbeats = heartbeats
+        self._stop_callbacks: List[Callable[[], None]] = []
+        self.stopping = False
+
+    @property
+    def workers(self) -> int:
+        """
+        The number of workers forked by the supervisor, this one included.
+        """
+        return len(self._heartbeats)
+
+    async def heartbeat(self) -> None:
+        self._heartbeats[self.slot] = time.time()
+
+    def on_stop(self, fn: Callable[[], None]) -> None:
+        self._stop_callbacks.append(fn)
+
+    def stop(self, *args: object) -> None:
+        self.stopping = True
+        for fn in self._stop_callbacks:
+            fn()
+
+
+_current: Optional[WorkerContext] = None
+
+
+def current() -> Optional[WorkerContext]:
+    """
+    Returns the `WorkerContext` of this process if it was forked by a `Supervisor`.
+    """
+    return _current
+
+
+class Supervisor:
+    """
+    `Supervisor` binds a single listening socket and pre-forks `workers` processes that all
+    accept connections from it. The supervisor restarts workers that exit or stop reporting
+    heartbeats and performs a rolling restart, one worker at a time, when it receives SIGHUP.
+    The socket is bound with the options of `engine`, its listen backlog replaced by `backlog` when
+    that is given.
+
+    A worker that keeps exiting is restarted after a delay that doubles with every exit, from
+    `backoff` seconds up to `max_backoff`, until it stays up for `max_backoff` seconds. Workers
+    that are stopped get `stop_timeout` seconds to exit after SIGTERM before they are killed.
+    """
+
+    # Seconds between two checks of the workers' health.
+    interval = 0.5
+
+    def __init__(
+        self,
+        workers: int,
+        host: str = "0.0.0.0",
+        port: int = 8000,
+        backlog: Optional[int] = None,
+        health_timeout: float = 30.0,
+        engine: Optional[Engine] = None,
+        stop_timeout: float = 30.0,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+    ) -> None:
+        self.workers = workers
+        self.host = host
+        self.port = port
+        self.health_timeout = health_timeout
+        self.stop_timeout = stop_timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self.engine = copy.copy(engine) if engine is not None else Engine()
+        if backlog is not None:
+            self.engine.backlog = backlog
+
+        self._socket: Optional[socket.socket] = None
+        self._heartbeats: MutableSequence[float] = multiprocessing.Array("d", workers, lock=False)
+        self._pids: Dict[int, int] = {}
+        self._restarts = [0] * workers
+        # When each worker was spawned, how many times in a row it exited early and, while it is
+        # down, when it is due to be spawned again.
+        self._spawned = [0.0] * workers
+        self._failures = [0] * workers
+        self._due: Dict[int, float] = {}
+        self._should_exit = False
+        self._should_reload = False
+
+    @property
+    def backlog(self) -> int:
+        return self.engine.backlog
+
+    def bind(self) -> socket.socket:
+        return self.engine.bind(self.host, self.port)
+
+    def health(self) -> List[WorkerHealth]:
+        report = []
+        for slot in range(self.workers):
+            pid = self._pids.get(slot, 0)
+            report.append(
+                WorkerHealth(slot, pid, self._alive(pid), self._heartbeats[slot], self._restarts[slot])
+            )
+
+        return report
+
+    def run(self, target: Callable[[], None], threaded: bool = True) -> None:
+        """
+        Runs `supervise` on an event loop of its own. From inside a running event loop, await
+        `supervise` instead.
+        """
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(self.supervise(target, threaded))
+        finally:
+            loop.close()
+
+    async def supervise(self, target: Callable[[], None], threaded: bool = True) -> None:
+        """
+        Forks the workers, each of which calls `target` and exits when it returns, and supervises
+        them from the running event loop until SIGINT, SIGTERM or `stop`. `threaded` runs `target`
+        in a fresh thread of the worker, which is required for a `target` that runs an event loop:
+        the worker is forked from inside the supervisor's.
+        """
+        loop = asyncio.get_event_loop()
+        self._socket = self.bind()
+
+        handlers = [(sig, self.stop) for sig in HANDLED_SIGNALS] + [(signal.SIGHUP, self._handle_reload)]
+        for sig, handler in handlers:
+            loop.add_signal_handler(sig, handler)
+
+        logger.info(
+            "Started supervisor [%d] on %s:%d with %d workers",
+            os.getpid(),
+            self.host,
+            self.port,
+            self.workers,
+        )
+
+        try:
+            for slot in range(self.workers):
+                self._spawn(slot, target, threaded)
+
+            while not self._should_exit:
+                if self._should_reload:
+                    self._should_reload = False
+                    await self._rolling_restart(target, threaded)
+
+                await self._check(target, threaded)
+                await asyncio.sleep(self.interval)
+        finally:
+            await self._terminate(list(self._pids))
+            self._socket.close()
+
+            for sig, _ in handlers:
+                loop.remove_signal_handler(sig)
+
+    def stop(self) -> None:
+        """
+        Stops the workers and makes `run` or `supervise` return once they have exited.
+        """
+        self._should_exit = True
+
+    def _spawn(self, slot: int, target: Callable[[], None], threaded: bool) -> None:
+        self._heartbeats[slot] = self._spawned[slot] = time.time()
+
+        pid = os.fork()
+        if pid:
+            self._pids[slot] = pid
+            logger.info("Started worker [%d] in slot %d", pid, slot)
+            return
+
+        global _current
+        code = 0
+        try:
+            # The supervisor's event loop is left behind with its signal wakeup fd, which the
+            # worker's signals must not write to.
+            signal.set_wakeup_fd(-1)
+            _current = WorkerContext(slot, self._socket, self._heartbeats)  # type: ignore
+            for sig in HANDLED_SIGNALS:
+                signal.signal(sig, _current.stop)
+            signal.signal(signal.SIGHUP, signal.SIG_DFL)
+
+            if threaded:
+                thread = threading.Thread(target=target, name=f"eggman-worker-{slot}")
+                thread.start()
+                while thread.is_alive():
+                    thread.join(0.5)
+            else:
+                target()
+        except BaseException:
+            logger.exception("Worker in slot %d crashed", slot)
+            code = 1
+        finally:
+            os._exit(code)
+
+    async def _check(self, target: Callable[[], None], threaded: bool) -> None:
+        now = time.time()
+        for slot in range(self.workers):
+            pid = self._pids.get(slot, 0)
+            if slot in self._due:
+                if now < self._due[slot]:
+                    continue
+            elif not self._alive(pid):
+                logger.warning("Worker [%d] in slot %d exited", pid, slot)
+                self._backoff(slot, now)
+                continue
+            elif now - self._heartbeats[slot] > self.health_timeout:
+                logger.warning("Worker [%d] in slot %d missed its heartbeat, restarting", pid, slot)
+                self._kill(pid, signal.SIGKILL)
+                await self._reap(pid, self.stop_timeout)
+            else:
+                continue
+
+            self._due.pop(slot, None)
+            self._pids.pop(slot, None)
+            self._restarts[slot] += 1
+            self._spawn(slot, target, threaded)
+
+    def _backoff(self, slot: int, now: float) -> None:
+        if now - self._spawned[slot] >= self.max_backoff:
+            self._failures[slot] = 0
+
+        self._failures[slot] += 1
+        delay = min(self.max_backoff, self.backoff * 2 ** (self._failures[slot] - 1))
+        self._due[slot] = now + delay
+        logger.warning("Restarting the worker in slot %d in %.1f seconds", slot, delay)
+
+    async def _rolling_restart(self, target: Callable[[], None], threaded: bool) -> None:
+        for slot in range(self.workers):
+            if self._should_exit:
+                return
+
+            await self._terminate([slot])
+            self._due.pop(slot, None)
+            self._spawn(slot, target, threaded)
+            started = time.time()
+
+            # Wait for the replacement to report a heartbeat before restarting the next worker
+            # so that capacity never drops by more than a single worker.
+            while self._heartbeats[slot] <= started and not self._should_exit:
+                if not self._alive(self._pids[slot]):
+                    break
+                await asyncio.sleep(0.1)
+
+    async def _terminate(self, slots: List[int]) -> None:
+        pids = [pid for pid in (self._pids.pop(slot, 0) for slot in slots) if pid]
+        for pid in pids:
+            self._kill(pid, signal.SIGTERM)
+
+        deadline = time.time() + self.stop_timeout
+        for pid in pids:
+            await self._reap(pid, deadline - time.time())
+
+    async def _reap(self, pid: int, timeout: float) -> None:
+        """
+        Waits up to `timeout` seconds for the worker `pid` to exit, then kills it.
+        """
+        deadline = time.time() + timeout
+        while self._alive(pid):
+            if time.time() >= deadline:
+                logger.warning("Worker [%d] did not exit in time, killing it", pid)
+                self._kill(pid, signal.SIGKILL)
+                try:
+                    os.waitpid(pid, 0)
+                except ChildProcessError:
+                    pass
+                return
+
+            await asyncio.sleep(0.05)
+
+    def _kill(self, pid: int, sig: int) -> None:
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def _alive(self, pid: int) -> bool:
+        if not pid:
+            return False
+
+        try:
+            done, _ = os.waitpid(pid, os.WNOHANG)
+        except ChildProcessError:
+            return False
+
+        return done == 0
+
+    def _handle_reload(self, *args: object) -> None:
+        self._should_reload = True
+
+
+def serve(build: Callable[[], Runnable], workers: int, host: str = "0.0.0.0", port: int = 8000) -> None:
+    """
+    Pre-forks `workers` processes, each of which builds and runs its own jab harness.
+
+    `build` is called inside every worker and returns the harness to run, e.g.
+    `lambda: jab.Harness().provide(app.jab, api.jab, Database)`, so that every worker runs its
+    own constructors and `on_start` hooks. The `eggman.Server` inside each harness serves the
+    socket shared by the supervisor rather than binding its own.
+    """
+    Supervisor(workers, host, port).run(lambda: build().run())
@@ -10,6 +10,14 @@ if sys.version_info.major == 3 and sys.version_info.minor < 7:
 
 VERSION = "0.1.0"
 
+EXTRAS = {
+    "orjson": ["orjson"],
+    "brotli": ["brotli"],
+    "zstd": ["zstandard"],
+    "msgspec": ["msgspec"],
+    "hypercorn": ["hypercorn"],
+}
+
 DEPENDENCIES = ["typing_extensions", "starlette", "jab@git+https://github.com/stntngo/jab.git@master"]
 
 setup(
@@ -20,4 +28,5 @@ setup(
     platforms="ANY",
     url="https://github.com/stntngo/eggman",
     install_requires=DEPENDENCIES,
+    extras_require=EXTRAS,
 )
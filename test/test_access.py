@@ -0,0 +1,204 @@
+import asyncio
+import json
+import os
+import socket
+import tempfile
+from typing import Any, List
+
+from starlette.exceptions import HTTPException
+
+from eggman import PlainTextResponse, Request, Response, Server
+from eggman.access import BINARY, AccessLog, Record, decode_binary
+
+
+async def request(server: Server, method: str, path: str, body: bytes = b"") -> int:
+    status = 0
+
+    async def receive() -> Any:
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message: Any) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    scope = {"type": "http", "method": method, "path": path, "query_string": b"", "headers": []}
+    await server.starlette(scope, receive, send)
+    return status
+
+
+def run(coroutine: Any) -> Any:
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+async def echo(request: Request) -> Response:
+    return PlainTextResponse(await request.body())
+
+
+async def fail(request: Request) -> Response:
+    return PlainTextResponse("failed", status_code=503)
+
+
+async def missing(request: Request) -> Response:
+    raise HTTPException(404)
+
+
+async def crash(request: Request) -> Response:
+    raise RuntimeError("crashed")
+
+
+def test_records_are_written_in_batches():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "access.log")
+        access_log = AccessLog(path, batch_size=4, interval=10.0)
+        server = Server(access_log=access_log)
+        server.add_route(echo, "/items/{id}", methods=["POST"], blueprint="items")
+
+        async def scenario() -> None:
+            for i in range(10):
+                await request(server, "POST", f"/items/{i}", b"hello")
+
+            # A full batch wakes the drainer well before the interval.
+            await asyncio.sleep(0.05)
+            assert access_log.logged == 10
+            await access_log.stop()
+
+        run(scenario())
+        assert access_log.pending == 0
+
+        with open(path) as f:
+            lines = [json.loads(line) for line in f]
+
+    assert len(lines) == 10
+    assert lines[0]["method"] == "POST"
+    assert lines[0]["blueprint"] == "items"
+    assert lines[0]["rule"] == "/items/{id}"
+    assert lines[0]["status"] == 200
+    assert lines[0]["bytes_in"] == 5
+    assert lines[0]["bytes_out"] == 5
+    assert lines[0]["latency"] > 0
+
+
+def test_exceptions_are_logged_with_their_status():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "access.log")
+        access_log = AccessLog(path)
+        server = Server(access_log=access_log)
+        server.add_route(missing, "/missing")
+        server.add_route(crash, "/crash")
+
+        async def scenario() -> None:
+            assert await request(server, "GET", "/missing") == 404
+            try:
+                await request(server, "GET", "/crash")
+            except RuntimeError:
+                pass
+            await access_log.stop()
+
+        run(scenario())
+        with open(path) as f:
+            assert [json.loads(line)["status"] for line in f] == [404, 500]
+
+
+def test_binary_format_round_trips():
+    records = [
+        Record(1.5, "GET", "", "/", 200, 0.25, 0, 10),
+        Record(2.5, "DELETE", "ünicode", "/items/{id}", 404, 0.5, 3, 0),
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "access.bin")
+        access_log = AccessLog(path, format=BINARY)
+
+        async def scenario() -> None:
+            for record in records:
+                access_log.record(record)
+            await access_log.stop()
+
+        run(scenario())
+        with open(path, "rb") as f:
+            assert list(decode_binary(f.read())) == records
+
+
+def test_sampling_keeps_server_errors():
+    access_log = AccessLog(os.devnull, sample=4)
+    server = Server(access_log=access_log)
+    server.add_route(echo, "/echo", methods=["POST"])
+    server.add_route(fail, "/fail")
+
+    async def scenario() -> None:
+        for _ in range(8):
+            await request(server, "POST", "/echo")
+        for _ in range(3):
+            await request(server, "GET", "/fail")
+        await access_log.stop()
+
+    run(scenario())
+    assert access_log.logged == 5
+    assert access_log.skipped == 6
+
+
+def test_full_buffer_drops_records():
+    access_log = AccessLog(os.devnull, capacity=4, batch_size=8)
+    server = Server(access_log=access_log, metrics_path="/metrics")
+    server.add_route(echo, "/echo", methods=["POST"])
+
+    async def scenario() -> str:
+        # Without yielding to the loop the ring is never drained.
+        requests = [request(server, "POST", "/echo") for _ in range(6)]
+        await asyncio.gather(*requests)
+        assert access_log.dropped == 2
+        await access_log.stop()
+        return server._metrics.render()  # type: ignore
+
+    metrics = run(scenario())
+    assert access_log.logged == 4
+    assert "eggman_access_log_dropped_total 2" in metrics
+    assert "eggman_access_log_records_total 4" in metrics
+
+
+def test_unix_socket_target():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "access.sock")
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(path)
+        listener.listen(1)
+
+        access_log = AccessLog(f"unix:{path}")
+        server = Server(access_log=access_log)
+        server.add_route(echo, "/echo", methods=["POST"])
+
+        async def scenario() -> None:
+            await request(server, "POST", "/echo", b"hi")
+            await access_log.stop()
+
+        run(scenario())
+        connection, _ = listener.accept()
+        received: List[bytes] = []
+        while True:
+            chunk = connection.recv(4096)
+            if not chunk:
+                break
+            received.append(chunk)
+        connection.close()
+        listener.close()
+
+    line = json.loads(b"".join(received))
+    assert line["rule"] == "/echo"
+    assert line["bytes_in"] == 2
+
+
+def test_failed_writes_are_counted():
+    access_log = AccessLog("unix:/nonexistent/access.sock")
+
+    async def scenario() -> None:
+        access_log.record(Record(0.0, "GET", "", "/", 200, 0.0, 0, 0))
+        await access_log.stop()
+
+    run(scenario())
+    assert access_log.failed == 1
+    assert access_log.logged == 0
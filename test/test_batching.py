@@ -0,0 +1,115 @@
+import asyncio
+from typing import Any, Dict, List
+
+from starlette.testclient import TestClient
+
+from eggman import Blueprint, JSONResponse, Request, Response, Server
+from eggman.batching import Batcher, batched
+
+
+def run(coroutine: Any) -> Any:
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def test_batches():
+    calls: List[List[int]] = []
+
+    async def squares(keys: List[int]) -> List[Any]:
+        calls.append(keys)
+        return [ValueError(key) if key < 0 else key * key for key in keys]
+
+    batcher: Batcher[int, int] = Batcher(squares, max_batch=10)
+
+    # Concurrent callers of the same key share it, and batches are loaded once they are full.
+    assert run(batcher.get_many([1, 2, 1, 2])) == [1, 4, 1, 4]
+    assert run(batcher.get_many(range(25))) == [i * i for i in range(25)]
+    assert [len(keys) for keys in calls] == [2, 10, 10, 5]
+    assert (batcher.batches, batcher.loaded) == (4, 27)
+
+    async def failing() -> List[Any]:
+        return await asyncio.gather(batcher.get(-1), batcher.get(3), return_exceptions=True)
+
+    error, value = run(failing())
+    assert isinstance(error, ValueError) and value == 9
+
+
+def test_failures():
+    async def partial(keys: List[str]) -> Dict[str, str]:
+        return {key: key.upper() for key in keys if key != "missing"}
+
+    async def broken(keys: List[str]) -> List[str]:
+        raise ConnectionError("down")
+
+    async def short(keys: List[str]) -> List[str]:
+        return keys[1:]
+
+    async def scenario(batcher: Batcher) -> List[Any]:
+        return await asyncio.gather(batcher.get("a"), batcher.get("missing"), return_exceptions=True)
+
+    value, missing = run(scenario(Batcher(partial)))
+    assert value == "A" and isinstance(missing, KeyError)
+
+    assert all(isinstance(result, ConnectionError) for result in run(scenario(Batcher(broken))))
+    assert all(isinstance(result, ValueError) for result in run(scenario(Batcher(short))))
+
+
+class Users:
+    def __init__(self) -> None:
+        self.queries = 0
+
+    @batched(window=0.005)
+    async def get_user(self, names: List[str]) -> Dict[str, dict]:
+        self.queries += 1
+        await asyncio.sleep(0.001)
+        return {name: {"name": name} for name in names}
+
+
+bp = Blueprint("users")
+
+
+class UserHandler:
+    def __init__(self, db: Users) -> None:
+        self.db = db
+
+    @bp.route("/{name}")
+    async def get_user(self, request: Request) -> Response:
+        return JSONResponse(await self.db.get_user(request.path_params["name"]))
+
+
+def test_hoisted_dependency():
+    users = Users()
+    server = Server()
+    constructor = bp.jab
+    (arg,) = [name for name, type_ in constructor.__annotations__.items() if type_ is Users]
+    constructor(server, **{arg: users})
+
+    async def get(name: str) -> bytes:
+        body = b""
+
+        async def receive() -> Any:
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message: Any) -> None:
+            nonlocal body
+            body += message.get("body", b"")
+
+        path = f"/users/{name}"
+        scope = {"type": "http", "method": "GET", "path": path, "query_string": b"", "headers": []}
+        await server.starlette(scope, receive, send)
+        return body
+
+    async def scenario() -> List[bytes]:
+        return await asyncio.gather(*(get(f"user{i % 25}") for i in range(50)))
+
+    assert run(scenario())[26] == b'{"name":"user1"}'
+    assert users.queries == 1
+    assert users.get_user.batcher.loaded == 25
+
+    # TestClient serves requests on the current event loop.
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    assert TestClient(server.starlette).get("/users/eggman").json() == {"name": "eggman"}
+    assert users.queries == 2
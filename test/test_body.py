@@ -0,0 +1,178 @@
+import asyncio
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Any, List, Optional
+
+import pytest
+from starlette.testclient import TestClient
+
+from eggman import JSONResponse, PlainTextResponse, Request, Response, Server
+from eggman.body import BodyParser, InvalidBody, iter_json, read_body, read_form, read_json
+
+
+@dataclass
+class Item:
+    name: str
+    price: float
+
+
+@dataclass
+class Order:
+    id: int
+    items: List[Item]
+    note: Optional[str] = None
+    tags: List[str] = field(default_factory=list)
+
+
+def request(chunks: List[bytes], content_type: str = "application/json") -> Request:
+    messages = [{"type": "http.request", "body": chunk, "more_body": True} for chunk in chunks]
+    messages.append({"type": "http.request", "body": b"", "more_body": False})
+
+    async def receive() -> Any:
+        return messages.pop(0)
+
+    headers = [(b"content-type", content_type.encode())]
+    return Request({"type": "http", "method": "POST", "headers": headers}, receive)
+
+
+def split(body: bytes, size: int) -> List[bytes]:
+    return [body[i : i + size] for i in range(0, len(body), size)]
+
+
+def run(coroutine: Any) -> Any:
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+
+def test_size_limit():
+    calls = []
+
+    async def upload(request: Request) -> Response:
+        calls.append(request)
+        return PlainTextResponse(str(len(await read_body(request))))
+
+    server = Server()
+    server.add_route(upload, "/upload", methods=["POST"], body=10)
+    client = TestClient(server.starlette)
+
+    assert client.post("/upload", data=b"x" * 10).text == "10"
+
+    # Refused from its Content-Length before the handler runs.
+    response = client.post("/upload", data=b"x" * 11)
+    assert response.status_code == 413
+    assert len(calls) == 1
+
+    # Refused while streaming when no length is declared up front.
+    sent = []
+
+    async def send(message: Any) -> None:
+        sent.append(message)
+
+    chunked = request([b"x" * 6, b"x" * 6])
+    scope = {**chunked.scope, "path": "/upload", "query_string": b"", "root_path": ""}
+    run(server.starlette(scope, chunked.receive, send))
+    assert sent[0]["status"] == 413
+
+
+def test_json_into_dataclass():
+    async def create(request: Request) -> Response:
+        order = await read_json(request, into=Order)
+        return JSONResponse({"total": sum(item.price for item in order.items), "note": order.note})
+
+    server = Server()
+    server.add_route(create, "/orders", methods=["POST"])
+    client = TestClient(server.starlette)
+
+    order = {"id": 1, "items": [{"name": "egg", "price": 1}, {"name": "ham", "price": 2.5}]}
+    assert client.post("/orders", json=order).json() == {"total": 3.5, "note": None}
+
+    response = client.post("/orders", json={"id": 1, "items": [{"name": "egg"}]})
+    assert response.status_code == 400
+
+    assert client.post("/orders", data=b"{").status_code == 400
+
+
+def test_iter_json():
+    async def collect(chunks: List[bytes]) -> List[Any]:
+        return [value async for value in iter_json(request(chunks))]
+
+    body = b' [1, 23, {"a": [1, 2]}, "x,]", true, null] '
+    for size in (1, 2, 5, len(body)):
+        assert run(collect(split(body, size))) == [1, 23, {"a": [1, 2]}, "x,]", True, None]
+
+    assert run(collect(split(b'{"a": 1}\n{"a": 2}\n3', 3))) == [{"a": 1}, {"a": 2}, 3]
+    assert run(collect([b"[]"])) == []
+
+    with pytest.raises(InvalidBody):
+        run(collect([b"[1, 2"]))
+
+    with pytest.raises(InvalidBody):
+        run(collect([b"[1 2]"]))
+
+    # Values split anywhere, including inside numbers, literals and escapes, decode the same.
+    body = b'[-1.5e+3, "\\u00e9\\"", true, null, 10]'
+    for size in range(1, 8):
+        assert run(collect(split(body, size))) == [-1500.0, 'é"', True, None, 10]
+
+    # A large value is decoded once rather than once per piece.
+    big = {"data": "x" * 4 * 1024 * 1024}
+    assert run(collect(split(json.dumps([big]).encode(), 64 * 1024))) == [big]
+
+
+def test_iter_json_fails_early():
+    chunks = [b'[1, {"a" 2}, '] + [b"3, " * 1000] * 100
+    consumed = []
+
+    async def receive() -> Any:
+        consumed.append(1)
+        if chunks:
+            return {"type": "http.request", "body": chunks.pop(0), "more_body": True}
+        return {"type": "http.request", "body": b"]", "more_body": False}  # pragma: no cover
+
+    async def collect() -> List[Any]:
+        req = Request({"type": "http", "method": "POST", "headers": []}, receive)
+        return [value async for value in iter_json(req)]
+
+    with pytest.raises(InvalidBody):
+        run(collect())
+    assert len(consumed) == 1
+
+
+def test_multipart(tmp_path):
+    boundary = "eggman-boundary"
+    payload = b"\r\n--eggman-boundar\r\n" + os.urandom(5000)
+    body = b"".join(
+        [
+            b"preamble\r\n",
+            f"--{boundary}\r\n".encode(),
+            b'Content-Disposition: form-data; name="title"\r\n\r\n',
+            "héllo".encode(),
+            f"\r\n--{boundary}\r\n".encode(),
+            b'Content-Disposition: form-data; name="file"; filename="egg.bin"\r\n',
+            b"Content-Type: application/octet-stream\r\n\r\n",
+            payload,
+            f"\r\n--{boundary}--\r\n".encode(),
+        ]
+    )
+    content_type = f"multipart/form-data; boundary={boundary}"
+
+    for size in (1, 7, 64, len(body)):
+        for spool_size in (0, 1024, 1 << 20):
+            parser = BodyParser(spool_size=spool_size, directory=str(tmp_path))
+            form = run(parser.form(request(split(body, size), content_type)))
+
+            assert form["title"] == "héllo"
+            assert form["file"].filename == "egg.bin"
+            assert form["file"].content_type == "application/octet-stream"
+            assert form["file"].file.read() == payload
+
+    with pytest.raises(InvalidBody):
+        run(read_form(request([body[:-20]], content_type)))
+
+    with pytest.raises(InvalidBody):
+        run(BodyParser(max_files=0).form(request([body], content_type)))
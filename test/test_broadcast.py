@@ -0,0 +1,144 @@
+import asyncio
+import json
+from typing import List
+
+from eggman.broadcast import DISCONNECT, SLOW_CONSUMER, Hub, UnixSocketBackend
+
+
+class FakeWebSocket:
+    def __init__(self, stalled: bool = False) -> None:
+        self.sent: List[dict] = []
+        self.closed_with = None
+        self.stalled = asyncio.Event()
+        if not stalled:
+            self.stalled.set()
+        self.disconnect = asyncio.Event()
+
+    async def accept(self) -> None:
+        pass
+
+    async def send(self, message: dict) -> None:
+        await self.stalled.wait()
+        self.sent.append(message)
+
+    async def receive(self) -> dict:
+        await self.disconnect.wait()
+        return {"type": "websocket.disconnect"}
+
+    async def close(self, code: int = 1000) -> None:
+        self.closed_with = code
+
+
+def run(coroutine) -> None:
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(coroutine)
+
+    pending = asyncio.all_tasks(loop)
+    for task in pending:
+        task.cancel()
+    loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+    loop.close()
+
+
+def test_fan_out():
+    async def scenario() -> None:
+        hub = Hub(max_queue=2)
+        fast, slow = FakeWebSocket(), FakeWebSocket(stalled=True)
+        served = asyncio.ensure_future(hub.serve(fast, "prices"))
+        await asyncio.sleep(0)
+        hub.subscribe(slow, "prices", "news")
+
+        for i in range(5):
+            assert hub.publish("prices", {"price": i}) == 2
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.01)
+
+        assert [json.loads(m["text"])["price"] for m in fast.sent] == list(range(5))
+        assert slow.sent == []
+
+        # The stalled client only kept the latest messages.
+        slow.stalled.set()
+        await asyncio.sleep(0.01)
+        assert [json.loads(m["text"])["price"] for m in slow.sent] == [0, 3, 4]
+
+        fast.disconnect.set()
+        await served
+        assert set(hub.channels) == {"prices", "news"}
+        assert hub.publish("prices", b"\x00") == 1
+
+    run(scenario())
+
+
+def test_disconnect_and_batching():
+    async def scenario() -> None:
+        hub = Hub(max_queue=2, policy=DISCONNECT)
+        slow = FakeWebSocket(stalled=True)
+        hub.subscribe(slow, "feed")
+        for i in range(4):
+            hub.publish("feed", str(i))
+        await asyncio.sleep(0.01)
+
+        assert slow.closed_with == SLOW_CONSUMER
+        assert hub.channels == {}
+
+        hub = Hub(batch_separator="\n", max_batch=3)
+        client = FakeWebSocket(stalled=True)
+        hub.subscribe(client, "feed")
+        for i in range(4):
+            hub.publish("feed", str(i))
+        await asyncio.sleep(0.01)
+        client.stalled.set()
+        await asyncio.sleep(0.01)
+
+        assert [m["text"] for m in client.sent] == ["0\n1\n2", "3"]
+
+    run(scenario())
+
+
+def test_batching_keeps_binary_frames_in_order():
+    async def scenario() -> None:
+        hub = Hub(batch_separator="\n")
+        client = FakeWebSocket(stalled=True)
+        hub.subscribe(client, "feed")
+        for message in ["0", "1", b"\x02", "3", b"\x04", b"\x05", "6"]:
+            hub.publish("feed", message)
+        await asyncio.sleep(0.01)
+        client.stalled.set()
+        await asyncio.sleep(0.01)
+
+        assert [m.get("text", m.get("bytes")) for m in client.sent] == [
+            "0\n1",
+            b"\x02",
+            "3",
+            b"\x04",
+            b"\x05",
+            "6",
+        ]
+
+    run(scenario())
+
+
+def test_unix_socket_backend(tmpdir):
+    async def scenario() -> None:
+        path = str(tmpdir.join("hub.sock"))
+        hubs = [Hub(backend=UnixSocketBackend(path, retry=0.01)) for _ in range(3)]
+        clients = [FakeWebSocket() for _ in hubs]
+        for hub, client in zip(hubs, clients):
+            hub.subscribe(client, "feed")
+            await hub.on_start()
+        await asyncio.sleep(0.1)
+
+        assert [hub.backend.relay for hub in hubs] == [True, False, False]
+
+        hubs[1].publish("feed", "from a worker")
+        hubs[0].publish("feed", b"from the relay")
+        await asyncio.sleep(0.05)
+
+        for client in clients:
+            received = {m.get("text") or m.get("bytes") for m in client.sent}
+            assert received == {"from a worker", b"from the relay"}
+
+        for hub in hubs:
+            await hub.on_stop()
+
+    run(scenario())
@@ -0,0 +1,201 @@
+import asyncio
+import multiprocessing
+from typing import Any, AsyncIterator, List
+
+from starlette.testclient import TestClient
+
+from eggman import PlainTextResponse, Request, Response, Server, StreamingResponse
+from eggman.cache import Entry, MemoryBackend, ResponseCache, SharedMemoryBackend
+
+
+def test_backends():
+    memory = MemoryBackend(max_entries=2)
+    for key in (b"a", b"b", b"c"):
+        memory.set(key, Entry(200, [], key, 0.0))
+    assert memory.get(b"a") is None
+    assert memory.get(b"c") == Entry(200, [], b"c", 0.0)
+
+    shared = SharedMemoryBackend(slots=8, slot_size=256)
+    key = b"k" * 20
+    entry = Entry(200, [(b"content-type", b"text/plain")], b"hello", 12.5)
+    assert shared.get(key) is None
+    shared.set(key, entry)
+    assert shared.get(key) == entry
+    assert shared.get(b"x" * 20) is None
+
+    shared.set(b"y" * 20, Entry(200, [], b"x" * 512, 0.0))
+    assert shared.get(b"y" * 20) is None
+
+    # A slot that does not decode is a miss rather than an error.
+    shared._map[shared._offset(key) + 40 : shared._offset(key) + 48] = b"\xff" * 8
+    assert shared.get(key) is None
+
+
+def write_slot(shared: SharedMemoryBackend, key: bytes, fill: bytes) -> None:
+    for i in range(2000):
+        shared.set(key, Entry(200, [], fill * (1000 + i % 1000), 0.0))
+
+
+def test_shared_memory_concurrent_writers():
+    shared = SharedMemoryBackend(slots=1, slot_size=4096)
+    key = b"k" * 20
+    context = multiprocessing.get_context("fork")
+    writers = [context.Process(target=write_slot, args=(shared, key, fill)) for fill in (b"a", b"b", b"c")]
+    for writer in writers:
+        writer.start()
+
+    while any(writer.is_alive() for writer in writers):
+        entry = shared.get(key)
+        if entry is not None:
+            assert entry.body == entry.body[:1] * len(entry.body)
+
+    for writer in writers:
+        writer.join()
+        assert writer.exitcode == 0
+
+    assert shared.get(key) is not None
+
+
+def test_cache_option():
+    calls: List[str] = []
+
+    def handler(request: Request) -> Response:
+        calls.append(request.url.path)
+        return PlainTextResponse(f"{request.path_params['name']} {len(calls)}")
+
+    server = Server()
+    server.add_route(handler, "/users/{name}", cache=60)
+    client = TestClient(server.starlette)
+
+    assert client.get("/users/a").text == "a 1"
+    assert client.get("/users/a").text == "a 1"
+    assert client.get("/users/b").text == "b 2"
+    assert client.get("/users/a?page=2").text == "a 3"
+    assert client.get("/users/a", headers={"Cache-Control": "no-cache"}).text == "a 4"
+    assert len(calls) == 4
+
+    # Tenants of a route served on any host, and credentialed requests, are never served another's page.
+    assert client.get("/users/a", headers={"Host": "other.example.com"}).text == "a 5"
+    assert client.get("/users/a", headers={"Authorization": "Bearer x"}).text == "a 6"
+    assert client.get("/users/a", headers={"Authorization": "Bearer x"}).text == "a 7"
+    assert client.get("/users/a").text == "a 1"
+
+
+def test_cookies_are_not_cached():
+    calls: List[str] = []
+
+    def login(request: Request) -> Response:
+        calls.append(request.url.path)
+        response = PlainTextResponse(f"session {len(calls)}")
+        response.set_cookie("sid", str(len(calls)))
+        return response
+
+    server = Server()
+    server.add_route(login, "/login", cache=60)
+    client = TestClient(server.starlette)
+
+    assert client.get("/login").cookies["sid"] == "1"
+    assert client.get("/login").cookies["sid"] == "2"
+
+
+def test_credentials_and_vary():
+    calls: List[str] = []
+
+    def handler(request: Request) -> Response:
+        calls.append(request.url.path)
+        headers = {"Vary": request.query_params["vary"]} if "vary" in request.query_params else None
+        return PlainTextResponse(f"{request.headers.get('cookie')} {len(calls)}", headers=headers)
+
+    server = Server()
+    server.add_route(handler, "/shared", cache=60)
+    server.add_route(handler, "/keyed", cache=ResponseCache(60, headers=["Cookie", "Accept-Language"]))
+    client = TestClient(server.starlette)
+
+    # Requests with a cookie are only cached when the cookie is part of the key.
+    assert client.get("/shared", headers={"Cookie": "sid=a"}).text == "sid=a 1"
+    assert client.get("/shared", headers={"Cookie": "sid=b"}).text == "sid=b 2"
+    assert client.get("/keyed", headers={"Cookie": "sid=a"}).text == "sid=a 3"
+    assert client.get("/keyed", headers={"Cookie": "sid=b"}).text == "sid=b 4"
+    assert client.get("/keyed", headers={"Cookie": "sid=a"}).text == "sid=a 3"
+
+    # Responses varying on a header outside the key are not stored.
+    assert client.get("/shared?vary=Accept-Language").text == "None 5"
+    assert client.get("/shared?vary=Accept-Language").text == "None 6"
+    assert client.get("/shared?vary=*").text == "None 7"
+    assert client.get("/shared?vary=*").text == "None 8"
+    assert client.get("/keyed?vary=accept-language, Host").text == "None 9"
+    assert client.get("/keyed?vary=accept-language, Host").text == "None 9"
+
+
+def test_coalesce_and_revalidate():
+    calls: List[int] = []
+    cache = ResponseCache(ttl=0.05, stale_while_revalidate=10)
+
+    async def app(scope: Any, receive: Any, send: Any) -> None:
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        await PlainTextResponse(str(len(calls)))(scope, receive, send)
+
+    cached = cache.wrap(app)
+
+    async def request() -> bytes:
+        body = []
+
+        async def send(message: Any) -> None:
+            body.append(message.get("body", b""))
+
+        scope = {"type": "http", "method": "GET", "path": "/", "query_string": b"", "headers": []}
+        await cached(scope, None, send)
+        return b"".join(body)
+
+    async def scenario() -> None:
+        responses = await asyncio.gather(*[request() for _ in range(10)])
+        assert set(responses) == {b"1"} and len(calls) == 1
+
+        await asyncio.sleep(0.1)
+        assert await request() == b"1"
+        await asyncio.sleep(0.05)
+        assert await request() == b"2"
+        assert len(calls) == 2
+
+    asyncio.new_event_loop().run_until_complete(scenario())
+
+
+def test_revalidate_streaming():
+    calls: List[int] = []
+    cache = ResponseCache(ttl=0.05, stale_while_revalidate=10)
+
+    async def chunks(call: int) -> AsyncIterator[bytes]:
+        for _ in range(3):
+            await asyncio.sleep(0.001)
+            yield str(call).encode()
+
+    async def app(scope: Any, receive: Any, send: Any) -> None:
+        calls.append(1)
+        await StreamingResponse(chunks(len(calls)))(scope, receive, send)
+
+    cached = cache.wrap(app)
+
+    async def request() -> bytes:
+        body = []
+
+        async def receive() -> Any:
+            await asyncio.Event().wait()
+
+        async def send(message: Any) -> None:
+            body.append(message.get("body", b""))
+
+        scope = {"type": "http", "method": "GET", "path": "/", "query_string": b"", "headers": []}
+        await cached(scope, receive, send)
+        return b"".join(body)
+
+    async def scenario() -> None:
+        assert await request() == b"111"
+        await asyncio.sleep(0.1)
+
+        # The stale entry is served while the refresh streams the new response in the background.
+        assert await asyncio.wait_for(request(), 1) == b"111"
+        await asyncio.sleep(0.05)
+        assert await request() == b"222"
+
+    asyncio.new_event_loop().run_until_complete(scenario())
@@ -0,0 +1,167 @@
+import asyncio
+from typing import Any, List, Tuple
+
+from starlette.exceptions import HTTPException
+from starlette.testclient import TestClient
+
+from eggman import Blueprint, PlainTextResponse, Request, Response, Server
+from eggman.coalesce import Coalescer, coalesce
+
+
+async def get(server: Server, path: str, query: bytes = b"", headers: Any = ()) -> Tuple[int, bytes]:
+    status = 0
+    body = b""
+
+    async def receive() -> Any:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Any) -> None:
+        nonlocal status, body
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        else:
+            body += message.get("body", b"")
+
+    scope = {"type": "http", "method": "GET", "path": path, "query_string": query, "headers": list(headers)}
+    await server.starlette(scope, receive, send)
+    return status, body
+
+
+def run(coroutine: Any) -> Any:
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def test_followers_share_the_leader_response():
+    calls: List[str] = []
+
+    async def item(request: Request) -> Response:
+        calls.append(request.url.query)
+        call = len(calls)
+        await asyncio.sleep(0.05)
+        return PlainTextResponse(f"{request.path_params['id']} {call}")
+
+    server = Server()
+    server.add_route(item, "/items/{id}", coalesce=Coalescer(query=["page"]))
+
+    async def scenario() -> List[Tuple[int, bytes]]:
+        requests = [get(server, "/items/1", f"page=1&ts={i}".encode()) for i in range(10)]
+        requests += [get(server, "/items/2"), get(server, "/items/1", b"page=2")]
+        return await asyncio.gather(*requests)
+
+    responses = run(scenario())
+    assert len(calls) == 3
+    assert len({body for _, body in responses[:10]}) == 1
+    assert responses[10][1].startswith(b"2 ")
+    assert responses[11][1] != responses[0][1]
+
+    # Nothing is kept once the leader completes.
+    run(get(server, "/items/1", b"page=1"))
+    assert len(calls) == 4
+
+
+def test_errors_and_timeouts():
+    calls = 0
+
+    async def conflict(request: Request) -> Response:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        raise HTTPException(409)
+
+    async def slow(request: Request) -> Response:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.1)
+        return PlainTextResponse("slow")
+
+    server = Server()
+    server.add_route(conflict, "/conflict", coalesce=True)
+    server.add_route(slow, "/slow", coalesce=Coalescer(timeout=0.01))
+
+    async def scenario(path: str) -> List[Tuple[int, bytes]]:
+        return await asyncio.gather(*(get(server, path) for _ in range(5)))
+
+    assert [status for status, _ in run(scenario("/conflict"))] == [409] * 5
+    assert calls == 1
+
+    # Followers that give up waiting call the handler themselves.
+    calls = 0
+    assert [body for _, body in run(scenario("/slow"))] == [b"slow"] * 5
+    assert calls == 5
+
+
+def test_credentials_are_not_shared():
+    calls = 0
+
+    async def me(request: Request) -> Response:
+        nonlocal calls
+        calls += 1
+        user = request.headers.get("authorization", "anonymous")
+        await asyncio.sleep(0.05)
+        response = PlainTextResponse(f"hello {user}")
+        if "cookie" not in request.headers and request.url.path == "/me":
+            response.set_cookie("sid", user)
+        return response
+
+    server = Server()
+    server.add_route(me, "/me", coalesce=True)
+    server.add_route(me, "/profile", coalesce=Coalescer(headers=["Authorization"]))
+
+    def credentials(*users: str) -> List[Any]:
+        return [[(b"authorization", user.encode())] for user in users]
+
+    async def scenario(path: str, requests: List[Any]) -> List[Tuple[int, bytes]]:
+        return await asyncio.gather(*(get(server, path, headers=headers) for headers in requests))
+
+    responses = run(scenario("/me", credentials("alice", "bob")))
+    assert [body for _, body in responses] == [b"hello alice", b"hello bob"]
+    assert calls == 2
+
+    # Listed in `headers`, credentials are part of the key.
+    calls = 0
+    responses = run(scenario("/profile", credentials("alice", "bob", "alice")))
+    assert [body for _, body in responses] == [b"hello alice", b"hello bob", b"hello alice"]
+    assert calls == 2
+
+    # A response setting a cookie is never replayed, even to identical requests.
+    calls = 0
+    run(scenario("/me", [[]] * 3))
+    assert calls == 3
+
+    calls = 0
+    run(scenario("/me", [[(b"cookie", b"sid=alice")]] * 3))
+    assert calls == 3
+
+
+bp = Blueprint("reports")
+
+
+class Reports:
+    def __init__(self) -> None:
+        self.generated = 0
+
+    @bp.route("/{name}")
+    @coalesce(headers=["x-tenant"])
+    async def report(self, request: Request) -> Response:
+        self.generated += 1
+        generated = self.generated
+        await asyncio.sleep(0.05)
+        return PlainTextResponse(f"{request.path_params['name']} {generated}")
+
+
+def test_handler_class_decorator():
+    server = Server()
+    bp.jab(server)
+
+    # TestClient serves requests on the current event loop.
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    assert TestClient(server.starlette).get("/reports/daily").text == "daily 1"
+
+    async def scenario() -> List[Tuple[int, bytes]]:
+        return await asyncio.gather(*(get(server, "/reports/daily") for _ in range(5)))
+
+    assert {body for _, body in run(scenario())} == {b"daily 2"}
@@ -0,0 +1,97 @@
+from starlette.testclient import TestClient
+
+from eggman import JSONResponse, PlainTextResponse, Request, Response, Server, StreamingResponse
+from eggman.compression import Compressor, negotiate
+
+ROWS = [{"id": i, "name": f"row-{i}"} for i in range(200)]
+
+
+def rows(request: Request) -> Response:
+    return JSONResponse(ROWS)
+
+
+def small(request: Request) -> Response:
+    return PlainTextResponse("tiny")
+
+
+def stream(request: Request) -> Response:
+    return StreamingResponse(iter([b"line\n"] * 1000), media_type="text/plain")
+
+
+def tagged(request: Request) -> Response:
+    return PlainTextResponse("x" * 1000, headers={"etag": '"v1"'}, media_type="text/plain")
+
+
+def conditional(request: Request) -> Response:
+    if request.headers.get("if-none-match") == '"v1"':
+        return Response(status_code=304, headers={"etag": '"v1"'})
+
+    return tagged(request)
+
+
+def test_negotiate():
+    available = ["br", "zstd", "gzip"]
+    assert negotiate("gzip, br", available) == "br"
+    assert negotiate("gzip;q=1.0, br;q=0.5", available) == "gzip"
+    assert negotiate("br;q=0, *", available) == "zstd"
+    assert negotiate("identity", available) is None
+    assert negotiate("", available) is None
+
+
+def test_compression():
+    compressor = Compressor(offload_size=4096, encodings=["gzip"])
+    server = Server()
+    server.add_route(rows, "/rows", compress=compressor)
+    server.add_route(small, "/small", compress=compressor)
+    server.add_route(stream, "/stream", compress=compressor)
+    server.add_route(tagged, "/tagged", compress=compressor)
+    server.add_route(rows, "/plain")
+    client = TestClient(server.starlette)
+
+    for _ in range(3):
+        response = client.get("/rows", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert int(response.headers["content-length"]) < len(JSONResponse(ROWS).body)
+        assert response.json() == ROWS
+
+    # Identical responses were compressed once, in the threadpool as they are over `offload_size`.
+    assert (compressor.compressed, compressor.hits) == (1, 2)
+
+    assert "content-encoding" not in client.get("/rows", headers={"Accept-Encoding": "identity"}).headers
+    assert "content-encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in client.get("/plain", headers={"Accept-Encoding": "gzip"}).headers
+
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.content == b"line\n" * 1000
+
+    response = client.get("/tagged", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["etag"] == '"v1-gzip"'
+    assert response.text == "x" * 1000
+
+
+def test_conditional():
+    server = Server()
+    server.add_route(conditional, "/tagged", compress=Compressor(encodings=["gzip"]))
+    client = TestClient(server.starlette)
+
+    # The tag of the compressed representation validates it.
+    response = client.get("/tagged", headers={"Accept-Encoding": "gzip", "If-None-Match": '"v1-gzip"'})
+    assert response.status_code == 304
+    assert response.headers["etag"] == '"v1-gzip"'
+    assert response.headers["vary"] == "Accept-Encoding"
+
+    # A client holding the uncompressed representation gets the compressed one.
+    response = client.get("/tagged", headers={"Accept-Encoding": "gzip", "If-None-Match": '"v1", "v0-gzip"'})
+    assert response.status_code == 200
+    assert response.headers["etag"] == '"v1-gzip"'
+
+    # And the other way around.
+    response = client.get("/tagged", headers={"Accept-Encoding": "identity", "If-None-Match": '"v1-gzip"'})
+    assert response.status_code == 200
+    assert response.headers["etag"] == '"v1"'
+
+    response = client.get("/tagged", headers={"Accept-Encoding": "identity", "If-None-Match": '"v1"'})
+    assert response.status_code == 304
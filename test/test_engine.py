@@ -0,0 +1,124 @@
+import asyncio
+import socket
+import time
+from typing import List
+
+import pytest
+
+from eggman import PlainTextResponse, Request, Response, Server
+from eggman.engine import Engine
+
+
+async def hello(request: Request) -> Response:
+    return PlainTextResponse("hello")
+
+
+async def stall(request: Request) -> Response:
+    await asyncio.sleep(30)
+    return PlainTextResponse("late")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def get(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> bytes:
+    writer.write(b"GET /hello HTTP/1.1\r\nHost: localhost\r\n\r\n")
+    head = await reader.readuntil(b"\r\n\r\n")
+    length = int(head.lower().split(b"content-length: ")[1].split(b"\r\n")[0])
+    return await reader.readexactly(length)
+
+
+def test_keep_alive():
+    port = free_port()
+    server = Server(host="127.0.0.1", port=port, engine=Engine("uvicorn", http="h11", keep_alive=0.2))
+    server.add_route(hello, "/hello")
+
+    async def scenario() -> None:
+        running = asyncio.ensure_future(server.run())
+        for _ in range(100):
+            try:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                break
+            except OSError:
+                await asyncio.sleep(0.02)
+
+        # Both requests are served over the same connection, which is closed once idle.
+        assert await get(reader, writer) == b"hello"
+        assert await get(reader, writer) == b"hello"
+        assert await asyncio.wait_for(reader.read(), 2) == b""
+        writer.close()
+
+        server.shutdown()
+        await asyncio.wait_for(running, 5)
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(scenario())
+    finally:
+        loop.close()
+
+
+def test_drain_timeout():
+    port = free_port()
+    server = Server(host="127.0.0.1", port=port, drain_timeout=0.5)
+    server.add_route(hello, "/hello")
+    server.add_route(stall, "/stall")
+    stopped: List[str] = []
+    server.starlette.add_event_handler("shutdown", lambda: stopped.append("shutdown"))
+
+    async def scenario() -> float:
+        running = asyncio.ensure_future(server.run())
+        for _ in range(100):
+            try:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                break
+            except OSError:
+                await asyncio.sleep(0.02)
+
+        assert await get(reader, writer) == b"hello"
+        writer.write(b"GET /stall HTTP/1.1\r\nHost: localhost\r\n\r\n")
+        await asyncio.sleep(0.1)
+
+        # The stalled request is cancelled once the drain timeout is over.
+        start = time.monotonic()
+        await server.on_stop()
+        await asyncio.wait_for(running, 5)
+        elapsed = time.monotonic() - start
+        writer.close()
+
+        # The app still shut down and no task was left behind.
+        assert stopped == ["shutdown"]
+        assert asyncio.all_tasks() == {asyncio.current_task()}
+        return elapsed
+
+    loop = asyncio.new_event_loop()
+    try:
+        elapsed = loop.run_until_complete(scenario())
+    finally:
+        loop.close()
+
+    assert 0.4 < elapsed < 1.5
+
+
+def test_socket_options():
+    with pytest.raises(ValueError):
+        Engine("gunicorn")
+
+    assert Engine.from_option(None).name == "uvicorn"
+    assert Engine.from_option("hypercorn").name == "hypercorn"
+
+    engine = Engine(reuse_port=True, backlog=16)
+    first = engine.bind("127.0.0.1", 0)
+    port = first.getsockname()[1]
+    # Otherwise asyncio leaves Nagle's algorithm on for the accepted connections.
+    assert first.proto == socket.IPPROTO_TCP
+    second = engine.bind("127.0.0.1", port)
+    first.close()
+    second.close()
+
+    with pytest.raises(OSError):
+        with Engine().bind("127.0.0.1", port), Engine().bind("127.0.0.1", port):
+            pass
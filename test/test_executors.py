@@ -0,0 +1,81 @@
+import asyncio
+import gc
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+from starlette.testclient import TestClient
+
+from eggman import PlainTextResponse, Request, Response, Server
+from eggman.executors import INLINE, BoundedExecutor, bounded, offload
+
+
+class Handlers:
+    def thread(self, request: Request) -> Response:
+        return PlainTextResponse(threading.current_thread().name)
+
+
+def test_executor_selection():
+    pool = BoundedExecutor.threads(1, name="dedicated")
+    handlers = Handlers()
+
+    server = Server(metrics_path="/metrics", executor=ThreadPoolExecutor(1, thread_name_prefix="default"))
+    server.add_route(handlers.thread, "/dedicated", executor=pool)
+    server.add_route(handlers.thread, "/inline", executor=INLINE)
+    server.add_route(handlers.thread, "/default")
+    server.add_route(handlers.thread, "/fallback")
+    client = TestClient(server.starlette)
+
+    assert client.get("/dedicated").text.startswith("eggman-dedicated")
+    assert client.get("/default").text.startswith("default")
+    assert client.get("/inline").text == client.get("/inline").text
+
+    assert client.get("/fallback").text.startswith("default")
+
+    metrics = client.get("/metrics").text
+    assert 'eggman_executor_completed_total{executor="dedicated"} 1' in metrics
+    # Both routes share a single series for the default executor, named after its threads.
+    assert metrics.count('executor_completed_total{executor="default"}') == 1
+    assert 'eggman_executor_completed_total{executor="default"} 2' in metrics
+
+
+def test_plain_executors():
+    first, second = ThreadPoolExecutor(1), ThreadPoolExecutor(1)
+    assert bounded(first) is bounded(first)
+    assert bounded(first).name != bounded(second).name
+    assert bounded(ProcessPoolExecutor(1)).name.startswith("ProcessPoolExecutor-")
+
+    # The wrapper does not keep the executor alive.
+    collected = weakref.ref(first)
+    del first
+    gc.collect()
+    assert collected() is None
+
+
+def test_saturation():
+    release = threading.Event()
+    pool = BoundedExecutor.threads(1, max_pending=1)
+
+    def blocking(request: Request) -> Response:
+        release.wait()
+        return PlainTextResponse("done")
+
+    handler = offload(blocking, pool)
+
+    async def scenario() -> None:
+        first = asyncio.ensure_future(handler(None))
+        await asyncio.sleep(0.01)
+
+        rejected = await handler(None)
+        assert rejected.status_code == 503
+        assert rejected.headers["retry-after"] == "1"
+        assert pool.rejected == 1
+
+        release.set()
+        assert (await first).body == b"done"
+
+    asyncio.new_event_loop().run_until_complete(scenario())
+
+    with pytest.raises(ValueError):
+        offload(blocking, ProcessPoolExecutor(1))
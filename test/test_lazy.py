@@ -0,0 +1,111 @@
+import asyncio
+import subprocess
+import sys
+import textwrap
+from typing import Set, Tuple
+
+from starlette.testclient import TestClient
+
+from eggman import Blueprint, Server
+from eggman.executors import BoundedExecutor
+
+HANDLERS = """
+import threading
+
+from eggman import PlainTextResponse
+
+
+def index(request):
+    return PlainTextResponse(threading.current_thread().name)
+
+
+async def echo(websocket):
+    await websocket.accept()
+    await websocket.send_text(await websocket.receive_text())
+    await websocket.close()
+"""
+
+
+def handlers(tmp_path, monkeypatch, name: str) -> None:
+    (tmp_path / f"{name}.py").write_text(textwrap.dedent(HANDLERS))
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+
+def test_imported_on_first_request(tmp_path, monkeypatch):
+    handlers(tmp_path, monkeypatch, "lazy_first")
+
+    bp = Blueprint("lazy", executor=BoundedExecutor.threads(1, name="lazy"))
+    index = bp.lazy("/", "lazy_first:index")
+    bp.lazy_websocket("/echo", "lazy_first.echo")
+
+    server = Server(warm_up=False)
+    bp.jab(server)
+    client = TestClient(server.starlette)
+
+    assert "lazy_first" not in sys.modules
+    assert not index.resolved
+
+    assert client.get("/lazy/").text.startswith("eggman-lazy")
+    assert client.post("/lazy/").status_code == 405
+    assert index.resolved
+
+    with client.websocket_connect("/lazy/echo") as websocket:
+        websocket.send_text("hello")
+        assert websocket.receive_text() == "hello"
+
+
+def test_warm_up(tmp_path, monkeypatch):
+    handlers(tmp_path, monkeypatch, "lazy_warm")
+
+    bp = Blueprint("warm")
+    index = bp.lazy("/", "lazy_warm:index")
+
+    server = Server()
+    bp.jab(server)
+
+    async def scenario() -> None:
+        await server.on_start()
+        for _ in range(100):
+            if index.resolved:
+                break
+            await asyncio.sleep(0.01)
+
+    asyncio.new_event_loop().run_until_complete(scenario())
+
+    assert index.resolved
+    assert "lazy_warm" in sys.modules
+
+
+def imports(code: str) -> Tuple[float, Set[str]]:
+    """
+    Runs `code` in a fresh interpreter, returning how long it took in seconds and which top-level
+    packages it imported.
+    """
+    script = textwrap.dedent(
+        f"""
+        import sys, time
+
+        start = time.perf_counter()
+        {code}
+        print(time.perf_counter() - start)
+        print(" ".join({{name.split(".")[0] for name in sys.modules}}))
+        """
+    )
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+    elapsed, modules = result.stdout.splitlines()
+    return float(elapsed), set(modules.split())
+
+
+def test_import_time():
+    # Declaring blueprints must not import Starlette or uvicorn, which account for most of the time
+    # it takes to import the server.
+    declared, modules = imports("from eggman import Blueprint; Blueprint('bp').lazy('/', 'svc:index')")
+    assert "eggman" in modules
+    assert "starlette" not in modules
+    assert "uvicorn" not in modules
+
+    served, modules = imports("from eggman import Server; Server().run")
+    assert "starlette" in modules
+    assert "uvicorn" not in modules
+
+    assert declared < served
@@ -0,0 +1,78 @@
+import asyncio
+
+from starlette.testclient import TestClient
+
+from eggman import PlainTextResponse, Request, Response, Server
+from eggman.limits import ConcurrencyLimit
+
+
+def test_shedding():
+    limit = ConcurrencyLimit(2)
+    release = asyncio.Event()
+
+    async def slow(request: Request) -> Response:
+        await release.wait()
+        return PlainTextResponse("done")
+
+    server = Server()
+    server.add_route(slow, "/slow", concurrency=limit)
+    server.add_route(slow, "/sheddable", concurrency=limit, priority="sheddable")
+    app = server.starlette
+
+    async def request(path: str) -> int:
+        sent = []
+
+        async def receive() -> dict:
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message: dict) -> None:
+            sent.append(message)
+
+        scope = {"type": "http", "method": "GET", "path": path, "query_string": b"", "headers": []}
+        await app(scope, receive, send)
+        return sent[0]["status"]
+
+    async def scenario() -> None:
+        first = asyncio.ensure_future(request("/slow"))
+        await asyncio.sleep(0.01)
+
+        assert limit.in_flight == 1
+        assert await request("/sheddable") == 503
+
+        second = asyncio.ensure_future(request("/slow"))
+        await asyncio.sleep(0.01)
+        assert await request("/slow") == 503
+        assert limit.rejected == 2
+
+        release.set()
+        assert await first == 200
+        assert await second == 200
+        assert limit.in_flight == 0
+
+    asyncio.new_event_loop().run_until_complete(scenario())
+
+    client = TestClient(app)
+    assert client.get("/slow").status_code == 200
+
+
+def test_aimd():
+    limit = ConcurrencyLimit(4, adaptive=True, target_latency=0.05, backoff=0.5, max_limit=5)
+
+    for _ in range(4):
+        assert limit.acquire("critical")
+    assert not limit.acquire("critical")
+
+    # Only completions while the limit was in use grow it.
+    for _ in range(4):
+        limit.release(0.001)
+    assert limit.limit == 4.25
+
+    # Slow completions shrink it at most once per `target_latency`.
+    limit.acquire()
+    limit.release(1.0)
+    limit.acquire()
+    limit.release(1.0)
+    assert limit.limit == 2.125
+
+    client = TestClient(ConcurrencyLimit(1).wrap(PlainTextResponse("ok"), "critical"))
+    assert client.get("/").status_code == 200
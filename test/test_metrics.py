@@ -0,0 +1,53 @@
+from starlette.exceptions import HTTPException
+from starlette.testclient import TestClient
+
+from eggman import PlainTextResponse, Request, Response, Server
+from eggman.metrics import Histogram
+
+
+def test_histogram():
+    histogram = Histogram()
+    for us in range(1, 10001):
+        histogram.record(us / 1e6)
+
+    assert histogram.count == 10000
+    assert abs(histogram.quantile(0.5) - 0.005) / 0.005 < 1 / 16
+    assert abs(histogram.quantile(0.99) - 0.0099) / 0.0099 < 1 / 16
+    assert dict(histogram.cumulative((0.001, 0.01)))[0.001] in range(937, 1064)
+    assert dict(histogram.cumulative((0.001, 0.01)))[0.01] in range(9375, 10001)
+
+
+def echo(request: Request) -> Response:
+    return PlainTextResponse(request.path_params["word"])
+
+
+def fail(request: Request) -> Response:
+    raise RuntimeError("fail")
+
+
+def missing(request: Request) -> Response:
+    raise HTTPException(404)
+
+
+def test_route_metrics():
+    server = Server(metrics_path="/metrics")
+    server.add_route(echo, "/echo/{word}", blueprint="api")
+    server.add_route(fail, "/fail", blueprint="api")
+    server.add_route(missing, "/missing", blueprint='say "hi"\\')
+    client = TestClient(server.starlette, raise_server_exceptions=False)
+
+    for _ in range(3):
+        assert client.get("/echo/eggman").text == "eggman"
+    assert client.get("/fail").status_code == 500
+    assert client.get("/missing").status_code == 404
+
+    metrics = client.get("/metrics").text
+    assert 'eggman_requests_total{blueprint="api",rule="/echo/{word}"} 3' in metrics
+    assert 'eggman_response_bytes_total{blueprint="api",rule="/echo/{word}"} 18' in metrics
+    assert 'eggman_errors_total{blueprint="api",rule="/fail"} 1' in metrics
+    assert 'eggman_request_duration_seconds_count{blueprint="api",rule="/echo/{word}"} 3' in metrics
+    assert 'eggman_requests_in_flight{blueprint="api",rule="/echo/{word}"} 0' in metrics
+
+    # An HTTPException is a client error rather than a server one, and label values are escaped.
+    assert 'eggman_requests_total{blueprint="say \\"hi\\"\\\\",rule="/missing"} 1' in metrics
+    assert 'eggman_errors_total{blueprint="say \\"hi\\"\\\\",rule="/missing"} 0' in metrics
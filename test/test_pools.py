@@ -0,0 +1,258 @@
+import asyncio
+from types import SimpleNamespace
+from typing import Any, List, Set, Tuple
+
+import pytest
+from starlette.testclient import TestClient
+
+from eggman import Blueprint, PlainTextResponse, Request, Response, Server
+from eggman.engine import Engine
+from eggman.pools import Pool, PoolClosed, PoolTimeout
+from eggman.workers import WorkerContext
+
+Connection = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+class EchoServer:
+    """
+    A local TCP server standing in for a database, answering every line with the same line.
+    """
+
+    def __init__(self) -> None:
+        self.clients: Set[asyncio.StreamWriter] = set()
+        self.accepted = 0
+        self.port = 0
+
+    async def start(self) -> None:
+        server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        self.port = server.sockets[0].getsockname()[1]
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.accepted += 1
+        self.clients.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                writer.write(line)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.clients.discard(writer)
+            writer.close()
+
+    def drop_all(self) -> None:
+        for writer in list(self.clients):
+            writer.close()
+
+
+class Echo(Pool[Connection]):
+    def __init__(self, server: EchoServer, **options: Any) -> None:
+        super().__init__(**options)
+        self.server = server
+        self.closed = 0
+
+    async def connect(self) -> Connection:
+        return await asyncio.open_connection("127.0.0.1", self.server.port)
+
+    async def close(self, connection: Connection) -> None:
+        self.closed += 1
+        connection[1].close()
+
+    async def check(self, connection: Connection) -> bool:
+        return await echo(connection, "ping") == "ping"
+
+
+async def echo(connection: Connection, text: str) -> str:
+    reader, writer = connection
+    writer.write(f"{text}\n".encode())
+    return (await reader.readline()).decode().strip()
+
+
+def run(scenario: Any) -> None:
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(scenario())
+    finally:
+        pending = asyncio.all_tasks(loop)
+        for task in pending:
+            task.cancel()
+        loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        loop.close()
+
+
+def test_acquire_and_wait():
+    async def scenario() -> None:
+        server = EchoServer()
+        await server.start()
+
+        pool = Echo(server, min_size=2, max_size=2, acquire_timeout=0.05)
+        await pool.on_start()
+        assert (pool.size, server.accepted) == (2, 2)
+
+        first = await pool.acquire()
+        second = await pool.acquire()
+        assert pool.in_use == 2
+
+        with pytest.raises(PoolTimeout):
+            await pool.acquire()
+        assert pool.timeouts == 1
+
+        waiting = asyncio.ensure_future(pool.acquire())
+        await asyncio.sleep(0.01)
+        assert pool.waiting == 1
+        pool.release(first)
+        assert await waiting is first
+
+        pool.release(first)
+        pool.release(second)
+        assert server.accepted == 2
+        assert pool.waits.count == 4
+
+    run(scenario)
+
+
+def test_check_replaces_broken_connections():
+    async def scenario() -> None:
+        server = EchoServer()
+        await server.start()
+
+        pool = Echo(server, min_size=1, max_size=1)
+        await pool.start()
+
+        with pytest.raises(ZeroDivisionError):
+            async with pool.connection() as connection:
+                server.drop_all()
+                1 / 0
+
+        # The connection was in use when the block failed, so it is checked and replaced.
+        async with pool.connection() as replacement:
+            assert replacement is not connection
+            assert await echo(replacement, "hello") == "hello"
+
+        assert (pool.size, pool.closed, server.accepted) == (1, 1, 2)
+
+    run(scenario)
+
+
+def test_stop_drains():
+    async def scenario() -> None:
+        server = EchoServer()
+        await server.start()
+
+        pool = Echo(server, min_size=2, max_size=2)
+        await pool.start()
+        connection = await pool.acquire()
+
+        stopping = asyncio.ensure_future(pool.on_stop())
+        await asyncio.sleep(0.01)
+        assert not stopping.done()
+
+        with pytest.raises(PoolClosed):
+            await pool.acquire()
+
+        pool.release(connection)
+        await stopping
+        assert (pool.size, pool.closed) == (0, 2)
+
+    run(scenario)
+
+
+def test_worker_share_and_fork(monkeypatch):
+    async def scenario() -> None:
+        server = EchoServer()
+        await server.start()
+
+        pool = Echo(server, min_size=1, max_size=10, total_size=8)
+        await pool.start()
+        assert pool.max_size == 10
+
+        # In the third of four forked workers the inherited connection is dropped, not closed.
+        monkeypatch.setattr("eggman.workers.current", lambda: SimpleNamespace(workers=4))
+        monkeypatch.setattr("eggman.pools.os.getpid", lambda: -1)
+        connection = await pool.acquire()
+        assert pool.max_size == 2
+        assert pool.closed == 0
+        assert server.accepted == 2
+        pool.release(connection)
+
+    run(scenario)
+
+
+class Sessions(Pool[List[str]]):
+    async def connect(self) -> List[str]:
+        return []
+
+
+bp = Blueprint("sessions")
+
+
+class Handlers:
+    def __init__(self, sessions: Sessions) -> None:
+        self.sessions = sessions
+
+    @bp.route("/{name}")
+    async def log(self, request: Request) -> Response:
+        async with self.sessions.connection() as session:
+            session.append(request.path_params["name"])
+            return PlainTextResponse(",".join(session))
+
+
+def test_blueprint_dependency():
+    sessions = Sessions(min_size=2)
+    server = Server(metrics_path="/metrics")
+    constructor = bp.jab
+    (arg,) = [name for name, type_ in constructor.__annotations__.items() if type_ is Sessions]
+    constructor(server, **{arg: sessions})
+
+    # TestClient serves requests on the current event loop.
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    loop.run_until_complete(server.on_start())
+    assert sessions.size == 2
+
+    client = TestClient(server.starlette)
+    assert client.get("/sessions/a").text == "a"
+    assert client.get("/sessions/b").text == "a,b"
+
+    metrics = client.get("/metrics").text
+    assert 'eggman_pool_size{pool="Sessions"} 2' in metrics
+    assert 'eggman_pool_acquire_wait_seconds_count{pool="Sessions"} 2' in metrics
+
+
+def test_pools_belong_to_workers():
+    sessions = Sessions(min_size=2)
+    server = Server(workers=2)
+    server.add_pool(sessions)
+
+    async def scenario() -> None:
+        # The supervisor serves no request and opens no connection, whichever hook the harness calls.
+        await server.on_start()
+        await sessions.on_start()
+        assert sessions.size == 0
+
+        sock = Engine().bind("127.0.0.1", 0)
+        worker = WorkerContext(0, sock, [0.0, 0.0])
+        serving = asyncio.ensure_future(server._serve_worker(worker))
+        while server._server is None:
+            await asyncio.sleep(0.01)
+        assert sessions.size == 2
+
+        # A worker stopping drains and closes its pools before it exits.
+        worker.stop()
+        await asyncio.wait_for(serving, 5)
+        sock.close()
+        assert sessions.size == 0
+
+        # uvicorn leaves its lifespan task waiting behind it.
+        for task in asyncio.all_tasks():
+            if task is not asyncio.current_task():
+                task.cancel()
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(scenario())
+    finally:
+        loop.close()
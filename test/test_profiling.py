@@ -0,0 +1,76 @@
+import asyncio
+import time
+
+from starlette.testclient import TestClient
+
+from eggman import PlainTextResponse, Request, Response, Server
+from eggman.profiling import AWAITING
+
+
+def spin() -> None:
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        pass
+
+
+async def inner() -> None:
+    await asyncio.sleep(0.05)
+
+
+async def busy(request: Request) -> Response:
+    spin()
+    return PlainTextResponse("spun")
+
+
+async def idle(request: Request) -> Response:
+    await inner()
+    return PlainTextResponse("slept")
+
+
+def client(debug: bool = False) -> TestClient:
+    server = Server(debug=debug, profile_path="/profile")
+    server.add_route(busy, "/spin", blueprint="profiled")
+    server.add_route(idle, "/sleep", blueprint="profiled")
+
+    # TestClient serves requests on the current event loop.
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    return TestClient(server.starlette)
+
+
+def test_sampled_stacks():
+    profile = client()
+
+    # Disabled until enabled through the admin endpoint.
+    profile.get("/spin")
+    assert profile.get("/profile").text == ""
+
+    assert profile.post("/profile?rate=fast").status_code == 400
+    assert profile.post("/profile?rate=-1").status_code == 400
+    assert profile.get("/profile").text == ""
+
+    assert profile.post("/profile?rate=1").text.startswith("enabled rate=1")
+    profile.get("/spin")
+    profile.get("/sleep")
+
+    stacks = profile.get("/profile").text.splitlines()
+    spinning = [line for line in stacks if line.startswith("profiled:/spin;")]
+    assert any(";spin (test_profiling.py" in line for line in spinning)
+
+    sleeping = [line for line in stacks if line.startswith("profiled:/sleep;")]
+    assert any(";inner (test_profiling.py" in line and f";{AWAITING} " in line for line in sleeping)
+
+    only = profile.get("/profile", params={"blueprint": "profiled", "rule": "/sleep"}).text
+    assert only.splitlines() == sleeping
+
+    assert profile.post("/profile?enabled=false").text.startswith("disabled profiled=2")
+    assert profile.delete("/profile").text == "disabled profiled=0 samples=0\n"
+    profile.get("/spin")
+    assert profile.get("/profile").text == ""
+
+
+def test_flagged_requests():
+    for debug, expected in ((False, ""), (True, "profiled:/spin;")):
+        profile = client(debug)
+        profile.post("/profile?rate=1000")
+        profile.get("/spin", headers={"X-Eggman-Profile": "1"})
+        assert profile.get("/profile").text.startswith(expected)
@@ -0,0 +1,105 @@
+import asyncio
+from typing import Any, AsyncIterator, Tuple
+
+import pytest
+
+from eggman import Blueprint, PlainTextResponse, Request, Response, Server, StreamingResponse
+
+
+async def get(server: Server, path: str) -> Tuple[int, str]:
+    status = 0
+    body = b""
+
+    async def receive() -> Any:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Any) -> None:
+        nonlocal status, body
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        else:
+            body += message.get("body", b"")
+
+    scope = {"type": "http", "method": "GET", "path": path, "query_string": b"", "headers": []}
+    await server.starlette(scope, receive, send)
+    return status, body.decode()
+
+
+released: asyncio.Event
+
+
+async def version_1(request: Request) -> Response:
+    return PlainTextResponse("v1")
+
+
+async def version_2(request: Request) -> Response:
+    return PlainTextResponse("v2")
+
+
+async def slow(request: Request) -> Response:
+    await released.wait()
+    return PlainTextResponse("slow")
+
+
+async def ticks() -> AsyncIterator[str]:
+    for _ in range(3):
+        await asyncio.sleep(0.001)
+        yield "tick"
+
+
+async def stream(request: Request) -> Response:
+    return StreamingResponse(ticks())
+
+
+async def broken(request: Request) -> Response:
+    raise RuntimeError("broken")
+
+
+def api(version: int) -> Blueprint:
+    """
+    A fresh blueprint tree, standing in for one declared by a re-imported module.
+    """
+    bp = Blueprint("api")
+    bp.route("/version")(version_1 if version == 1 else version_2)
+    bp.route("/slow")(slow)
+    bp.route("/retired" if version == 1 else "/broken")(slow if version == 1 else broken)
+    bp.route("/stream")(stream)
+    return bp
+
+
+def test_reload():
+    server = Server(compiled_router=True, metrics_path="/metrics")
+
+    async def scenario() -> None:
+        global released
+        released = asyncio.Event()
+        api(1).jab(server)
+        await server.on_start()
+        assert await get(server, "/api/version") == (200, "v1")
+
+        # In flight on the old table while the new one replaces it.
+        in_flight = asyncio.ensure_future(get(server, "/api/slow"))
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(RuntimeError):
+            await server.reload(lambda s: api(2).jab(s), warm=["/api/version", "/api/broken"])
+        assert await get(server, "/api/version") == (200, "v1")
+
+        reload = server.reload(lambda s: api(2).jab(s), warm=["/api/version", "/api/stream"])
+        await asyncio.wait_for(reload, 1)
+        assert await get(server, "/api/version") == (200, "v2")
+        assert (await get(server, "/api/retired"))[0] == 404
+
+        released.set()
+        assert await in_flight == (200, "slow")
+
+        status, metrics = await get(server, "/metrics")
+        assert status == 200
+        # Metrics carry over, without counting the requests that warmed the new tables up.
+        assert 'eggman_requests_total{blueprint="api",rule="/api/version"} 3' in metrics
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(scenario())
+    finally:
+        loop.close()
@@ -0,0 +1,209 @@
+import asyncio
+import datetime
+import enum
+import json
+import uuid
+from collections import namedtuple
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Iterator, List
+
+import pytest
+from starlette.testclient import TestClient
+
+from eggman import JSONResponse, Request, Response, Server, StreamingJSONResponse, StreamingResponse
+from eggman.responses import orjson_encoder, stdlib_encoder
+
+Point = namedtuple("Point", ["x", "y"])
+
+
+@dataclass
+class Shape:
+    name: str
+    points: List[Point]
+
+
+SHAPE = Shape("line", [Point(0, 0), Point(1, 2)])
+EXPECTED = {"name": "line", "points": [[0, 0], [1, 2]]}
+
+
+@pytest.mark.parametrize("encoder", [orjson_encoder, stdlib_encoder])
+def test_encoders(encoder: Any):
+    assert json.loads(encoder([SHAPE, {"ok": True}])) == [EXPECTED, {"ok": True}]
+
+
+class Color(enum.Enum):
+    RED = "red"
+
+
+@dataclass
+class Private:
+    public: int
+    _private: int
+
+
+circular: List[Any] = []
+circular.append(circular)
+
+PAYLOADS = [
+    {1: "a", 2.5: "b", None: "c"},
+    {False: "d"},
+    [Private(1, 2)],
+    {"big": 2 ** 70},
+    {"finite": [1.5, None]},
+    [Color.RED, uuid.UUID(int=1)],
+    [None, float("nan")],
+    {"inf": float("inf")},
+    datetime.datetime(2020, 1, 1),
+    object(),
+    circular,
+]
+
+
+@pytest.mark.parametrize("content", PAYLOADS)
+def test_encoder_parity(content: Any):
+    results = []
+    for encoder in (orjson_encoder, stdlib_encoder):
+        try:
+            results.append(json.loads(encoder(content)))
+        except Exception as e:
+            results.append(type(e))
+
+    assert results[0] == results[1]
+
+
+async def items(n: int) -> AsyncIterator[dict]:
+    for i in range(n):
+        yield {"i": i}
+
+
+def json_handler(request: Request) -> Response:
+    return JSONResponse(SHAPE)
+
+
+def stream_handler(request: Request) -> Response:
+    return StreamingJSONResponse(({"i": i} for i in range(1000)), chunk_size=128)
+
+
+def async_stream_handler(request: Request) -> Response:
+    return StreamingJSONResponse(items(int(request.query_params["n"])), chunk_size=128)
+
+
+def test_json_responses():
+    server = Server()
+    server.add_route(json_handler, "/json")
+    server.add_route(stream_handler, "/stream")
+    server.add_route(async_stream_handler, "/async-stream")
+    client = TestClient(server.starlette)
+
+    response = client.get("/json")
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == EXPECTED
+
+    response = client.get("/stream")
+    assert response.json() == [{"i": i} for i in range(1000)]
+
+    for n in (0, 1, 1000):
+        response = client.get(f"/async-stream?n={n}")
+        assert response.json() == [{"i": i} for i in range(n)]
+
+
+def test_streaming_backpressure():
+    produced: List[int] = []
+
+    async def chunks() -> AsyncIterator[bytes]:
+        for i in range(1000):
+            produced.append(i)
+            yield b"x" * 100
+
+    async def scenario() -> None:
+        sent: List[dict] = []
+        unblock = asyncio.Event()
+
+        async def send(message: dict) -> None:
+            # A slow client: the first body write stalls until it is released and every write takes a while.
+            sent.append(message)
+            if len(sent) == 2:
+                await unblock.wait()
+            await asyncio.sleep(0.001)
+
+        async def receive() -> dict:
+            await asyncio.Event().wait()
+            return {}  # pragma: no cover
+
+        response = StreamingResponse(chunks(), write_size=250, max_buffer=1000)
+        task = asyncio.ensure_future(response({"type": "http"}, receive, send))
+        await asyncio.sleep(0.05)
+
+        # The producer stopped once the buffer filled up behind the stalled write.
+        assert len(produced) < 20
+
+        unblock.set()
+        await task
+
+        # Chunks that queued up behind the client are coalesced into writes of about `write_size`.
+        assert max(len(m["body"]) for m in sent[1:]) == 300
+        assert len(sent) < 400
+        assert sent[-1] == {"type": "http.response.body", "body": b"", "more_body": False}
+        assert b"".join(m.get("body", b"") for m in sent) == b"x" * 100000
+
+    asyncio.new_event_loop().run_until_complete(scenario())
+
+
+def test_streaming_disconnect():
+    closed = []
+
+    async def forever() -> AsyncIterator[str]:
+        try:
+            while True:
+                yield "tick"
+                await asyncio.sleep(0.001)
+        finally:
+            closed.append(True)
+
+    async def scenario() -> None:
+        async def send(message: dict) -> None:
+            pass
+
+        async def receive() -> dict:
+            await asyncio.sleep(0.05)
+            return {"type": "http.disconnect"}
+
+        await asyncio.wait_for(StreamingResponse(forever())({"type": "http"}, receive, send), 1)
+        await asyncio.sleep(0)
+        assert closed == [True]
+
+    asyncio.new_event_loop().run_until_complete(scenario())
+
+    def failing() -> Iterator[bytes]:
+        yield b"partial"
+        raise RuntimeError("producer failed")
+
+    client = TestClient(StreamingResponse(failing()))
+    with pytest.raises(RuntimeError):
+        client.get("/")
+
+
+def test_streaming_synthetic_receive():
+    async def ticks() -> AsyncIterator[str]:
+        for _ in range(5):
+            yield "tick"
+            await asyncio.sleep(0.001)
+
+    async def scenario() -> None:
+        received = 0
+        sent: List[dict] = []
+
+        async def send(message: dict) -> None:
+            sent.append(message)
+
+        # A receive that never blocks, as the ones eggman uses to replay requests itself.
+        async def receive() -> dict:
+            nonlocal received
+            received += 1
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        await asyncio.wait_for(StreamingResponse(ticks())({"type": "http"}, receive, send), 1)
+        assert received == 2
+        assert b"".join(m.get("body", b"") for m in sent) == b"tick" * 5
+
+    asyncio.new_event_loop().run_until_complete(scenario())
@@ -0,0 +1,120 @@
+from starlette.routing import Match, Route
+from starlette.testclient import TestClient
+
+from eggman import Blueprint, PlainTextResponse, Request, Response, Server
+from eggman.routing import RadixTree
+
+
+def echo(request: Request) -> Response:
+    params = ",".join(f"{k}={v!r}" for k, v in sorted(request.path_params.items()))
+    return PlainTextResponse(f"{request.url.path}|{params}")
+
+
+def test_radix_tree_lookup():
+    tree = RadixTree()
+    rules = ["/users/{name}", "/users/me", "/users/{id:int}/posts", "/files/{path:path}", "/"]
+    for rule in rules:
+        assert tree.insert(rule, Route(rule, echo))
+
+    match, (route, child) = tree.lookup("/users/me", "GET")
+    assert match == Match.FULL and route.path == "/users/me"
+
+    match, (route, child) = tree.lookup("/users/eggman", "GET")
+    assert route.path == "/users/{name}" and child["path_params"] == {"name": "eggman"}
+
+    match, (route, child) = tree.lookup("/users/42/posts", "GET")
+    assert route.path == "/users/{id:int}/posts" and child["path_params"] == {"id": 42}
+
+    match, (route, child) = tree.lookup("/files/a/b/c.txt", "GET")
+    assert child["path_params"] == {"path": "a/b/c.txt"}
+
+    match, _ = tree.lookup("/users/eggman", "POST")
+    assert match == Match.PARTIAL
+
+    assert tree.lookup("/users/abc/posts", "GET") == (Match.NONE, None)
+    assert not tree.insert("/file-{name}.txt", Route("/file-{name}.txt", echo))
+
+
+def test_compiled_server():
+    server = Server(compiled_router=True)
+    server.add_route(echo, "/api/{name}")
+    server.add_route(echo, "/api/{id:int}", methods=["POST"])
+    server.add_route(echo, "/report-{year:int}.csv")
+
+    client = TestClient(server.starlette)
+
+    response = client.get("/api/eggman")
+    assert response.text == "/api/eggman|name='eggman'"
+
+    response = client.post("/api/7")
+    assert response.text == "/api/7|id=7"
+
+    response = client.put("/api/7")
+    assert response.status_code == 405
+
+    response = client.get("/report-2019.csv")
+    assert response.text == "/report-2019.csv|year=2019"
+
+    response = client.get("/nowhere")
+    assert response.status_code == 404
+
+    server.add_route(echo, "/late/")
+    response = client.get("/late", allow_redirects=False)
+    assert response.status_code in (302, 307)
+
+
+def test_host_and_version_dispatch():
+    def named(name: str):
+        def handler(request: Request) -> Response:
+            return PlainTextResponse(f"{name}|{request.url.path}")
+
+        return handler
+
+    for compiled in (False, True):
+        server = Server(compiled_router=compiled)
+        server.add_route(named("any"), "/items")
+        server.add_route(named("tenant"), "/items", host="tenant.example.com", strict_slashes=False)
+        server.add_route(named("wildcard"), "/items", host="*.example.com")
+        server.add_route(named("v2"), "/items", version=2)
+        server.add_route(named("strict"), "/strict/", host="tenant.example.com", strict_slashes=True)
+        client = TestClient(server.starlette)
+
+        assert client.get("/items").text == "any|/items"
+        assert client.get("/items", headers={"Host": "tenant.example.com:8000"}).text == "tenant|/items"
+        assert client.get("/items/", headers={"Host": "tenant.example.com"}).text == "tenant|/items/"
+        assert client.get("/items", headers={"Host": "other.example.com"}).text == "wildcard|/items"
+        assert client.get("/items", headers={"Host": "example.org"}).text == "any|/items"
+
+        assert client.get("/v2/items").text == "v2|/v2/items"
+        assert client.get("/items", headers={"Accept-Version": "2"}).text == "v2|/items"
+        assert client.get("/v3/items").status_code == 404
+        assert client.get("/v2/other").status_code == 404
+
+        response = client.get("/strict", headers={"Host": "tenant.example.com"}, allow_redirects=False)
+        assert response.status_code == 404
+
+
+def test_blueprint_dispatch_options():
+    parent = Blueprint("api", host="tenant.example.com", version=2)
+    child = Blueprint("items", strict_slashes=True)
+    relaxed = Blueprint("relaxed", host="other.example.com")
+    child.route("/{name}")(echo)
+    relaxed.route("/{name}")(echo)
+    parent.mount(child)
+    parent.mount(relaxed)
+
+    server = Server()
+    parent.jab(server)
+    client = TestClient(server.starlette)
+
+    # Mounted blueprints inherit the host and version of their parent.
+    tenant = {"Host": "tenant.example.com"}
+    assert client.get("/v2/api/items/a", headers=tenant).text == "/v2/api/items/a|name='a'"
+    assert client.get("/v2/api/items/a/", headers=tenant, allow_redirects=False).status_code == 404
+    assert client.get("/v2/api/items/a").status_code == 404
+    assert client.get("/api/items/a", headers=tenant).status_code == 404
+
+    # Blueprint routes are served both with and without a trailing slash by default.
+    other = {"Host": "other.example.com"}
+    assert client.get("/v2/api/relaxed/a", headers=other).text == "/v2/api/relaxed/a|name='a'"
+    assert client.get("/v2/api/relaxed/a/", headers=other).text == "/v2/api/relaxed/a/|name='a'"
@@ -0,0 +1,107 @@
+import os
+from typing import Any, List
+
+from eggman import Blueprint, PlainTextResponse, Request, Response, snapshot
+from eggman.cache import ResponseCache
+from eggman.static import StaticFiles
+from eggman.types import Handler, WebSocketHandler
+
+first = Blueprint("first")
+second = Blueprint("second")
+third = Blueprint("third")
+
+
+class Counter:
+    pass
+
+
+class Router:
+    def __init__(self) -> None:
+        self.routes: List[str] = []
+
+    def add_route(self, fn: Handler, rule: str, **options: Any) -> None:
+        self.routes.append(rule)
+
+    def add_websocket_route(self, fn: WebSocketHandler, rule: str, **options: Any) -> None:
+        self.routes.append(rule)
+
+
+class Handlers:
+    def __init__(self, counter: Counter) -> None:
+        self.counter = counter
+
+    @first.route("/count")
+    @second.route("/count")
+    @third.route("/count")
+    async def count(self, request: Request) -> Response:
+        return PlainTextResponse("")  # pragma: no cover
+
+
+@first.route("/free")
+@second.route("/free")
+def free(request: Request) -> Response:
+    return PlainTextResponse("")  # pragma: no cover
+
+
+def build(bp: Blueprint) -> List[str]:
+    constructor = bp.jab
+    kwargs = {k: v() for k, v in constructor.__annotations__.items() if k not in ("app", "return")}
+    router = Router()
+    constructor(router, **kwargs)
+    return sorted(router.routes)
+
+
+def test_snapshot_roundtrip(tmp_path: Any):
+    path = str(tmp_path / "routes.snapshot")
+
+    first.snapshot(path)
+    assert build(first) == ["/first/count", "/first/free"]
+    assert os.path.exists(path)
+
+    shape = snapshot.fingerprint("first", first.deferred_routes, [])
+    table = snapshot.load(path, shape, first.deferred_routes, [])
+    assert table is not None
+    assert list(table.routes.constructors.values()) == [Handlers]
+    assert list(table.routes.deps.values()) == [Counter]
+
+    # A blueprint with different handlers does not match the snapshot and rewrites it.
+    for bp, expected in ((second, ["/second/count", "/second/free"]), (third, ["/third/count"])):
+        shape = snapshot.fingerprint(bp.name, bp.deferred_routes, [])
+        assert snapshot.load(path, shape, bp.deferred_routes, []) is None
+
+        bp.snapshot(path)
+        assert build(bp) == expected
+        assert snapshot.load(path, shape, bp.deferred_routes, []) is not None
+
+
+def test_snapshot_options(tmp_path: Any):
+    path = str(tmp_path / "routes.snapshot")
+
+    fourth = Blueprint("fourth")
+    fourth.route("/free", cache=ResponseCache(60), methods=["GET"])(free)
+    fourth.route("/count", cache=ResponseCache(60))(Handlers.count)
+    fourth.route("/static")(StaticFiles(str(tmp_path)))
+    fourth.snapshot(path)
+    assert build(fourth) == ["/fourth/count", "/fourth/free", "/fourth/static"]
+
+    # Handler objects and options are bound back to the ones registered in this process.
+    (free_, free_rule, free_options), (count, count_rule, count_options), static = fourth.deferred_routes
+    routes = [
+        (free_, free_rule, {**free_options, "cache": ResponseCache(30)}),
+        (count, count_rule, {**count_options, "cache": ResponseCache(30)}),
+        (StaticFiles(str(tmp_path)), static.rule, static.options),
+    ]
+    shape = snapshot.fingerprint("fourth", routes, [])
+    table = snapshot.load(path, shape, routes, [])
+    assert table is not None
+    assert table.func_routes[0].options["cache"] is routes[0][2]["cache"]
+    assert table.func_routes[1].fn is routes[2][0]
+    assert table.routes.constructor_routes["Handlers"][0].options["cache"] is routes[1][2]["cache"]
+
+    # Routes setting other options have a different shape.
+    fn, rule, options = routes[0]
+    changed_shape = snapshot.fingerprint(
+        "fourth", [(fn, rule, {**options, "concurrency": 4})] + routes[1:], []
+    )
+    assert changed_shape != shape
+    assert snapshot.load(path, changed_shape, routes, []) is None
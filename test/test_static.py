@@ -0,0 +1,106 @@
+import asyncio
+import gzip
+import os
+
+from starlette.testclient import TestClient
+
+from eggman import FileResponse, Server, StaticFiles
+from eggman.static import StatIndex
+
+CONTENT = bytes(range(256)) * 4096
+
+
+def serve(directory: str) -> TestClient:
+    server = Server()
+    server.add_route(StaticFiles(directory, max_age=60), "/static/{path:path}", methods=["GET", "HEAD"])
+    return TestClient(server.starlette)
+
+
+def test_static_files(tmpdir):
+    tmpdir.join("data.bin").write_binary(CONTENT)
+    tmpdir.join("app.js").write_binary(b"console.log(1)")
+    tmpdir.join("app.js.gz").write_binary(gzip.compress(b"console.log(1)"))
+    tmpdir.mkdir("sub")
+    client = serve(str(tmpdir.join("sub")))
+    assert client.get("/static/../data.bin").status_code == 404
+
+    client = serve(str(tmpdir))
+
+    response = client.get("/static/data.bin")
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["content-length"] == str(len(CONTENT))
+    assert response.headers["cache-control"] == "public, max-age=60"
+
+    etag = response.headers["etag"]
+    assert client.get("/static/data.bin", headers={"If-None-Match": etag}).status_code == 304
+
+    response = client.get("/static/data.bin", headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.content == CONTENT[10:20]
+    assert response.headers["content-range"] == f"bytes 10-19/{len(CONTENT)}"
+
+    response = client.get("/static/data.bin", headers={"Range": "bytes=-5"})
+    assert response.content == CONTENT[-5:]
+
+    response = client.get("/static/data.bin", headers={"Range": "bytes=10-19", "If-Range": '"stale"'})
+    assert response.status_code == 200
+
+    response = client.get("/static/data.bin", headers={"Range": f"bytes={len(CONTENT)}-"})
+    assert response.status_code == 416
+
+    # Invalid ranges are ignored rather than refused.
+    for invalid in ("bytes=5-3", "bytes=-", "bytes=a-5", "bytes=--5", "items=0-5"):
+        response = client.get("/static/data.bin", headers={"Range": invalid})
+        assert response.status_code == 200
+        assert response.content == CONTENT
+
+    response = client.get("/static/app.js", headers={"Accept-Encoding": "br, gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "javascript" in response.headers["content-type"]
+    assert response.content == b"console.log(1)"
+
+    response = client.get("/static/app.js", headers={"Accept-Encoding": "gzip;q=0"})
+    assert "content-encoding" not in response.headers
+
+    assert client.get("/static/missing.bin").status_code == 404
+    assert client.get("/static/sub").status_code == 404
+
+
+def test_server_extensions(tmpdir):
+    path = str(tmpdir.join("data.bin"))
+    tmpdir.join("data.bin").write_binary(CONTENT)
+
+    async def call(extensions: dict, headers: list, method: str = "GET") -> list:
+        sent = []
+
+        async def send(message: dict) -> None:
+            sent.append(message)
+
+        scope = {"type": "http", "method": method, "headers": headers, "extensions": extensions}
+        await FileResponse(path)(scope, None, send)
+        return sent
+
+    loop = asyncio.new_event_loop()
+
+    sent = loop.run_until_complete(call({"http.response.pathsend": {}}, []))
+    assert sent[1] == {"type": "http.response.pathsend", "path": os.path.realpath(path)}
+
+    sent = loop.run_until_complete(call({"http.response.zerocopy": {}}, [(b"range", b"bytes=5-9")]))
+    assert sent[0]["status"] == 206
+    assert (sent[1]["offset"], sent[1]["count"]) == (5, 5)
+
+    sent = loop.run_until_complete(call({}, [], method="HEAD"))
+    assert sent[1] == {"type": "http.response.body", "body": b""}
+
+
+def test_stat_index(tmpdir):
+    index = StatIndex(ttl=60)
+    path = str(tmpdir.join("late.txt"))
+
+    assert index.get(path) is None
+    tmpdir.join("late.txt").write("late")
+    assert index.get(path) is None
+
+    index.ttl = 0
+    assert index.get(path).size == 4
@@ -0,0 +1,142 @@
+import asyncio
+import os
+import socket
+import time
+from typing import Any, List
+
+import pytest
+
+from eggman import PlainTextResponse, Request, Response, Server, workers
+from eggman.engine import Engine
+from eggman.workers import Supervisor
+
+
+def run(coroutine: Any) -> Any:
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def idle() -> None:
+    worker = workers.current()
+    assert worker is not None
+    while not worker.stopping:
+        time.sleep(0.01)
+
+
+def stubborn() -> None:
+    while True:
+        time.sleep(0.01)
+
+
+def crash() -> None:
+    raise RuntimeError("crashed")
+
+
+def exited(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+
+    return False
+
+
+def test_supervisor():
+    supervisor = Supervisor(2, "127.0.0.1", 0)
+
+    async def scenario() -> List[int]:
+        task = asyncio.ensure_future(supervisor.supervise(idle))
+        await asyncio.sleep(0.3)
+
+        health = supervisor.health()
+        assert [worker.alive for worker in health] == [True, True]
+        assert [worker.restarts for worker in health] == [0, 0]
+
+        supervisor.stop()
+        await asyncio.wait_for(task, 5)
+        return [worker.pid for worker in health]
+
+    assert all(exited(pid) for pid in run(scenario()))
+
+
+def test_stuck_workers_are_killed():
+    supervisor = Supervisor(1, "127.0.0.1", 0, stop_timeout=0.2)
+
+    async def scenario() -> int:
+        task = asyncio.ensure_future(supervisor.supervise(stubborn))
+        await asyncio.sleep(0.2)
+        pid = supervisor.health()[0].pid
+
+        supervisor.stop()
+        await asyncio.wait_for(task, 2)
+        return pid
+
+    assert exited(run(scenario()))
+
+
+def test_crashing_workers_back_off():
+    supervisor = Supervisor(1, "127.0.0.1", 0, backoff=0.2)
+    supervisor.interval = 0.02
+
+    async def scenario() -> None:
+        task = asyncio.ensure_future(supervisor.supervise(crash))
+        # Restarted after 0.2 and 0.4 more seconds, the next one being 0.8 seconds later.
+        await asyncio.sleep(1.0)
+        assert supervisor.health()[0].restarts == 2
+
+        supervisor.stop()
+        await asyncio.wait_for(task, 2)
+
+    run(scenario())
+
+
+def test_backlog():
+    engine = Engine(backlog=8)
+    assert Supervisor(2, engine=engine).backlog == 8
+    assert Supervisor(2, engine=engine, backlog=16).backlog == 16
+    assert engine.backlog == 8
+
+
+async def hello(request: Request) -> Response:
+    return PlainTextResponse(f"hello from {os.getpid()}")
+
+
+async def fetch(port: int) -> bytes:
+    for _ in range(100):
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            break
+        except OSError:
+            await asyncio.sleep(0.05)
+    else:
+        pytest.fail("the workers did not start")
+
+    writer.write(b"GET /hello HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n")
+    response = await reader.read()
+    writer.close()
+    return response
+
+
+def test_server_workers():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    server = Server(host="127.0.0.1", port=port, workers=2, drain_timeout=1.0)
+    server.add_route(hello, "/hello")
+
+    async def scenario() -> None:
+        task = asyncio.ensure_future(server.run())
+
+        # The harness event loop keeps running alongside the supervisor.
+        response = await fetch(port)
+        assert response.startswith(b"HTTP/1.1 200")
+        assert f"hello from {os.getpid()}".encode() not in response
+
+        server.shutdown()
+        await asyncio.wait_for(task, 10)
+
+    run(scenario())